@@ -0,0 +1,18 @@
+import time
+
+
+def best_time(func, *args, repeat=3, setup=None):
+    """
+    Best wall time of func(*args) over repeat calls, and the result of the last call.
+
+    With setup, func is called with the arguments setup() returns, made afresh
+    (and not timed) before each call, for functions that change their inputs.
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        call_args = setup() if setup is not None else args
+        start = time.perf_counter()
+        result = func(*call_args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
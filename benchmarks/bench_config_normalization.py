@@ -0,0 +1,100 @@
+"""
+Micro-benchmark of the config cell normalization in f00_read_configs.
+
+Times the original per-cell applymap/apply lambdas against the vectorized
+normalize_config_except_columns / normalize_config_values on a synthetic
+config sheet and checks that both produce the same frames.
+
+Run from the repository root:
+    python -m benchmarks.bench_config_normalization
+"""
+import numpy as np
+import pandas as pd
+
+from f00_read_configs import normalize_config_except_columns, normalize_config_values
+from benchmarks import best_time
+
+
+CONFIG_ROWS = [1000, 10000, 50000]
+
+
+def build_config_frames(n_rows):
+    """ Synthetic file / criteria / mapping zones shaped like an F001 sheet after splitting. """
+    rng = np.random.default_rng(0)
+    classes = np.array([' A ', 'b', ' Class_C', 'd '], dtype=object)
+    file_config_df = pd.DataFrame({
+        'input_folder_path': np.array(['abc ', ' raw/vendor'], dtype=object)[rng.integers(0, 2, n_rows)],
+        'input_file_name': [f" Sample_{i % 500}.xlsx" for i in range(n_rows)],
+        'input_file_type': np.array(['.xlsx', '.csv', ' .txt'], dtype=object)[rng.integers(0, 3, n_rows)],
+        'output_sheet_name': [f"Sheet{i % 7}" for i in range(n_rows)],
+        'base_input_class': classes[rng.integers(0, 4, n_rows)],
+    })
+    values = np.array([' Total', 'Applied filters: ', 'M', 12.5, 3, ' 1e3 ', np.nan], dtype=object)
+    cal_df = pd.DataFrame({
+        'linked_input_class': classes[rng.integers(0, 4, n_rows)],
+        'remove_rows_list': np.array(['POsition,  year_month', np.nan], dtype=object)[rng.integers(0, 2, n_rows)],
+        'applied_column': np.array([' Year_Month', 'position ', np.nan], dtype=object)[rng.integers(0, 3, n_rows)],
+        'criteria_to_remove_row': np.array(['=', 'contain', '> ='], dtype=object)[rng.integers(0, 3, n_rows)],
+        'criteria_value': values[rng.integers(0, len(values), n_rows)],
+        'Num': np.arange(n_rows),
+    })
+    mapping_zone_df = pd.DataFrame({
+        'base_mapping_group': np.array([' G1', 'g2 ', np.nan], dtype=object)[rng.integers(0, 3, n_rows)],
+        'mapping_value': values[rng.integers(0, len(values), n_rows)],
+    })
+    return file_config_df, cal_df, mapping_zone_df
+
+
+def legacy_normalize_config_except_columns(file_config_df, cal_df, mapping_zone_df,
+                                           execpt_cal_df_columns=None, execpt_mapping_zone_df_columns=None):
+    """ The original lambda-based passes from read_config_except_columns. """
+    file_config_df = file_config_df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+    file_config_df['base_input_class'] = file_config_df['base_input_class'].apply(lambda x: x.lower().strip() if isinstance(x, str) else x)
+    for df, except_columns in ((cal_df, execpt_cal_df_columns), (mapping_zone_df, execpt_mapping_zone_df_columns)):
+        for col in df.columns:
+            if except_columns and col in except_columns:
+                df[col] = df[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
+            else:
+                df[col] = df[col].apply(lambda x: x.lower().strip() if isinstance(x, str) else x)
+    return file_config_df, cal_df, mapping_zone_df
+
+
+def legacy_normalize_config_values(df, lower_case_except_file_zone):
+    """ The original transform() applymap from read_config. """
+    def transform(x):
+        try:
+            float(x)
+            return x
+        except ValueError:
+            if isinstance(x, str):
+                return x.lower().strip() if lower_case_except_file_zone else x.strip()
+            else:
+                return x
+    return df.applymap(transform)
+
+
+def main():
+    print(f"{'rows':>7} {'pass':>28} {'legacy (s)':>11} {'vectorized (s)':>15} {'speedup':>8}")
+    for n_rows in CONFIG_ROWS:
+        frames = build_config_frames(n_rows)
+
+        def except_args():
+            return tuple(df.copy() for df in frames) + ({'criteria_value'}, None)
+
+        legacy_time, legacy = best_time(legacy_normalize_config_except_columns, setup=except_args)
+        new_time, new = best_time(normalize_config_except_columns, setup=except_args)
+        for expected, result in zip(legacy, new):
+            pd.testing.assert_frame_equal(result, expected)
+        print(f"{n_rows:>7} {'read_config_except_columns':>28} {legacy_time:>11.4f} {new_time:>15.4f} {legacy_time / new_time:>7.1f}x")
+
+        def values_args():
+            return frames[1].copy(), True
+
+        legacy_time, legacy = best_time(legacy_normalize_config_values, setup=values_args)
+        new_time, new = best_time(normalize_config_values, setup=values_args)
+        pd.testing.assert_frame_equal(new, legacy)
+        print(f"{n_rows:>7} {'read_config':>28} {legacy_time:>11.4f} {new_time:>15.4f} {legacy_time / new_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
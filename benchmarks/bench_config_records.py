@@ -0,0 +1,70 @@
+"""
+Per-file config overhead of run_removal_automation: frames versus records.
+
+A config with many file rows (all pointing at one small input) is turned
+into jobs the way the runner does it, with the header values, removal plan
+and criteria fingerprint of every job: once from file_config_df and a
+ConfigIndex (iterrows per file row, iterrows over the criteria rows per
+job) and once from the records read_config_except_columns(as_records=True)
+returns, their build time included. The jobs must match.
+
+Run from the repository root:
+    python -m benchmarks.bench_config_records
+"""
+import contextlib
+import io
+import tempfile
+
+from f00_read_configs import ConfigIndex, build_criteria_records, build_file_records, read_config_except_columns
+from f01_manifest import criteria_fingerprint
+from f01_remove_rows import _iter_file_jobs, compile_removal_criteria, header_values_of
+from benchmarks import best_time
+from benchmarks.datagen import generate_dataset
+
+
+CONFIG_ROWS = [100, 1000, 5000]
+CRITERIA = 12
+
+
+def prepare_jobs(file_config, config_index, base_path):
+    """ Everything the runner derives from the config for each file. """
+    jobs = []
+    for job in _iter_file_jobs(file_config, config_index, base_path):
+        plan = [(c['applied_column'], c['criteria_to_remove_row'], c['criteria_value'])
+                for c in compile_removal_criteria(job['criteria_rows'])]
+        jobs.append((job['input_file_path'], job['output_file_path'], job['sheet_name'],
+                     header_values_of(job['criteria_rows']), plan))
+    return jobs
+
+
+def main():
+    print(f"{'rows':>6} {'frames (s)':>11} {'records (s)':>12} {'speedup':>8}")
+    for config_rows in CONFIG_ROWS:
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                dataset = generate_dataset(tmp, rows=10, file_type='.csv', criteria=CRITERIA,
+                                           config_rows=config_rows)
+            base_path = dataset['base_path']
+            file_config_df, cal_df, mapping_zone_df = read_config_except_columns(
+                base_path, dataset['config_file'], dataset['sheet_name'], True, {'criteria_value'}, None)
+
+            def frames():
+                return prepare_jobs(file_config_df, ConfigIndex(cal_df, mapping_zone_df), base_path)
+
+            def records():
+                # What as_records adds after the frames are parsed (or loaded from the cache)
+                file_records = build_file_records(file_config_df, build_criteria_records(cal_df), base_path)
+                return prepare_jobs(file_records, None, base_path)
+
+            frame_time, expected = best_time(frames)
+            record_time, result = best_time(records)
+            assert result == expected
+
+            file_records = build_file_records(file_config_df, build_criteria_records(cal_df), base_path)
+            assert (criteria_fingerprint(file_records[0].criteria)
+                    == criteria_fingerprint(ConfigIndex(cal_df).criteria_for(file_records[0].base_input_class)))
+            print(f"{config_rows:>6} {frame_time:>11.4f} {record_time:>12.4f} {frame_time / record_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
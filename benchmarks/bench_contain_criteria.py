@@ -0,0 +1,66 @@
+"""
+Parity check and benchmark for 'contain' criteria in apply_removal_plan.
+
+Compares the original per-criteria series.str.contains(value, regex=True)
+filtering with the merged, distinct-value scan of apply_removal_plan, for
+plain substrings, regular expressions and values that cannot be merged.
+
+Run from the repository root:
+    python -m benchmarks.bench_contain_criteria
+"""
+import numpy as np
+import pandas as pd
+
+from f01_remove_rows import apply_removal_plan
+from benchmarks import best_time
+
+
+ROWS = [10000, 100000, 1000000]
+CASES = {
+    'one literal': ['M'],
+    'three literals': ['M', 'TP', 'staff01'],
+    'regex': [r'^staff0\d', 'Nhân|TP'],
+    'mixed': ['M', r'^tmp', 'viên', r'\d{4}$'],
+    'unmergeable': [r'(a)\1', '(?i)mg', 'TP'],
+}
+
+
+def build_frame(n_rows):
+    rng = np.random.default_rng(0)
+    staff = np.array([f"staff{i:04d}" for i in range(300)] + ['tmp0001', 'aa', None], dtype=object)
+    # An object column mixing text, numbers and blanks, as .xlsx inputs produce
+    position = np.array(['MG', 'Nhân viên', 'TP', 'mg', 12, np.nan], dtype=object)
+    return pd.DataFrame({
+        'staff username': staff[rng.integers(0, len(staff), n_rows)],
+        'position': position[rng.integers(0, len(position), n_rows)],
+    })
+
+
+def build_plan(values):
+    columns = ['staff username', 'position']
+    return [{'applied_column': columns[i % 2], 'criteria_to_remove_row': 'contain', 'criteria_value': value}
+            for i, value in enumerate(values)]
+
+
+def legacy_apply_plan(df, plan):
+    """ The original filtering: one str.contains per criteria, frame filtered after each. """
+    for criteria in plan:
+        series = df[criteria['applied_column']]
+        df = df[~series.str.contains(criteria['criteria_value'], na=False, regex=True)]
+    return df
+
+
+def main():
+    print(f"{'rows':>8} {'case':>15} {'legacy (s)':>11} {'merged (s)':>11} {'speedup':>8}")
+    for n_rows in ROWS:
+        df = build_frame(n_rows)
+        for case, values in CASES.items():
+            plan = build_plan(values)
+            legacy_time, expected = best_time(legacy_apply_plan, df, plan)
+            new_time, result = best_time(apply_removal_plan, df, plan)
+            pd.testing.assert_frame_equal(result, expected)
+            print(f"{n_rows:>8} {case:>15} {legacy_time:>11.4f} {new_time:>11.4f} {legacy_time / new_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
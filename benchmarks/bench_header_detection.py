@@ -0,0 +1,57 @@
+"""
+Benchmark the header-row search used by run_removal_automation.
+
+Compares the original row-by-row iterrows() search with find_header_row_index
+for headers placed further and further down the sheet.
+
+Run from the repository root:
+    python -m benchmarks.bench_header_detection
+"""
+import numpy as np
+import pandas as pd
+
+from f01_remove_rows import normalize_text, find_header_row_index
+from benchmarks import best_time
+
+
+HEADER = ['year_month', 'Year quarter', 'year 6M', 'staff username', 'position', 'SLKH_quan_ly']
+HEADER_OFFSETS = [0, 200, 1000, 5000]
+DATA_ROWS = 20000
+
+
+def build_sheet(header_offset, data_rows=DATA_ROWS, n_cols=len(HEADER)):
+    """ Build a header=None style frame with filler rows above the header. """
+    rng = np.random.default_rng(0)
+    filler = [[f"Report line {i}"] + [np.nan] * (n_cols - 1) for i in range(header_offset)]
+    # Vendor exports repeat a small pool of staff, positions and periods
+    data = [[202201 + i % 12, '2023.Q1', '2023.6F', f"staff{i % 300:04d}", 'MG', int(rng.integers(100, 200))]
+            for i in range(data_rows)]
+    return pd.DataFrame(filler + [HEADER] + data)
+
+
+def legacy_find_header_row_index(df, header_values):
+    """ The original iterrows() based search, kept here as the baseline. """
+    first_row_values = [normalize_text(str(x)) for x in df.iloc[0].values]
+    if all(header_value in first_row_values for header_value in header_values):
+        return 0
+    for index, row in df.iterrows():
+        row_values = [normalize_text(str(x)) for x in row.values]
+        if all(header_value in row_values for header_value in header_values):
+            return index
+    return None
+
+
+def main():
+    header_values = [normalize_text(value) for value in 'position,    year_month'.split(',')]
+
+    print(f"{'offset':>8} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for offset in HEADER_OFFSETS:
+        df = build_sheet(offset)
+        legacy_time, legacy_index = best_time(legacy_find_header_row_index, df, header_values)
+        new_time, new_index = best_time(find_header_row_index, df, header_values)
+        assert legacy_index == new_index == offset, (legacy_index, new_index, offset)
+        print(f"{offset:>8} {legacy_time:>12.4f} {new_time:>15.4f} {legacy_time / new_time:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+One input read by several config rows: parsed once per row versus once per run.
+
+generate_dataset lists the same input in config_rows file rows, each with
+its own output sheet (written as .csv). The run is timed without and with
+input_cache_bytes, and once more with a budget too small to keep the frame;
+the outputs must be identical and the hits and misses are taken from the
+run reports.
+
+Run from the repository root:
+    python -m benchmarks.bench_input_cache
+"""
+import contextlib
+import io
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from f00_read_configs import read_config_except_columns
+from f01_remove_rows import run_removal_automation
+from benchmarks.datagen import generate_dataset
+
+
+CASES = [('.xlsx', 20000, 8), ('.csv', 100000, 8)]
+CACHE_BYTES = 500 * 1000 * 1000
+
+
+def run(dataset, output_folder, input_cache_bytes):
+    file_records, _, _ = read_config_except_columns(
+        dataset['base_path'], dataset['config_file'], dataset['sheet_name'], True, {'criteria_value'}, None,
+        as_records=True)
+    output_file_path = dataset['base_path'] / output_folder / 'out.csv'
+    file_records = [record._replace(output_file_path=output_file_path) for record in file_records]
+    report_path = dataset['base_path'] / f"report_{output_folder}.json"
+    start = time.perf_counter()
+    run_removal_automation(file_records, None, dataset['base_path'], report_path=report_path,
+                           input_cache_bytes=input_cache_bytes)
+    seconds = time.perf_counter() - start
+    with open(report_path, encoding='utf-8') as f:
+        cache = json.load(f)['summary'].get('input_cache', {})
+    outputs = {path.name: path.read_bytes() for path in output_file_path.parent.iterdir()}
+    return seconds, cache, outputs
+
+
+def main():
+    logging.disable(logging.INFO)
+    print(f"{'type':>6} {'rows':>7} {'config rows':>12} {'no cache (s)':>13} {'cache (s)':>10} "
+          f"{'hits/misses':>12} {'tiny cache (s)':>15} {'hits/misses':>12}")
+    for file_type, rows, config_rows in CASES:
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                dataset = generate_dataset(Path(tmp), rows=rows, header_offset=20, file_type=file_type,
+                                           config_rows=config_rows)
+            plain, _, expected = run(dataset, 'plain', None)
+            cached, cache, outputs = run(dataset, 'cached', CACHE_BYTES)
+            assert outputs == expected
+            tiny, tiny_cache, outputs = run(dataset, 'tiny', 1000)
+            assert outputs == expected
+            print(f"{file_type:>6} {rows:>7} {config_rows:>12} {plain:>13.2f} {cached:>10.2f} "
+                  f"{cache['hits']:>5}/{cache['misses']:<6} {tiny:>15.2f} {tiny_cache['hits']:>5}/{tiny_cache['misses']:<6}")
+
+
+if __name__ == '__main__':
+    main()
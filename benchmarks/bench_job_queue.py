@@ -0,0 +1,119 @@
+"""
+Queue workers on one machine versus one run_removal_automation process.
+
+A config lists INPUTS .csv inputs twice each, spread over OUTPUTS output
+workbooks. It is run once in process, then enqueued (one job per workbook)
+and drained by 1 and by several worker processes, and once more after a
+worker "crashed" holding the lease of a job, which has to be claimed again
+when its lease expires. Every workbook must have the same sheets, in the
+same order and with the same rows, as the in-process run.
+
+The jobs are CPU-bound (mostly writing the workbooks), so workers only
+help with as many free CPUs; on one CPU extra workers just take turns.
+
+Run from the repository root:
+    python -m benchmarks.bench_job_queue
+    python -m benchmarks.bench_job_queue --processes 2 4 8
+"""
+import os
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from f00_read_configs import read_config_except_columns
+from f01_remove_rows import run_removal_automation
+from job_queue import JobQueue, enqueue_run, run_workers
+from benchmarks.datagen import CONFIG_SHEET_NAME, build_input_frame, write_config_workbook, write_input_file
+
+
+INPUTS = 16
+OUTPUTS = 8
+ROWS = 5000
+
+# Lease of the crashed worker, and how often the others look for expired leases
+CRASH_LEASE_SECONDS = 1.0
+POLL_SECONDS = 0.2
+
+
+def write_workload(root):
+    (root / 'input').mkdir(parents=True, exist_ok=True)
+    inputs = []
+    for i in range(INPUTS):
+        path = Path('input') / f"input_{i:02d}.csv"
+        write_input_file(root / path, '.csv', build_input_frame(ROWS, header_offset=50, seed=i))
+        inputs.append(path)
+    config_file = root / 'bench_config.xlsx'
+    write_config_workbook(config_file, inputs, config_rows=2 * INPUTS,
+                          output_file_name=[f"out_{i}.xlsx" for i in range(OUTPUTS)])
+    return config_file
+
+
+def read_outputs(folder):
+    return {path.name: pd.read_excel(path, sheet_name=None) for path in sorted(folder.glob('*.xlsx'))}
+
+
+def assert_same_outputs(result, expected):
+    assert list(result) == list(expected)
+    for name, sheets in expected.items():
+        assert list(result[name]) == list(sheets), name
+        for sheet, df in sheets.items():
+            pd.testing.assert_frame_equal(result[name][sheet], df)
+
+
+def drain(root, config_file, processes, crash=False):
+    """ Enqueue the sheet and run processes workers on it; return the seconds and the jobs of the run. """
+    queue_path = root / f"queue_{processes}{'_crash' if crash else ''}.sqlite"
+    run_id = enqueue_run(queue_path, root, config_file.name, CONFIG_SHEET_NAME)
+    queue = JobQueue(queue_path)
+    if crash:
+        # Claimed by a worker that never reports back
+        queue.claim('crashed-worker', lease_seconds=CRASH_LEASE_SECONDS)
+    start = time.perf_counter()
+    counts = run_workers(queue_path, processes, poll_seconds=POLL_SECONDS)
+    seconds = time.perf_counter() - start
+    assert counts == {'done': OUTPUTS}, counts
+    return seconds, queue.jobs(run_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        config_file = write_workload(root)
+
+        file_records, _, _ = read_config_except_columns(root, config_file, CONFIG_SHEET_NAME, True,
+                                                        {'criteria_value'}, None, as_records=True)
+        start = time.perf_counter()
+        run_removal_automation(file_records, None, root)
+        in_process = time.perf_counter() - start
+        expected = read_outputs(root / 'output')
+        (root / 'output').rename(root / 'output_in_process')
+        print(f"{os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'seconds':>8} {'speedup':>8}  jobs per worker")
+        print(f"{'(none)':>8} {in_process:>8.2f} {1:>7.1f}x")
+
+        for processes in args.processes:
+            seconds, jobs = drain(root, config_file, processes)
+            assert_same_outputs(read_outputs(root / 'output'), expected)
+            (root / 'output').rename(root / f"output_{processes}")
+            per_worker = pd.Series([job['result']['worker'] for job in jobs]).value_counts().sort_index()
+            print(f"{processes:>8} {seconds:>8.2f} {in_process / seconds:>7.1f}x  {' '.join(map(str, per_worker))}")
+
+        seconds, jobs = drain(root, config_file, max(args.processes), crash=True)
+        assert_same_outputs(read_outputs(root / 'output'), expected)
+        reclaimed = [job for job in jobs if job['attempts'] > 1]
+        assert len(reclaimed) == 1, reclaimed
+        print(f"crash of a worker holding job {reclaimed[0]['id']}: reclaimed after its lease expired, "
+              f"all {len(jobs)} jobs done in {seconds:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
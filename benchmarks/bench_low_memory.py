@@ -0,0 +1,71 @@
+"""
+Memory and parity check for the low-memory mode of run_removal_automation.
+
+A wide, repetitive synthetic input is processed with and without
+low_memory. The frames after filtering must hold the same cells, the .csv
+outputs must be byte-identical and the .xlsx outputs must read back equal;
+the frame memory before and after compaction is printed from the run report.
+
+Run from the repository root:
+    python -m benchmarks.bench_low_memory
+"""
+import contextlib
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from f00_read_configs import read_config_except_columns
+from f01_memory import expand_frame
+from f01_remove_rows import process_input_file, run_removal_automation
+from benchmarks.datagen import generate_dataset
+
+
+CASES = [('.csv', 100000, 16), ('.xlsx', 20000, 16)]
+
+
+def run(dataset, output_file_name, low_memory):
+    file_config_df, cal_df, _ = read_config_except_columns(
+        dataset['base_path'], dataset['config_file'], dataset['sheet_name'], True, {'criteria_value'}, None)
+    file_config_df['output_file_name'] = output_file_name
+    report_path = dataset['base_path'] / f"report_{low_memory}.json"
+    start = time.perf_counter()
+    run_removal_automation(file_config_df, cal_df, dataset['base_path'], low_memory=low_memory,
+                           report_path=report_path)
+    seconds = time.perf_counter() - start
+    with open(report_path, encoding='utf-8') as f:
+        return seconds, json.load(f)['summary'].get('memory')
+
+
+def main():
+    print(f"{'type':>6} {'rows':>7} {'output':>6} {'normal (s)':>11} {'low-mem (s)':>12} "
+          f"{'frame MB before':>16} {'after':>7}")
+    for file_type, rows, columns in CASES:
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                dataset = generate_dataset(tmp, rows=rows, columns=columns, header_offset=100,
+                                           file_type=file_type, criteria=8, config_rows=1)
+                args = (dataset['input_file'], file_type, dataset['input_sheet_name'], dataset['criteria_rows'])
+                expected = process_input_file(*args)
+                compact = process_input_file(*args, low_memory=True)
+            pd.testing.assert_frame_equal(expand_frame(compact), expected, check_dtype=False)
+
+            for output in ('.csv', '.xlsx'):
+                normal_time, _ = run(dataset, f"normal{output}", False)
+                low_time, memory = run(dataset, f"lowmem{output}", True)
+                out_dir = Path(tmp) / 'output'
+                if output == '.csv':
+                    assert ((out_dir / 'normal_Sheet1.csv').read_bytes()
+                            == (out_dir / 'lowmem_Sheet1.csv').read_bytes())
+                else:
+                    pd.testing.assert_frame_equal(pd.read_excel(out_dir / 'lowmem.xlsx'),
+                                                  pd.read_excel(out_dir / 'normal.xlsx'))
+                print(f"{file_type:>6} {rows:>7} {output:>6} {normal_time:>11.3f} {low_time:>12.3f} "
+                      f"{memory['bytes_before'] / 1e6:>16.1f} {memory['bytes_after'] / 1e6:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Peak memory and parity check for the memory budget of run_removal_automation.
+
+A synthetic .csv input is processed with memory_profile set, once without
+a budget and once with a budget below its estimated peak, which streams it
+in chunks sized to the budget. The outputs must be equal; the traced peaks
+are printed from the run reports. An .xlsx input over the budget cannot be
+streamed, so that run must fail with MemoryBudgetError before reading it.
+
+Run from the repository root:
+    python -m benchmarks.bench_memory_budget
+"""
+import contextlib
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from f00_read_configs import read_config_except_columns
+from f01_memory import estimate_peak_bytes
+from f01_remove_rows import MemoryBudgetError, run_removal_automation
+from benchmarks.datagen import generate_dataset
+
+
+CASES = [('.csv', 100000, 16)]
+XLSX_CASE = ('.xlsx', 10000, 16)
+
+# Budget as a share of the estimated peak of the input
+BUDGET_SHARE = 0.25
+
+
+def run(dataset, output_file_name, memory_budget):
+    file_config_df, cal_df, _ = read_config_except_columns(
+        dataset['base_path'], dataset['config_file'], dataset['sheet_name'], True, {'criteria_value'}, None)
+    file_config_df['output_file_name'] = output_file_name
+    report_path = dataset['base_path'] / f"report_{output_file_name}.json"
+    start = time.perf_counter()
+    run_removal_automation(file_config_df, cal_df, dataset['base_path'], report_path=report_path,
+                           memory_profile=True, memory_budget=memory_budget)
+    seconds = time.perf_counter() - start
+    with open(report_path, encoding='utf-8') as f:
+        summary = json.load(f)['summary']
+    return seconds, summary['peak_bytes']['files'][0]['peak_bytes'], summary.get('memory_fallbacks', {})
+
+
+def main():
+    print(f"{'type':>6} {'rows':>7} {'estimate MB':>12} {'budget MB':>10} {'peak MB':>8} "
+          f"{'budget peak MB':>15} {'fallback':>10} {'seconds':>8} {'budget s':>9}")
+    for file_type, rows, columns in CASES:
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                dataset = generate_dataset(tmp, rows=rows, columns=columns, header_offset=100,
+                                           file_type=file_type, criteria=8, config_rows=1)
+            estimate = estimate_peak_bytes(dataset['input_file'], file_type)
+            budget = int(estimate * BUDGET_SHARE)
+
+            seconds, peak, _ = run(dataset, f"full{file_type}", None)
+            budget_seconds, budget_peak, fallbacks = run(dataset, f"budget{file_type}", budget)
+            out_dir = Path(tmp) / 'output'
+            assert (out_dir / 'budget_Sheet1.csv').read_bytes() == (out_dir / 'full_Sheet1.csv').read_bytes()
+            print(f"{file_type:>6} {rows:>7} {estimate / 1e6:>12.1f} {budget / 1e6:>10.1f} {peak / 1e6:>8.1f} "
+                  f"{budget_peak / 1e6:>15.1f} {','.join(fallbacks):>10} {seconds:>8.2f} {budget_seconds:>9.2f}")
+
+    file_type, rows, columns = XLSX_CASE
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            dataset = generate_dataset(tmp, rows=rows, columns=columns, header_offset=100,
+                                       file_type=file_type, criteria=8, config_rows=1)
+        budget = int(estimate_peak_bytes(dataset['input_file'], file_type) * BUDGET_SHARE)
+        try:
+            run(dataset, f"budget{file_type}", budget)
+        except MemoryBudgetError as e:
+            print(f"{file_type:>6} {rows:>7}: {e}")
+        else:
+            raise AssertionError('an .xlsx input over the budget was processed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Parity check and benchmark for the numeric criteria ('> =', '>', '< =', '<').
+
+Numeric columns are compared with the original series-against-float
+filtering. Text columns, as .csv/.txt inputs are read, made that filtering
+raise TypeError; there the baseline converts the column with pd.to_numeric
+for every criteria, and apply_removal_plan must give the same rows from its
+single float64 view.
+
+Run from the repository root:
+    python -m benchmarks.bench_numeric_criteria
+"""
+
+import numpy as np
+import pandas as pd
+
+from f01_remove_rows import apply_removal_plan
+from benchmarks import best_time
+
+
+ROWS = [10000, 100000, 1000000]
+PLAN = [
+    {'applied_column': 'amount', 'criteria_to_remove_row': '> =', 'criteria_value': '900'},
+    {'applied_column': 'amount', 'criteria_to_remove_row': '<', 'criteria_value': 5},
+    {'applied_column': 'amount', 'criteria_to_remove_row': '>', 'criteria_value': '850.5'},
+]
+OPERATIONS = {'> =': '__lt__', '>': '__le__', '< =': '__gt__', '<': '__ge__'}
+
+
+def build_frames(n_rows):
+    rng = np.random.default_rng(0)
+    amount = rng.integers(0, 1000, n_rows).astype(float) + rng.integers(0, 4, n_rows) / 4
+    amount[rng.integers(0, n_rows, n_rows // 50)] = np.nan
+    numeric = pd.DataFrame({'amount': amount})
+
+    # The same column as read from a .csv: text, blanks as NaN and a few words
+    text = pd.Series(amount, dtype=object).map(lambda x: x if pd.isna(x) else f"{x:g}")
+    text[rng.integers(0, n_rows, n_rows // 100)] = 'n/a'
+    return numeric, pd.DataFrame({'amount': text})
+
+
+def legacy_apply_plan(df, plan, to_numeric=False):
+    """ The original per-criteria filtering, optionally converting the column every time. """
+    for criteria in plan:
+        series = df[criteria['applied_column']]
+        if to_numeric:
+            series = pd.to_numeric(series, errors='coerce')
+        keep = getattr(series, OPERATIONS[criteria['criteria_to_remove_row']])(float(criteria['criteria_value']))
+        df = df[keep.to_numpy(dtype=bool, na_value=False)]
+    return df
+
+
+def main():
+    print(f"{'rows':>8} {'column':>8} {'legacy (s)':>11} {'typed (s)':>10} {'speedup':>8}")
+    for n_rows in ROWS:
+        numeric, text = build_frames(n_rows)
+        for name, df, to_numeric in (('numeric', numeric, False), ('text', text, True)):
+            legacy_time, expected = best_time(legacy_apply_plan, df, PLAN, to_numeric)
+            new_time, result = best_time(apply_removal_plan, df, PLAN)
+            pd.testing.assert_frame_equal(result, expected)
+            print(f"{n_rows:>8} {name:>8} {legacy_time:>11.4f} {new_time:>10.4f} {legacy_time / new_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Stage-by-stage benchmark of the removal pipeline on synthetic data.
+
+For every scale and input file type a dataset is generated with
+benchmarks.datagen and these stages are timed separately (best of --repeat):
+
+    read_config_except_columns   parse and split the config sheet
+    read_input_file_type         read the input with header=None
+    find_header_row_index        locate the header row
+    apply_removal_criteria       compile and apply the criteria of the class
+    process_input_file           the three steps above as run_removal_automation does them
+    write_excel                  write the filtered frame and save the workbook
+
+Results are saved as JSON; pass an earlier result file with --compare to
+print the ratio against it.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --scales small medium --output bench_pipeline.json
+    python -m benchmarks.bench_pipeline --compare bench_pipeline.json
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from f00_read_configs import read_config_except_columns
+from f01_remove_rows import (read_input_file_type, normalize_text, find_header_row_index, promote_header_row,
+                             compile_removal_criteria, apply_removal_plan, process_input_file)
+from f01_output_writers import write_sheet, close_workbooks
+from benchmarks import best_time
+from benchmarks.datagen import INPUT_FILE_TYPES, HEADER_VALUES, generate_dataset
+
+
+SCALES = {
+    'small': {'rows': 1000, 'columns': 6, 'header_offset': 10, 'criteria': 5, 'config_rows': 10},
+    'medium': {'rows': 20000, 'columns': 12, 'header_offset': 200, 'criteria': 10, 'config_rows': 100},
+    'large': {'rows': 200000, 'columns': 24, 'header_offset': 2000, 'criteria': 20, 'config_rows': 1000},
+}
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_stages(dataset, repeat):
+    """ Time every stage on one dataset; return {stage: seconds}. """
+    header_values = [normalize_text(value) for value in HEADER_VALUES.split(',')]
+    criteria_rows = dataset['criteria_rows']
+    timings = {}
+
+    timings['read_config_except_columns'], _ = best_time(lambda: read_config_except_columns(
+        dataset['base_path'], dataset['config_file'], dataset['sheet_name'], True, {'criteria_value'}, None),
+        repeat=repeat)
+
+    timings['read_input_file_type'], raw = best_time(lambda: read_input_file_type(
+        dataset['input_file'], dataset['input_file_type'], dataset['input_sheet_name']), repeat=repeat)
+
+    timings['find_header_row_index'], header_row_index = best_time(
+        lambda: find_header_row_index(raw, header_values), repeat=repeat)
+    assert header_row_index == dataset['header_row_index'], header_row_index
+
+    df = promote_header_row(raw, header_values)
+    timings['apply_removal_criteria'], filtered = best_time(
+        lambda: apply_removal_plan(df, compile_removal_criteria(criteria_rows)), repeat=repeat)
+
+    timings['process_input_file'], processed = best_time(lambda: process_input_file(
+        dataset['input_file'], dataset['input_file_type'], dataset['input_sheet_name'], criteria_rows),
+        repeat=repeat)
+    assert len(processed) == len(filtered), (len(processed), len(filtered))
+
+    output_file_path = dataset['base_path'] / 'output' / 'bench_output.xlsx'
+    output_file_path.parent.mkdir(exist_ok=True)
+
+    def write_excel():
+        excel_writers = {}
+        write_sheet(excel_writers, output_file_path, 'Sheet1', filtered)
+        close_workbooks(excel_writers)
+
+    timings['write_excel'], _ = best_time(write_excel, repeat=repeat)
+    return timings
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(record):
+    return (record['scale'], record['file_type'], record['stage'])
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {result_key(record): record['seconds'] for record in json.load(f)['results']}
+
+    print(f"\ncompared with {baseline_path}")
+    print(f"{'scale':>7} {'type':>5} {'stage':>27} {'baseline (s)':>13} {'now (s)':>9} {'ratio':>7}")
+    for record in results:
+        before = baseline.get(result_key(record))
+        if before is None:
+            continue
+        print(f"{record['scale']:>7} {record['file_type']:>5} {record['stage']:>27} "
+              f"{before:>13.4f} {record['seconds']:>9.4f} {record['seconds'] / before:>6.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['small', 'medium'])
+    parser.add_argument('--file-types', nargs='+', choices=INPUT_FILE_TYPES, default=list(INPUT_FILE_TYPES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', type=Path, default=Path('bench_pipeline.json'),
+                        help='where to save the JSON results')
+    parser.add_argument('--compare', type=Path, help='earlier JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'scale':>7} {'type':>5} {'stage':>27} {'seconds':>9}")
+    for scale in args.scales:
+        for file_type in args.file_types:
+            with tempfile.TemporaryDirectory() as tmp:
+                dataset = generate_dataset(tmp, file_type=file_type, **SCALES[scale])
+                for stage, seconds in run_stages(dataset, args.repeat).items():
+                    results.append({'scale': scale, 'file_type': file_type, 'stage': stage,
+                                    'seconds': seconds, **SCALES[scale]})
+                    print(f"{scale:>7} {file_type:>5} {stage:>27} {seconds:>9.4f}")
+
+    # Read the baseline before writing, in case both point at the same file
+    if args.compare is not None:
+        print_comparison(results, args.compare)
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    print(f"\nresults saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
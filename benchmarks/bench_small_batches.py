@@ -0,0 +1,79 @@
+"""
+Many small inputs of one class: one file at a time versus batches.
+
+A feed of small .csv files sharing a layout (plus a few with the header
+row further down, which process_input_batch leaves to the per-file path)
+is run through run_removal_automation with and without batch_size, each
+file written to its own .csv output sheet. The outputs must be identical.
+
+Run from the repository root:
+    python -m benchmarks.bench_small_batches
+    python -m benchmarks.bench_small_batches --files 1000 --batch-size 250
+"""
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from f00_read_configs import read_config_except_columns
+from f01_remove_rows import run_removal_automation
+from benchmarks.datagen import CONFIG_SHEET_NAME, build_input_frame, write_config_workbook, write_input_file
+
+
+FILE_COUNTS = [100, 1000]
+ROWS = 40
+HEADER_OFFSET = 3
+
+# Every this many files has its header row one line lower
+OTHER_LAYOUT_EVERY = 50
+
+
+def write_feed(root, files, file_type='.csv'):
+    """ Write files small inputs and a config listing them; return the config path. """
+    (root / 'input').mkdir(parents=True, exist_ok=True)
+    inputs = []
+    for i in range(files):
+        header_offset = HEADER_OFFSET + (i % OTHER_LAYOUT_EVERY == OTHER_LAYOUT_EVERY - 1)
+        path = Path('input') / f"feed_{i:05d}{file_type}"
+        write_input_file(root / path, file_type, build_input_frame(ROWS, header_offset=header_offset, seed=i))
+        inputs.append(path)
+    config_file = root / 'bench_config.xlsx'
+    write_config_workbook(config_file, inputs, output_file_name='feed.csv')
+    return config_file
+
+
+def run(root, file_records, output_folder, batch_size):
+    file_records = [record._replace(output_file_path=root / output_folder / 'feed.csv') for record in file_records]
+    start = time.perf_counter()
+    run_removal_automation(file_records, None, root, batch_size=batch_size)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--files', type=int, nargs='+', default=FILE_COUNTS)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    print(f"{'files':>6} {'one by one (s)':>15} {'batched (s)':>12} {'speedup':>8}")
+    for files in args.files:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            config_file = write_feed(root, files)
+            file_records, _, _ = read_config_except_columns(root, config_file, CONFIG_SHEET_NAME, True,
+                                                            {'criteria_value'}, None, as_records=True)
+            single = run(root, file_records, 'single', None)
+            batched = run(root, file_records, 'batched', args.batch_size)
+
+            expected = sorted((root / 'single').iterdir())
+            result = sorted((root / 'batched').iterdir())
+            assert [p.name for p in result] == [p.name for p in expected]
+            for path, expected_path in zip(result, expected):
+                assert path.read_bytes() == expected_path.read_bytes(), path.name
+            print(f"{files:>6} {single:>15.3f} {batched:>12.3f} {single / batched:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
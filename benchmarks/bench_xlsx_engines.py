@@ -0,0 +1,98 @@
+"""
+Parity check and benchmark for the .xlsx input engines of read_input_file_type.
+
+Every sheet of the workbooks shipped with the repository is read with each
+engine and compared with pd.read_excel(header=None), then a synthetic sheet
+is timed end to end through process_input_file.
+
+Run from the repository root:
+    python -m benchmarks.bench_xlsx_engines
+"""
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from f01_remove_rows import XLSX_ENGINES, resolve_xlsx_engine, read_input_file_type, process_input_file
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PARITY_WORKBOOKS = [
+    REPO_ROOT / 'read_workflow_config_test.xlsx',
+    REPO_ROOT / 'abc' / 'Sample_for_test_process_data_Q1&Q2.xlsx',
+    REPO_ROOT / 'abc' / 'Sample_for_test_process_data_Q3&Q4.xlsx',
+]
+SYNTHETIC_ROWS = 50000
+HEADER_OFFSET = 500
+
+
+def available_engines():
+    engines = []
+    for engine in XLSX_ENGINES:
+        if engine == 'auto':
+            continue
+        try:
+            if engine == 'calamine':
+                import python_calamine  # noqa: F401
+        except ImportError:
+            continue
+        engines.append(engine)
+    return engines
+
+
+def check_parity(engines):
+    for workbook in PARITY_WORKBOOKS:
+        for sheet_name in pd.ExcelFile(workbook).sheet_names:
+            expected = pd.read_excel(workbook, sheet_name=sheet_name, header=None)
+            for engine in engines:
+                result = read_input_file_type(workbook, '.xlsx', sheet_name, xlsx_engine=engine)
+                pd.testing.assert_frame_equal(result, expected, obj=f"{workbook.name}[{sheet_name}] ({engine})")
+        print(f"parity ok: {workbook.name}")
+
+
+def build_workbook(path):
+    rng = np.random.default_rng(0)
+    filler = [[f"Report line {i}"] + [None] * 5 for i in range(HEADER_OFFSET)]
+    header = [['year_month', 'Year quarter', 'year 6M', 'staff username', 'position', 'SLKH_quan_ly']]
+    data = [[202201 + i % 12, '2023.Q1', '2023.6F', f"staff{i % 300:04d}",
+             ['MG', 'Nhân viên', 'TP'][i % 3], float(rng.normal())]
+            for i in range(SYNTHETIC_ROWS)]
+    data.append(['Total', None, None, None, None, None])
+    pd.DataFrame(filler + header + data).to_excel(path, sheet_name='MG', header=False, index=False)
+
+
+def main():
+    engines = available_engines()
+    print(f"engines: {', '.join(engines)} (auto -> {resolve_xlsx_engine('auto')})")
+    check_parity(engines)
+
+    criteria_rows = pd.DataFrame({
+        'linked_input_class': ['a', 'a'],
+        'remove_rows_list': ['position, year_month', np.nan],
+        'applied_column': ['year_month', 'position'],
+        'criteria_to_remove_row': ['=', 'contain'],
+        'criteria_value': ['Total', 'M'],
+    })
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'synthetic.xlsx'
+        build_workbook(path)
+
+        results = {}
+        print(f"{'engine':>10} {'process_input_file (s)':>24}")
+        for engine in engines:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[engine] = process_input_file(path, '.xlsx', 'MG', criteria_rows, xlsx_engine=engine)
+            print(f"{engine:>10} {time.perf_counter() - start:>24.3f}")
+
+        for engine in engines:
+            pd.testing.assert_frame_equal(results[engine], results['pandas'], obj=engine)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Synthetic config workbooks and input files for the benchmarks.
+
+The config sheet has the layout of F001_(4) in read_workflow_config_test.xlsx
+(six rows above the header, then the file zone and the criteria zone side by
+side), and the input files look like the vendor exports it points at: report
+lines above the header row, then data rows ending in 'Total' and
+'Applied filters:' lines that the criteria remove.
+
+Example:
+    from benchmarks.datagen import generate_dataset
+    dataset = generate_dataset(tmp_dir, rows=10000, columns=12, header_offset=200,
+                               file_type='.csv', criteria=6)
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+INPUT_FILE_TYPES = ('.xlsx', '.csv', '.txt')
+BASE_HEADER = ['year_month', 'Year quarter', 'year 6M', 'staff username', 'position', 'SLKH_quan_ly']
+HEADER_VALUES = 'POsition,    year_month'
+CONFIG_SHEET_NAME = 'F001_(4)'
+CONTROL_SHEET_NAME = 'Workflow'
+INPUT_SHEET_NAME = 'MG'
+CONFIG_SKIPROWS = 6
+
+# Criteria of the sample config first, then '=' criteria on the extra columns
+BASE_CRITERIA = [
+    ('year_month', '=', 'Applied filters:'),
+    ('position', 'contain', 'M'),
+    ('year_month', '=', 'Total'),
+    ('staff username', 'contain', '^tmp'),
+    ('Year quarter', '=', '2023.Q9'),
+]
+
+
+def input_header(columns):
+    """ Header row of an input with the given number of columns (at least the six base columns). """
+    return BASE_HEADER + [f"metric_{i}" for i in range(max(columns - len(BASE_HEADER), 0))]
+
+
+def build_input_frame(rows, columns=len(BASE_HEADER), header_offset=0, seed=0):
+    """ An input sheet as read with header=None: report lines, header row, data rows and footer lines. """
+    rng = np.random.default_rng(seed)
+    header = input_header(columns)
+    n_cols = len(header)
+
+    # Vendor exports repeat a small pool of staff, positions and periods
+    data = {
+        0: (202201 + np.arange(rows) % 12).astype(object),
+        1: np.array(['2023.Q1', '2023.Q2'], dtype=object)[np.arange(rows) % 2],
+        2: np.full(rows, '2023.6F', dtype=object),
+        3: np.array([f"staff{i:04d}" for i in range(300)] + ['tmp0001'], dtype=object)[rng.integers(0, 301, rows)],
+        4: np.array(['MG', 'Nhân viên', 'TP'], dtype=object)[rng.integers(0, 3, rows)],
+        5: rng.integers(100, 200, rows).astype(object),
+    }
+    for col in range(len(BASE_HEADER), n_cols):
+        data[col] = rng.normal(size=rows).round(4).astype(object)
+    body = pd.DataFrame(data)
+
+    filler = pd.DataFrame([[f"Report line {i}"] + [np.nan] * (n_cols - 1) for i in range(header_offset)])
+    footer = pd.DataFrame([['Total'] + [np.nan] * (n_cols - 1),
+                           ['Applied filters:'] + [np.nan] * (n_cols - 1)])
+    return pd.concat([filler, pd.DataFrame([header]), body, footer], ignore_index=True)
+
+
+def write_input_file(path, file_type, frame, sheet_name=INPUT_SHEET_NAME):
+    """ Write frame (header=None layout) as an input file of file_type. """
+    if file_type == '.xlsx':
+        frame.to_excel(path, sheet_name=sheet_name, header=False, index=False)
+    elif file_type == '.csv':
+        frame.to_csv(path, header=False, index=False)
+    elif file_type == '.txt':
+        frame.to_csv(path, sep='\t', header=False, index=False)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def build_criteria_rows(criteria, columns=len(BASE_HEADER), input_class='a'):
+    """ criteria cal_df rows for input_class, the first carrying remove_rows_list. """
+    extra = input_header(columns)[len(BASE_HEADER):]
+    templates = BASE_CRITERIA + [(col, '=', f"missing_{col}") for col in extra]
+    rows = []
+    for i in range(criteria):
+        applied_column, operation, value = templates[i % len(templates)]
+        rows.append({
+            'linked_input_class': input_class,
+            'remove_rows_list': HEADER_VALUES if i == 0 else np.nan,
+            'applied_column': applied_column,
+            'criteria_to_remove_row': operation,
+            'criteria_value': value,
+        })
+    return pd.DataFrame(rows)
+
+
+def write_config_workbook(path, input_files, criteria=len(BASE_CRITERIA), columns=len(BASE_HEADER),
+                          config_rows=None, output_file_name='bench_output.xlsx'):
+    """
+    Write a config workbook with one F001_(4) style sheet.
+
+    input_files are paths relative to the config folder; with config_rows the
+    file zone is padded to that many rows by listing the inputs again (each
+    with its own output sheet). output_file_name may also be a list, taken
+    in turn by the rows.
+    """
+    input_files = [Path(p) for p in input_files]
+    output_file_names = [output_file_name] if isinstance(output_file_name, str) else list(output_file_name)
+    n_files = max(config_rows or len(input_files), len(input_files))
+    file_zone = pd.DataFrame([{
+        'input_folder_path': str(input_files[i % len(input_files)].parent),
+        'input_file_name': input_files[i % len(input_files)].name,
+        'input_file_type': input_files[i % len(input_files)].suffix,
+        'input_sheet_name': INPUT_SHEET_NAME,
+        'output_folder_path': 'output',
+        'output_file_name': output_file_names[i % len(output_file_names)],
+        'output_sheet_name': f"Sheet{i + 1}",
+        'base_input_class': 'A',
+    } for i in range(n_files)])
+
+    criteria_zone = build_criteria_rows(criteria, columns)
+    criteria_zone['Num'] = np.arange(1, len(criteria_zone) + 1)
+
+    config = pd.concat([file_zone, criteria_zone], axis=1)
+    config.to_excel(path, sheet_name=CONFIG_SHEET_NAME, startrow=CONFIG_SKIPROWS, index=False)
+
+
+def write_control_sheet(path, functions, sheet_name=CONTROL_SHEET_NAME):
+    """
+    Add a workflow control sheet to the config workbook at path.
+
+    functions are (Function, Active, Order, Time.sleep (s)) tuples, e.g.
+    ('F001_(4)', 1, 1, 0), as get_active_functions_sorted reads them.
+    """
+    control = pd.DataFrame(functions, columns=['Function', 'Active', 'Order', 'Time.sleep (s)'])
+    with pd.ExcelWriter(path, mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
+        control.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def generate_dataset(root, rows, columns=len(BASE_HEADER), header_offset=0, file_type='.xlsx',
+                     criteria=len(BASE_CRITERIA), config_rows=None, seed=0):
+    """
+    Write one input file and a config workbook pointing at it under root.
+
+    Returns a dict with the paths and the arguments needed by the pipeline
+    functions (config_file, sheet_name, input_file, criteria_rows, ...).
+    """
+    if file_type not in INPUT_FILE_TYPES:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    root = Path(root)
+    (root / 'input').mkdir(parents=True, exist_ok=True)
+
+    input_file = root / 'input' / f"bench_{rows}x{columns}{file_type}"
+    frame = build_input_frame(rows, columns, header_offset, seed)
+    write_input_file(input_file, file_type, frame)
+
+    config_file = root / 'bench_config.xlsx'
+    write_config_workbook(config_file, [input_file.relative_to(root)], criteria, columns, config_rows)
+
+    return {
+        'base_path': root,
+        'config_file': config_file,
+        'sheet_name': CONFIG_SHEET_NAME,
+        'input_file': input_file,
+        'input_file_type': file_type,
+        'input_sheet_name': INPUT_SHEET_NAME,
+        'criteria_rows': build_criteria_rows(criteria, columns),
+        'header_row_index': header_offset,
+    }
@@ -0,0 +1,397 @@
+"""
+Command line entry point of the removal automation.
+
+    python cli.py run --base-path /usr/src/app --sheet 'F001_(4)' --manifest .removal_manifest.json
+    python cli.py validate-config --base-path /usr/src/app --sheet 'F001_(4)'
+    python cli.py explain --base-path /usr/src/app --sheet 'F001_(4)'
+    python cli.py queue enqueue --base-path /shared/app --sheet 'F001_(4)'
+    python cli.py queue work --base-path /shared/app --processes 4
+    python cli.py queue status --base-path /shared/app
+    python cli.py workflow --base-path /usr/src/app --control-sheet Workflow --report workflow_report.json
+    python cli.py bench startup
+    python cli.py bench pipeline --scales small
+
+Only argparse and pathlib are imported up front; pandas, openpyxl and the
+f0x modules are imported by the subcommands that use them, so --help and
+argument errors return at once.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+
+DEFAULT_CONFIG_FILE = 'read_workflow_config_test.xlsx'
+DEFAULT_SHEET = 'F001_(4)'
+
+# Excel row of file_config_df index 0: six skipped rows, then the header row
+FIRST_CONFIG_ROW = 8
+
+# Modules whose cold import time bench startup reports, lightest first
+STARTUP_MODULES = ('cli', 'f00_read_configs', 'f01_remove_rows')
+
+
+def _resolve(base_path, path):
+    return None if path is None else Path(base_path) / path
+
+
+def _budget_bytes(megabytes):
+    return None if megabytes is None else int(megabytes * 1e6)
+
+
+def _read_config(args, as_records=False):
+    from f00_read_configs import read_config_except_columns
+
+    cache_dir = None if args.no_cache else _resolve(args.base_path, args.cache_dir)
+    return read_config_except_columns(args.base_path, _resolve(args.base_path, args.config_file), args.sheet,
+                                      lower_case_except_file_zone=True, execpt_cal_df_columns={"criteria_value"},
+                                      cache_dir=cache_dir, as_records=as_records)
+
+
+def _processing_options(args):
+    """ run_removal_automation options of the arguments added by _add_processing_arguments. """
+    return dict(workers=args.workers, chunksize=args.chunksize, xlsx_engine=args.xlsx_engine,
+                low_memory=args.low_memory, memory_profile=args.memory_profile,
+                memory_budget=_budget_bytes(args.memory_budget_mb), batch_size=args.batch_size,
+                input_cache_bytes=_budget_bytes(args.input_cache_mb))
+
+
+def command_run(args):
+    if args.watch:
+        from watch_service import RemovalWatcher
+
+        RemovalWatcher(args.base_path, args.config_file, args.sheet,
+                       cache_dir=None if args.no_cache else _resolve(args.base_path, args.cache_dir),
+                       manifest_path=_resolve(args.base_path, args.manifest),
+                       report_path=_resolve(args.base_path, args.report),
+                       **_processing_options(args)).serve_forever()
+        return 0
+
+    from f01_remove_rows import run_removal_automation
+
+    file_records, _, _ = _read_config(args, as_records=True)
+    run_removal_automation(file_records, None, args.base_path,
+                           manifest_path=_resolve(args.base_path, args.manifest), force_rebuild=args.force_rebuild,
+                           report_path=_resolve(args.base_path, args.report), **_processing_options(args))
+    return 0
+
+
+def command_queue(args):
+    import job_queue
+
+    queue_path = _resolve(args.base_path or Path('.'), args.queue)
+    if args.action == 'enqueue':
+        run_id = job_queue.enqueue_run(queue_path, args.base_path, args.config_file, args.sheet,
+                                       cache_dir=None if args.no_cache else _resolve(args.base_path, args.cache_dir),
+                                       max_attempts=args.max_attempts)
+        print(run_id)
+        return 0
+
+    if args.action == 'work':
+        if args.base_path is not None and not args.base_path.is_dir():
+            print(f"error: base path not found: {args.base_path}")
+            return 1
+        options = dict(_processing_options(args), lease_seconds=args.lease_seconds, keep_running=args.keep_running,
+                       base_path=args.base_path)
+        if args.processes > 1:
+            counts = job_queue.run_workers(queue_path, args.processes, **options)
+        else:
+            job_queue.run_worker(queue_path, **options)
+            counts = job_queue.JobQueue(queue_path).counts()
+        return 1 if counts.get('failed') else 0
+
+    queue = job_queue.JobQueue(queue_path)
+    if args.retry_failed:
+        print(f"{queue.retry_failed(args.run_id)} failed jobs put back")
+    for job in queue.jobs(args.run_id):
+        detail = job['error'] or job['lease_owner'] or ''
+        if job['result']:
+            detail = (f"{job['result']['files_processed']} files, {job['result']['output_rows']} rows out "
+                      f"in {job['result']['seconds']:.1f}s by {job['result']['worker']}")
+        print(f"{job['id']:>5} {job['run_id']} {job['status']:<8} {job['attempts']}/{job['max_attempts']} "
+              f"{job['output_key']}  {detail}")
+    print(', '.join(f"{count} {status}" for status, count in sorted(queue.counts(args.run_id).items())))
+    return 0
+
+
+def command_workflow(args):
+    from f00_read_configs import get_active_functions_sorted
+    from workflow_scheduler import function_id, removal_step, run_workflow
+
+    parallel_steps = args.parallel_steps
+    if args.memory_profile or args.input_cache_mb:
+        # tracemalloc and the parsed input cache are shared by every thread of the process
+        if parallel_steps is not None and parallel_steps > 1:
+            print("error: --memory-profile and --input-cache-mb run one function at a time, "
+                  "they cannot be used with --parallel-steps above 1")
+            return 1
+        parallel_steps = 1
+
+    config_file = _resolve(args.base_path, args.config_file)
+    try:
+        active_functions = get_active_functions_sorted(args.base_path, args.config_file, args.control_sheet)
+    except KeyError as e:
+        print(f"error: {args.control_sheet} is not a control sheet, missing column {e}")
+        return 1
+    # The Function cell of an F001 row names its function sheet, e.g. F001_(4)
+    steps = {}
+    for function in active_functions:
+        if function_id(function['Function']) == 'F001':
+            sheet = str(function['Function'])
+            steps[sheet] = removal_step(args.base_path, config_file, sheet,
+                                        cache_dir=None if args.no_cache else _resolve(args.base_path, args.cache_dir),
+                                        **_processing_options(args))
+    records = run_workflow(active_functions, steps, workers=parallel_steps,
+                           report_path=_resolve(args.base_path, args.report))
+    return 1 if any(record['status'] in ('failed', 'skipped') for record in records) else 0
+
+
+def _config_problems(file_config_df, cal_df, base_path):
+    """ (level, where, message) for everything in the function sheet that a run would trip over or ignore. """
+    import re
+    import pandas as pd
+    from f01_remove_rows import CRITERIA_OPERATIONS, INPUT_FILE_TYPES, resolve_file_paths
+
+    problems = []
+    file_columns = ('input_folder_path', 'input_file_name', 'input_file_type', 'output_folder_path',
+                    'output_file_name', 'base_input_class')
+    criteria_columns = ('linked_input_class', 'remove_rows_list', 'applied_column', 'criteria_to_remove_row',
+                        'criteria_value')
+    missing = [col for col in file_columns if col not in file_config_df.columns]
+    missing += [col for col in criteria_columns if col not in cal_df.columns]
+    if missing:
+        return [('error', 'sheet', f"missing columns: {', '.join(missing)}")]
+
+    criteria_classes = set(cal_df['linked_input_class'].dropna())
+    file_classes = set()
+    for label, file_info in file_config_df.iterrows():
+        where = f"file row {label + FIRST_CONFIG_ROW}"
+        if pd.isna(file_info['input_folder_path']) or pd.isna(file_info['input_file_name']):
+            continue
+        file_classes.add(file_info['base_input_class'])
+        if file_info['input_file_type'] not in INPUT_FILE_TYPES:
+            problems.append(('error', where, f"unsupported input_file_type {file_info['input_file_type']!r}"))
+            continue
+        if pd.isna(file_info['output_folder_path']) or pd.isna(file_info['output_file_name']):
+            problems.append(('error', where, "no output_folder_path / output_file_name"))
+            continue
+        input_file_path, _ = resolve_file_paths(file_info, Path(base_path))
+        if not input_file_path.is_file():
+            problems.append(('warning', where, f"input file not found: {input_file_path}"))
+        if file_info['base_input_class'] not in criteria_classes:
+            problems.append(('warning', where, f"no criteria for class {file_info['base_input_class']!r}"))
+
+    # The header values of a class are the remove_rows_list of its first criteria row
+    classes = cal_df.dropna(subset=['linked_input_class'])
+    for label, criteria in classes.groupby('linked_input_class', sort=False).head(1).iterrows():
+        if not isinstance(criteria['remove_rows_list'], str):
+            problems.append(('error', f"criteria row {label + FIRST_CONFIG_ROW}",
+                             f"first row of class {criteria['linked_input_class']!r} has no remove_rows_list, "
+                             f"its header row cannot be found"))
+
+    for label, criteria in cal_df.iterrows():
+        where = f"criteria row {label + FIRST_CONFIG_ROW}"
+        if pd.isna(criteria['linked_input_class']):
+            continue
+        operation, value = criteria['criteria_to_remove_row'], criteria['criteria_value']
+        if criteria['linked_input_class'] not in file_classes:
+            problems.append(('warning', where, f"class {criteria['linked_input_class']!r} is not used by any file"))
+        if pd.isna(criteria['applied_column']):
+            # A row that only carries remove_rows_list is expected
+            if pd.isna(criteria['remove_rows_list']):
+                problems.append(('warning', where, "no applied_column, criteria is ignored"))
+        elif operation not in CRITERIA_OPERATIONS:
+            problems.append(('warning', where, f"unknown criteria_to_remove_row {operation!r}, criteria is ignored"))
+        elif operation == 'contain' and isinstance(value, str):
+            try:
+                re.compile(value)
+            except re.error as e:
+                problems.append(('error', where, f"invalid regex {value!r}: {e}"))
+        elif operation not in ('=', 'contain'):
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                problems.append(('error', where, f"criteria_value {value!r} is not a number"))
+    return problems
+
+
+def command_validate_config(args):
+    from f00_read_configs import ConfigWorkbook
+
+    config_path = _resolve(args.base_path, args.config_file)
+    if not config_path.is_file():
+        print(f"error: config file not found: {config_path}")
+        return 1
+    with ConfigWorkbook(config_path) as workbook:
+        if args.sheet not in workbook.sheet_names:
+            print(f"error: {config_path} has no sheet {args.sheet!r}")
+            return 1
+
+    file_config_df, cal_df, _ = _read_config(args)
+    problems = _config_problems(file_config_df, cal_df, args.base_path)
+    for level, where, message in problems:
+        print(f"{level}: {where}: {message}")
+    errors = sum(level == 'error' for level, _, _ in problems)
+    print(f"{args.sheet}: {len(file_config_df)} file rows, {len(cal_df)} criteria rows, "
+          f"{errors} errors, {len(problems) - errors} warnings")
+    return 1 if errors else 0
+
+
+def command_explain(args):
+    import pandas as pd
+    from f00_read_configs import ConfigIndex, get_cal
+    from f01_remove_rows import compile_removal_criteria, describe_criteria, resolve_file_paths
+
+    file_config_df, cal_df, mapping_zone_df = _read_config(args)
+    config_index = ConfigIndex(cal_df, mapping_zone_df)
+    for _, file_info in file_config_df.iterrows():
+        if pd.isna(file_info['input_folder_path']) or pd.isna(file_info['input_file_name']):
+            continue
+        input_file_path, output_file_path = resolve_file_paths(file_info, Path(args.base_path))
+        found = '' if input_file_path.is_file() else '  (not found)'
+        print(f"{input_file_path} [{file_info.get('input_sheet_name')}]{found}")
+        print(f"  -> {output_file_path} [{file_info.get('output_sheet_name', 'Sheet1')}]")
+        plan = compile_removal_criteria(get_cal(file_info, config_index))
+        if not plan:
+            print(f"  no criteria for class {file_info['base_input_class']!r}: the file is skipped")
+        for position, criteria in enumerate(plan, 1):
+            print(f"  {position}. {describe_criteria(criteria)}")
+    return 0
+
+
+def _import_seconds(module, repeat):
+    """ Best wall time of a fresh interpreter importing module. """
+    import subprocess
+    import time
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f"import {module}"], check=True, cwd=Path(__file__).parent)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def command_bench(args):
+    if args.name == 'startup':
+        baseline = _import_seconds('sys', args.repeat)
+        print(f"{'import':>18} {'cold start (s)':>15} {'over python (s)':>16}")
+        print(f"{'(python itself)':>18} {baseline:>15.3f} {0:>16.3f}")
+        for module in STARTUP_MODULES:
+            seconds = _import_seconds(module, args.repeat)
+            print(f"{module:>18} {seconds:>15.3f} {seconds - baseline:>16.3f}")
+        return 0
+
+    import runpy
+
+    sys.argv = [f"benchmarks.bench_{args.name}"] + args.bench_args
+    runpy.run_module(f"benchmarks.bench_{args.name}", run_name='__main__')
+    return 0
+
+
+def _benchmark_names():
+    """ Benchmarks in benchmarks/, found without importing them. """
+    folder = Path(__file__).parent / 'benchmarks'
+    return sorted(path.stem[len('bench_'):] for path in folder.glob('bench_*.py'))
+
+
+def _add_config_arguments(parser, sheet=True):
+    parser.add_argument('--base-path', type=Path, default=Path('.'),
+                        help='folder the config file and the input/output folders are relative to')
+    parser.add_argument('--config-file', default=DEFAULT_CONFIG_FILE)
+    if sheet:
+        parser.add_argument('--sheet', default=DEFAULT_SHEET, help='function sheet to run')
+    parser.add_argument('--cache-dir', default='.config_cache', help='parsed config cache, under --base-path')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the config workbook')
+
+
+def _add_processing_arguments(parser):
+    parser.add_argument('--workers', type=int, help='process pool size for reading and filtering')
+    parser.add_argument('--chunksize', type=int, help='stream .csv/.txt inputs this many rows at a time')
+    parser.add_argument('--xlsx-engine', choices=('auto', 'calamine', 'openpyxl', 'pandas'), default='auto')
+    parser.add_argument('--low-memory', action='store_true', help='keep frames in compact types')
+    parser.add_argument('--memory-profile', action='store_true',
+                        help='record the peak memory of every file and stage (slower)')
+    parser.add_argument('--memory-budget-mb', type=float,
+                        help='stream .csv/.txt files estimated to need more than this in chunks; '
+                             'an .xlsx file over it fails the run')
+    parser.add_argument('--batch-size', type=int,
+                        help='read and filter small .csv/.txt inputs of the same class this many at a time')
+    parser.add_argument('--input-cache-mb', type=float,
+                        help='parse an input read by several rows once, keeping up to this many MB of parsed inputs')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Remove rows from input files as configured in a function sheet.')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='-v for debug logging')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only log warnings and errors')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='process every file of the sheet')
+    _add_config_arguments(run)
+    _add_processing_arguments(run)
+    run.add_argument('--manifest', help='manifest for incremental runs, under --base-path')
+    run.add_argument('--force-rebuild', action='store_true', help='rebuild every sheet even if unchanged')
+    run.add_argument('--report', help='write the JSON run report here, under --base-path')
+    run.add_argument('--watch', action='store_true', help='keep running and process inputs as they change')
+    run.set_defaults(handler=command_run)
+
+    queue = commands.add_parser('queue', help='run the sheet as jobs of a shared SQLite queue, with many workers')
+    actions = queue.add_subparsers(dest='action', required=True)
+    enqueue = actions.add_parser('enqueue', help='add one job per output file of the sheet; prints the run id')
+    _add_config_arguments(enqueue)
+    enqueue.add_argument('--max-attempts', type=int, default=3, help='claims of a job before it is failed')
+    work = actions.add_parser('work', help='claim and run jobs until the queue is drained')
+    work.add_argument('--base-path', type=Path,
+                      help='where this worker sees the shared folder, if not where the jobs were enqueued; '
+                           'the queue is under it')
+    _add_processing_arguments(work)
+    work.add_argument('--processes', type=int, default=1, help='worker processes to start on this machine')
+    work.add_argument('--lease-seconds', type=float, default=300.0,
+                      help='a job whose worker stops renewing its lease this long is claimed again')
+    work.add_argument('--keep-running', action='store_true', help='wait for new runs instead of exiting when idle')
+    status = actions.add_parser('status', help='print every job and the counts per status')
+    status.add_argument('--base-path', type=Path, default=Path('.'))
+    status.add_argument('--run-id', help='only this run')
+    status.add_argument('--retry-failed', action='store_true', help='put the failed jobs back first')
+    for action in (enqueue, work, status):
+        action.add_argument('--queue', default='.job_queue.sqlite', help='queue database, under --base-path')
+    queue.set_defaults(handler=command_queue)
+
+    workflow = commands.add_parser('workflow', help='run the active functions of a control sheet as a dependency graph')
+    _add_config_arguments(workflow, sheet=False)
+    _add_processing_arguments(workflow)
+    workflow.add_argument('--control-sheet', required=True,
+                          help='sheet with Function, Active, Order and Time.sleep (s) columns')
+    workflow.add_argument('--parallel-steps', type=int,
+                          help='functions run at once (default: all that are ready; '
+                               '1 with --memory-profile or --input-cache-mb)')
+    workflow.add_argument('--report', help='write the JSON workflow report here, under --base-path')
+    workflow.set_defaults(handler=command_workflow)
+
+    validate = commands.add_parser('validate-config', help='check the sheet without processing any file')
+    _add_config_arguments(validate)
+    validate.set_defaults(handler=command_validate_config)
+
+    explain = commands.add_parser('explain', help='print what each file row reads, writes and removes')
+    _add_config_arguments(explain)
+    explain.set_defaults(handler=command_explain)
+
+    bench = commands.add_parser('bench', help='cold start times, or a benchmark from benchmarks/')
+    bench.add_argument('name', choices=['startup'] + _benchmark_names())
+    bench.add_argument('--repeat', type=int, default=5, help='startup: best of this many interpreter starts')
+    bench.add_argument('bench_args', nargs=argparse.REMAINDER, help='arguments passed on to the benchmark')
+    bench.set_defaults(handler=command_bench)
+    return parser
+
+
+def main(argv=None):
+    import logging
+
+    args = build_parser().parse_args(argv)
+    level = logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+    logging.basicConfig(level=level, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,287 @@
 import pandas as pd
+import numpy as np
 import os
+import hashlib
+import pickle
+import logging
+import tempfile
 from pathlib import Path
+from collections import namedtuple
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the parsing/normalization in read_config_except_columns changes,
+# so cached results from older code are never served
+CONFIG_CACHE_VERSION = 1
+
+
+class ConfigWorkbook:
+    """
+    Handle on a workflow config workbook that is opened and unzipped once.
+
+    Sheets are parsed lazily on first access and kept, so reading the control
+    sheet plus several F00x_(n) sheets costs one open of the file. Every
+    function in this module that takes a config file path also accepts a
+    ConfigWorkbook in its place.
+
+    Usage:
+        with ConfigWorkbook(base_path / config_file) as workbook:
+            active = get_active_functions_sorted(base_path, workbook, 'Summary')
+            file_config_df, cal_df, mapping_zone_df = read_config_except_columns(
+                base_path, workbook, 'F001_(4)', True, {"criteria_value"})
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._excel_file = None
+        self._sheets = {}
+
+    @property
+    def sheet_names(self):
+        return self._open().sheet_names
+
+    def _open(self):
+        if self._excel_file is None:
+            self._excel_file = pd.ExcelFile(self.path)
+        return self._excel_file
+
+    def read_sheet(self, sheet_name, skiprows=None):
+        """ Return a copy of the parsed sheet, parsing it only on first access. """
+        key = (sheet_name, skiprows)
+        if key not in self._sheets:
+            self._sheets[key] = self._open().parse(sheet_name=sheet_name, skiprows=skiprows)
+        # Callers modify the frames they get back, so never hand out the cached one
+        return self._sheets[key].copy()
+
+    def close(self):
+        if self._excel_file is not None:
+            self._excel_file.close()
+            self._excel_file = None
+        self._sheets.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _group_rows(df, column):
+    """ Map every value of column to the rows of df holding it, in their original order. """
+    if df is None or column not in df.columns:
+        return {}
+    return {key: rows for key, rows in df.groupby(column, sort=False)}
+
+
+class ConfigIndex:
+    """
+    Lookup of the criteria and mapping rows of a config sheet by key.
+
+    Built once from the frames returned by read_config_except_columns, it
+    groups cal_df by linked_input_class and mapping_zone_df by
+    base_mapping_group, so finding the rows of one class or group is a dict
+    lookup instead of a scan of the whole table. get_cal, get_group and
+    run_removal_automation accept a ConfigIndex in place of cal_df /
+    mapping_zone_df.
+
+    Usage:
+        config_index = ConfigIndex(cal_df, mapping_zone_df)
+        criteria_rows = get_cal(file_info, config_index)
+    """
+
+    def __init__(self, cal_df, mapping_zone_df=None):
+        self.cal_df = cal_df
+        self.mapping_zone_df = mapping_zone_df
+        self._criteria = _group_rows(cal_df, 'linked_input_class')
+        self._mapping_rows = _group_rows(mapping_zone_df, 'base_mapping_group')
+
+    @staticmethod
+    def _lookup(groups, df, key):
+        rows = groups.get(key) if not pd.isna(key) else None
+        if rows is None:
+            # Same empty frame a boolean filter without matches returns
+            return df.iloc[0:0].copy()
+        # Callers may modify the rows they get back, so never hand out the indexed frame
+        return rows.copy()
+
+    def criteria_for(self, input_class):
+        """ cal_df rows whose linked_input_class equals input_class. """
+        return self._lookup(self._criteria, self.cal_df, input_class)
+
+    def mapping_rows_for(self, mapping_group):
+        """ mapping_zone_df rows whose base_mapping_group equals mapping_group. """
+        return self._lookup(self._mapping_rows, self.mapping_zone_df, mapping_group)
+
+
+class CriteriaRecord(namedtuple('CriteriaRecord', ['applied_column', 'criteria_to_remove_row', 'criteria_value'])):
+    """
+    One removal criteria, with applied_column already stripped and lower-cased.
+
+    Immutable and without a per-instance __dict__. It can be read by field
+    name like the criteria dicts of compile_removal_criteria
+    (record['applied_column']), so a tuple of records is a removal plan.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return super().__getitem__(key)
+
+
+# The criteria of one linked_input_class: remove_rows_list of its first row
+# (the header values), its removal plan as a tuple of CriteriaRecord, and the
+# cal_df rows themselves (what the run manifest fingerprints)
+ClassCriteria = namedtuple('ClassCriteria', ['input_class', 'remove_rows_list', 'removal_plan', 'criteria_rows'])
+
+# One runnable file_config_df row: resolved paths, and its ClassCriteria (or
+# None when no criteria row has its base_input_class); row is the frame label
+FileRecord = namedtuple('FileRecord', ['row', 'input_file_path', 'input_file_type', 'input_sheet_name',
+                                       'output_file_path', 'output_sheet_name', 'base_input_class', 'criteria'])
+
+
+def resolve_file_paths(file_info, base_path):
+    """ Build the input and output file paths for one file_config_df row. """
+    input_file_path = base_path / file_info['input_folder_path'] / file_info['input_file_name']
+    input_file_path = input_file_path.with_suffix(file_info['input_file_type'] if not input_file_path.suffix else input_file_path.suffix)
+
+    output_file_name = file_info['output_file_name']
+    # Check if the file name has an extension, if not, append '.xlsx'; the
+    # extension picks the output format (see f01_output_writers)
+    if '.' not in output_file_name:
+        output_file_name += '.xlsx'
+
+    output_file_path = base_path / file_info['output_folder_path'] / output_file_name
+    return input_file_path, output_file_path
+
+
+def build_criteria_records(cal_df):
+    """ Map every linked_input_class of cal_df to its ClassCriteria. """
+    criteria = {}
+    for input_class, rows in _group_rows(cal_df, 'linked_input_class').items():
+        # Rows without an applied column only carry remove_rows_list
+        removal_plan = tuple(CriteriaRecord(applied_column.strip().lower(), operation, value)
+                             for applied_column, operation, value in zip(rows['applied_column'],
+                                                                          rows['criteria_to_remove_row'],
+                                                                          rows['criteria_value'])
+                             if not pd.isna(applied_column))
+        criteria[input_class] = ClassCriteria(input_class, rows['remove_rows_list'].iloc[0], removal_plan, rows)
+    return criteria
+
+
+def build_file_records(file_config_df, criteria, base_path):
+    """
+    FileRecord of every runnable file_config_df row, in order.
+
+    Rows without an input folder or file name are left out, as the runner
+    skips them; rows without an input_file_type, output folder or output
+    file name are rejected with a message.
+    """
+    base_path = Path(base_path)
+    records = []
+    for row, file_info in zip(file_config_df.index, file_config_df.to_dict('records')):
+        if pd.isna(file_info.get('input_folder_path')) or pd.isna(file_info.get('input_file_name')):
+            continue
+        if pd.isna(file_info.get('output_folder_path')) or pd.isna(file_info.get('output_file_name')):
+            logger.warning("Skipping config row %s: no output_folder_path / output_file_name", row)
+            continue
+        if pd.isna(file_info.get('input_file_type')):
+            # The type picks the reader, and names the input when its file name has no extension
+            logger.warning("Skipping config row %s: no input_file_type", row)
+            continue
+
+        input_file_path, output_file_path = resolve_file_paths(file_info, base_path)
+        input_class = file_info['base_input_class']
+        records.append(FileRecord(row, input_file_path, file_info['input_file_type'],
+                                  file_info.get('input_sheet_name'), output_file_path,
+                                  file_info.get('output_sheet_name', 'Sheet1'), input_class,
+                                  None if pd.isna(input_class) else criteria.get(input_class)))
+    return tuple(records)
+
+
+def _read_config_sheet(config_file, sheet_name, skiprows=None):
+    """ Read a sheet from a config file path or a ConfigWorkbook. """
+    if isinstance(config_file, ConfigWorkbook):
+        return config_file.read_sheet(sheet_name, skiprows=skiprows)
+    return pd.read_excel(config_file, sheet_name=sheet_name, skiprows=skiprows)
+
+
+def _config_file_path(base_user_path, config_file):
+    """ Resolve config_file against base_user_path unless it is already a ConfigWorkbook. """
+    if isinstance(config_file, ConfigWorkbook):
+        return config_file
+    return base_user_path / config_file
+
+
+def _is_float_text(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def normalize_string_cells(series, lower=False, keep_float_text=False):
+    """
+    Strip (and optionally lower-case) the str cells of a column without a Python call per cell.
+
+    Config columns repeat the same few values, so the column is factorized and
+    each distinct string is normalized once. Non-string cells are left
+    untouched. With keep_float_text, strings that float() accepts are left
+    untouched as well, like read_config's transform.
+    """
+    if series.dtype != object:
+        return series
+
+    codes, uniques = pd.factorize(series)
+    normalized = np.empty(len(uniques) + 1, dtype=object)
+    # The extra trailing slot is what missing cells (code -1) index into
+    is_string = np.zeros(len(uniques) + 1, dtype=bool)
+    for i, value in enumerate(uniques):
+        if isinstance(value, str) and not (keep_float_text and _is_float_text(value)):
+            normalized[i] = value.lower().strip() if lower else value.strip()
+            is_string[i] = True
+
+    cell_is_string = is_string[codes]
+    if not cell_is_string.any():
+        return series
+
+    values = series.to_numpy(dtype=object, copy=True)
+    values[cell_is_string] = normalized[codes[cell_is_string]]
+    return pd.Series(values, index=series.index, name=series.name, dtype=object)
+
+
+def normalize_config_values(df, lower_case_except_file_zone):
+    """ read_config's cell transform: strip (and lower-case) every non-numeric string. """
+    return df.apply(normalize_string_cells, lower=bool(lower_case_except_file_zone), keep_float_text=True)
+
+
+def normalize_config_except_columns(file_config_df, cal_df, mapping_zone_df,
+                                    execpt_cal_df_columns=None, execpt_mapping_zone_df_columns=None):
+    """
+    read_config_except_columns' cell normalization.
+
+    Strings are stripped everywhere; they are also lower-cased in
+    base_input_class and in every cal_df/mapping_zone_df column that is not in
+    the matching except set.
+    """
+    file_config_df = file_config_df.apply(normalize_string_cells)
+    file_config_df['base_input_class'] = normalize_string_cells(file_config_df['base_input_class'], lower=True)
+
+    for df, except_columns in ((cal_df, execpt_cal_df_columns), (mapping_zone_df, execpt_mapping_zone_df_columns)):
+        for col in df.columns:
+            # Excepted columns are only stripped; the others are lower-cased as well
+            df[col] = normalize_string_cells(df[col], lower=not (except_columns and col in except_columns))
+
+    return file_config_df, cal_df, mapping_zone_df
+
 
 def get_active_functions(base_user_path, config_file, sheet_name):
     # Load the Excel sheet into a pandas DataFrame
-    file_path = base_user_path/config_file
+    file_path = _config_file_path(base_user_path, config_file)
    
-    df = pd.read_excel(file_path, sheet_name=sheet_name)
+    df = _read_config_sheet(file_path, sheet_name)
 
     # Filter the rows where 'Active' equals 1
     active_functions = df[df['Active'] == 1]['Function'].tolist()
@@ -46,7 +321,7 @@ def get_active_functions(base_user_path, config_file, sheet_name):
 def read_config(base_path, config_file_path, sheet_name, lower_case_except_file_zone):
     try:
         # Reading the Excel file starting from the fifth row (skip first four rows)
-        config_df = pd.read_excel(config_file_path, sheet_name=sheet_name, skiprows=6)
+        config_df = _read_config_sheet(config_file_path, sheet_name, skiprows=6)
 
         # Initialize empty DataFrames for the cases when columns may not exist
         file_config_df = pd.DataFrame()
@@ -69,18 +344,6 @@ def read_config(base_path, config_file_path, sheet_name, lower_case_except_file_
             # If neither linked_input_class nor base_mapping_group exist
             file_config_df = config_df.copy()
 
-        # Transformation function
-        def transform(x):
-            try:
-                float(x)  # Try converting to float
-                return x  # Return original if it's a number
-            except ValueError:
-                # Apply transformation if conversion fails (meaning it's truly a string)
-                if isinstance(x, str):
-                    return x.lower().strip() if lower_case_except_file_zone else x.strip()
-                else:
-                    return x
-
         # Drop rows where all cells are NaN in df
         file_config_df = file_config_df.dropna(how='all')
         cal_df = cal_df.dropna(how='all')
@@ -88,9 +351,9 @@ def read_config(base_path, config_file_path, sheet_name, lower_case_except_file_
 
 
         # Applying transformations where necessary
-        file_config_df = file_config_df.applymap(str)
-        cal_df = cal_df.applymap(transform)
-        group_df = group_df.applymap(transform)
+        file_config_df = file_config_df.astype(object).astype(str)
+        cal_df = normalize_config_values(cal_df, lower_case_except_file_zone)
+        group_df = normalize_config_values(group_df, lower_case_except_file_zone)
 
         # Adding full paths if columns exist
         for df in [file_config_df, cal_df, group_df]:
@@ -107,11 +370,17 @@ def read_config(base_path, config_file_path, sheet_name, lower_case_except_file_
 
     
 def get_cal(file_info, cal_df):   
+    """ cal_df rows linked to the base_input_class of file_info; cal_df may be a ConfigIndex. """
+    if isinstance(cal_df, ConfigIndex):
+        return cal_df.criteria_for(file_info['base_input_class'])
     filtered_df = cal_df[cal_df['linked_input_class'] == file_info['base_input_class']]
     return filtered_df
 
 
 def get_group(cal_info, group_df):  
+    """ group_df rows of the linked_mapping_group of cal_info; group_df may be a ConfigIndex. """
+    if isinstance(group_df, ConfigIndex):
+        return group_df.mapping_rows_for(cal_info['linked_mapping_group'])
     filtered_df = group_df[group_df['base_mapping_group'] == cal_info['linked_mapping_group']]
     return filtered_df
 
@@ -220,10 +489,99 @@ def get_group(cal_info, group_df):
 #         print(f"An error occurred: {e}")
 #         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
+def config_cache_key(config_file_path, sheet_name, lower_case_except_file_zone,
+                     execpt_cal_df_columns=None, execpt_mapping_zone_df_columns=None):
+    """
+    Cache key for one read_config_except_columns call: a hash of the config
+    file content, the sheet name and the normalization arguments.
+    """
+    if isinstance(config_file_path, ConfigWorkbook):
+        config_file_path = config_file_path.path
+
+    content_hash = hashlib.sha256()
+    with open(config_file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            content_hash.update(block)
+
+    arguments = repr((CONFIG_CACHE_VERSION, sheet_name, bool(lower_case_except_file_zone),
+                      sorted(execpt_cal_df_columns or ()), sorted(execpt_mapping_zone_df_columns or ())))
+    return hashlib.sha256(content_hash.digest() + arguments.encode('utf-8')).hexdigest()
+
+
+def load_cached_config(cache_dir, cache_key):
+    """ Return the cached (file_config_df, cal_df, mapping_zone_df) for cache_key, or None on a miss. """
+    cache_path = Path(cache_dir) / f"{cache_key}.pkl"
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # A truncated or incompatible entry is treated as a miss and rewritten
+        logger.warning("Ignoring unreadable config cache %s: %s", cache_path, e)
+        return None
+
+
+def save_cached_config(cache_dir, cache_key, frames):
+    """ Store the parsed config frames under cache_key, replacing the entry atomically. """
+    cache_dir = Path(cache_dir)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    except OSError as e:
+        # The cache is an optimization only; never fail the config read over it
+        logger.warning("Could not write config cache in %s: %s", cache_dir, e)
+        return
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(frames, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_dir / f"{cache_key}.pkl")
+    except (OSError, pickle.PicklingError, TypeError) as e:
+        # Frames holding objects pickle cannot store are not cached either
+        logger.warning("Could not write config cache in %s: %s", cache_dir, e)
+    finally:
+        # Gone once renamed into place
+        Path(tmp_path).unlink(missing_ok=True)
+
+
 def read_config_except_columns(base_path, config_file_path, sheet_name, lower_case_except_file_zone, 
-                               execpt_cal_df_columns=None, execpt_mapping_zone_df_columns=None):
+                               execpt_cal_df_columns=None, execpt_mapping_zone_df_columns=None,
+                               cache_dir=None, as_records=False):
+    """
+    Read a function sheet and split it into file_config_df, cal_df and mapping_zone_df.
+
+    With cache_dir set, the parsed and normalized frames are stored there keyed
+    on config_cache_key(), and later calls with an unchanged config file and the
+    same arguments load them from the cache instead of re-parsing the workbook.
+
+    With as_records, (file_records, criteria_records, mapping_zone_df) is
+    returned instead: a tuple of FileRecord with the paths resolved against
+    base_path, and the ClassCriteria of every linked_input_class.
+    run_removal_automation takes file_records in place of file_config_df.
+    """
+    frames = _read_config_frames(base_path, config_file_path, sheet_name, lower_case_except_file_zone,
+                                 execpt_cal_df_columns, execpt_mapping_zone_df_columns, cache_dir)
+    if not as_records:
+        return frames
+
+    file_config_df, cal_df, mapping_zone_df = frames
+    criteria_records = build_criteria_records(cal_df)
+    return build_file_records(file_config_df, criteria_records, base_path), criteria_records, mapping_zone_df
+
+
+def _read_config_frames(base_path, config_file_path, sheet_name, lower_case_except_file_zone,
+                        execpt_cal_df_columns, execpt_mapping_zone_df_columns, cache_dir):
+    cache_key = None
+    if cache_dir is not None:
+        cache_key = config_cache_key(config_file_path, sheet_name, lower_case_except_file_zone,
+                                     execpt_cal_df_columns, execpt_mapping_zone_df_columns)
+        cached = load_cached_config(cache_dir, cache_key)
+        if cached is not None:
+            return cached
+
     try:
-        config_df = pd.read_excel(config_file_path, sheet_name=sheet_name, skiprows=6)
+        config_df = _read_config_sheet(config_file_path, sheet_name, skiprows=6)
 
         # Initialize DataFrames
         file_config_df, cal_df, mapping_zone_df = pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
@@ -251,32 +609,17 @@ def read_config_except_columns(base_path, config_file_path, sheet_name, lower_ca
             mapping_zone_df.columns = mapping_zone_df.columns.str.strip()
 
         # Apply transformations
-        file_config_df = file_config_df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-        file_config_df['base_input_class'] = file_config_df['base_input_class'].apply(lambda x: x.lower().strip() if isinstance(x, str) else x)
-
-        # Apply conditional transformation for cal_df
-        for col in cal_df.columns:
-            if execpt_cal_df_columns and col in execpt_cal_df_columns:
-                # Only strip spaces from string values in excepted columns
-                cal_df[col] = cal_df[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
-            else:
-                # Strip spaces and convert to lowercase for other columns
-                cal_df[col] = cal_df[col].apply(lambda x: x.lower().strip() if isinstance(x, str) else x)
-
-        # Apply conditional transformation for mapping_zone_df
-        for col in mapping_zone_df.columns:
-            if execpt_mapping_zone_df_columns and col in execpt_mapping_zone_df_columns:
-                # Only strip spaces from string values in excepted columns
-                mapping_zone_df[col] = mapping_zone_df[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
-            else:
-                # Strip spaces and convert to lowercase for other columns
-                mapping_zone_df[col] = mapping_zone_df[col].apply(lambda x: x.lower().strip() if isinstance(x, str) else x)
+        file_config_df, cal_df, mapping_zone_df = normalize_config_except_columns(
+            file_config_df, cal_df, mapping_zone_df, execpt_cal_df_columns, execpt_mapping_zone_df_columns)
 
         # Drop NaN rows
         file_config_df.dropna(how='all', inplace=True)
         cal_df.dropna(how='all', inplace=True)
         mapping_zone_df.dropna(how='all', inplace=True)
 
+        if cache_key is not None:
+            save_cached_config(cache_dir, cache_key, (file_config_df, cal_df, mapping_zone_df))
+
         return file_config_df, cal_df, mapping_zone_df
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -298,7 +641,7 @@ def read_excel_data_from_row(filepath, sheet_name):
     try:
         # Read the data from the specified sheet starting at row 2
         # skiprows=3 skips the first two rows (0-indexed), starting the read from row 2
-        df = pd.read_excel(filepath, sheet_name=sheet_name, skiprows=6)
+        df = _read_config_sheet(filepath, sheet_name, skiprows=6)
         return df
     except FileNotFoundError:
         print(f"File not found: {filepath}")
@@ -340,10 +683,10 @@ def set_config_df_types_3(config_df):
 
 def get_active_functions_sorted(base_user_path, config_file, sheet_name):
     # Construct the file path
-    file_path = base_user_path / config_file
+    file_path = _config_file_path(base_user_path, config_file)
    
     # Load the Excel sheet into a pandas DataFrame
-    df = pd.read_excel(file_path, sheet_name=sheet_name)
+    df = _read_config_sheet(file_path, sheet_name)
 
     # Filter the rows where 'Active' equals 1
     active_functions = df[df['Active'] == 1]
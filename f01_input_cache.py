@@ -0,0 +1,94 @@
+import os
+import logging
+import pandas as pd
+from pathlib import Path
+from collections import OrderedDict
+
+from f01_memory import frame_memory
+
+
+logger = logging.getLogger(__name__)
+
+
+class ParsedInputCache:
+    """
+    LRU cache of header-promoted input frames, bounded by their estimated bytes.
+
+    Several config rows often read the same input (one vendor workbook split
+    into sheets by class). The frame process_input_file builds from it before
+    the criteria run is kept here under the file's path, sheet and size and
+    mtime (so a changed file is a miss), the header values it was promoted
+    with and the read options. Once the frames kept take more than max_bytes
+    (see f01_memory.frame_memory), the least recently used are dropped.
+
+    get hands out a shallow copy: it shares the cached columns, and the
+    pipeline never writes cells in place (the criteria take a new, filtered
+    frame), so every config row gets its own frame without a re-parse.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (df, input_rows, bytes)
+
+    @staticmethod
+    def key(input_file_path, input_sheet_name, header_values, **read_options):
+        """ Cache key of an input read with header_values and read_options, as the file is now. """
+        stat = os.stat(input_file_path)
+        sheet = None if pd.isna(input_sheet_name) else str(input_sheet_name)
+        return (str(Path(input_file_path).resolve()), sheet, stat.st_size, stat.st_mtime_ns,
+                tuple(header_values), tuple(sorted(read_options.items())))
+
+    def get(self, key):
+        """ (df, input_rows) cached under key, or None. """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        df, input_rows, _ = entry
+        return df.copy(deep=False), input_rows
+
+    def put(self, key, df, input_rows):
+        """ Keep df under key, dropping the least recently used frames over the budget. """
+        nbytes = frame_memory(df)[1]
+        if nbytes > self.max_bytes:
+            logger.debug("%s: %.1f MB frame is over the input cache budget, not cached", key[0], nbytes / 1e6)
+            return
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[2]
+        self._entries[key] = (df, input_rows, nbytes)
+        self.bytes += nbytes
+        self._evict()
+
+    def resize(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        while self.bytes > self.max_bytes:
+            key, (_, _, nbytes) = self._entries.popitem(last=False)
+            self.bytes -= nbytes
+            self.evictions += 1
+            logger.debug("Evicted %s [%s] from the input cache (%.1f MB)", key[0], key[1], nbytes / 1e6)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# The cache of this process (the runner's, or a pool worker's)
+_process_cache = None
+
+
+def process_input_cache(max_bytes):
+    """ The ParsedInputCache of this process, created on first use and kept to max_bytes. """
+    global _process_cache
+    if _process_cache is None:
+        _process_cache = ParsedInputCache(max_bytes)
+    elif _process_cache.max_bytes != max_bytes:
+        _process_cache.resize(max_bytes)
+    return _process_cache
@@ -0,0 +1,165 @@
+import os
+import json
+import logging
+import hashlib
+import tempfile
+import pandas as pd
+from pathlib import Path
+
+from f00_read_configs import ClassCriteria
+from f01_output_writers import output_format, sheet_output_path
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the removal logic changes in a way that makes old outputs stale
+MANIFEST_VERSION = 1
+
+
+def file_fingerprint(path, previous=None):
+    """
+    Size, mtime and sha256 of the file at path.
+
+    When previous (an earlier fingerprint of the same file) has the same size
+    and mtime, its hash is reused instead of reading the file again.
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if previous and all(previous.get(k) == v for k, v in fingerprint.items()) and previous.get('sha256'):
+        fingerprint['sha256'] = previous['sha256']
+        return fingerprint
+
+    content_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            content_hash.update(block)
+    fingerprint['sha256'] = content_hash.hexdigest()
+    return fingerprint
+
+
+def criteria_fingerprint(criteria_rows):
+    """ sha256 of the cal_df rows (criteria and remove_rows_list) applied to one input, or of a ClassCriteria. """
+    if isinstance(criteria_rows, ClassCriteria):
+        criteria_rows = criteria_rows.criteria_rows
+    payload = criteria_rows.reset_index(drop=True).to_json(orient='split', date_format='iso', default_handler=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _text_or_none(value):
+    return None if pd.isna(value) else str(value)
+
+
+def _same_content(entry, previous):
+    """ Compare two output entries on content: a touched but unchanged input still matches. """
+    def content(job_entry):
+        return dict(job_entry, input_file={k: v for k, v in job_entry['input_file'].items() if k != 'mtime_ns'})
+    return len(entry) == len(previous) and all(content(a) == content(b) for a, b in zip(entry, previous))
+
+
+def output_key(output_file_path, sheet_name):
+    """ Manifest key of one output sheet. """
+    return f"{output_file_path}::{_text_or_none(sheet_name)}"
+
+
+def job_fingerprint(job, previous=None):
+    """ Everything the content of job's output sheet depends on. """
+    return {
+        'input_file_path': str(job['input_file_path']),
+        'input_file_type': _text_or_none(job['input_file_type']),
+        'input_sheet_name': _text_or_none(job['input_sheet_name']),
+        'input_file': file_fingerprint(job['input_file_path'], previous and previous.get('input_file')),
+        'criteria': criteria_fingerprint(job['criteria_rows']),
+    }
+
+
+class RunManifest:
+    """
+    Record of the inputs each output sheet was last built from.
+
+    select_changed() drops the jobs whose output sheet would come out the same
+    as in the last recorded run; save() records the jobs of the current run
+    once its outputs have been written.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._entries = self._load()
+        self._pending = {}
+        self._sheet_names = {}  # Sheet names of existing output workbooks
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            # An unreadable manifest only means a full rebuild
+            logger.warning("Ignoring unreadable manifest %s: %s", self.path, e)
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            logger.warning("Ignoring manifest %s from another version", self.path)
+            return {}
+        return manifest.get('outputs', {})
+
+    def _output_exists(self, output_file_path, sheet_name):
+        if output_format(output_file_path) != '.xlsx':
+            return sheet_output_path(output_file_path, sheet_name).is_file()
+        if not Path(output_file_path).is_file():
+            return False
+        if output_file_path not in self._sheet_names:
+            from openpyxl import load_workbook
+
+            workbook = load_workbook(output_file_path, read_only=True, keep_links=False)
+            self._sheet_names[output_file_path] = set(workbook.sheetnames)
+            workbook.close()
+        return sheet_name in self._sheet_names[output_file_path]
+
+    def select_changed(self, jobs, force=False):
+        """
+        Return the jobs whose output sheet has to be rebuilt, in order.
+
+        An output sheet is skipped when every job writing it has the same
+        fingerprint as in the manifest and the sheet still exists. With force
+        every job is returned (and still recorded by save()).
+        """
+        by_output = {}
+        for job in jobs:
+            by_output.setdefault(output_key(job['output_file_path'], job['sheet_name']), []).append(job)
+
+        changed = set()
+        for key, output_jobs in by_output.items():
+            previous = self._entries.get(key, [])
+            entry = [job_fingerprint(job, previous[i] if i < len(previous) else None)
+                     for i, job in enumerate(output_jobs)]
+            self._pending[key] = entry
+
+            last_job = output_jobs[-1]
+            if (not force and _same_content(entry, previous)
+                    and self._output_exists(last_job['output_file_path'], last_job['sheet_name'])):
+                logger.info("Skipping unchanged %s in %s", last_job['sheet_name'], last_job['output_file_path'])
+                continue
+            changed.add(key)
+
+        return [job for job in jobs if output_key(job['output_file_path'], job['sheet_name']) in changed]
+
+    def save(self):
+        """ Record the fingerprints gathered by select_changed(), replacing the manifest atomically. """
+        self._entries.update(self._pending)
+        self._pending = {}
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix='.tmp')
+        except OSError as e:
+            # The outputs are already written; without a manifest the next run is a full one
+            logger.warning("Could not write manifest %s: %s", self.path, e)
+            return
+
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'outputs': self._entries}, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            os.remove(tmp_path)
+            logger.warning("Could not write manifest %s: %s", self.path, e)
@@ -0,0 +1,250 @@
+import os
+import sys
+import zipfile
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+# Object columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+
+# Rows read and compacted at a time by a low-memory read of a .csv/.txt input
+LOW_MEMORY_READ_ROWS = 100000
+
+# Whole numbers below this are exact in float32 and print the same as in float64
+FLOAT32_EXACT_LIMIT = 2 ** 24
+
+# DataFrame.attrs key listing the columns compact_frame parsed from text into numbers
+TEXT_NUMBERS_ATTR = 'text_numbers'
+
+# Peak memory of processing an input, per byte of .csv/.txt file and per byte
+# of uncompressed .xlsx sheet XML (measured with tracemalloc, with headroom)
+TEXT_MEMORY_FACTOR = 8
+XLSX_MEMORY_FACTOR = 2
+
+# Smallest chunk a memory budget splits a .csv/.txt input into
+MIN_BUDGET_CHUNK_ROWS = 1000
+
+# Bytes read from the top of a .csv/.txt input to measure its line length
+LINE_SAMPLE_BYTES = 1 << 20
+
+
+def _text_numbers(series):
+    """
+    series (text and missing cells) as int64 or float64, or None unless
+    every cell prints back as exactly the text it was parsed from.
+    """
+    try:
+        numbers = pd.to_numeric(series)
+    except (ValueError, TypeError):
+        return None
+    if numbers.dtype == np.int64:
+        text = numbers.astype(str)
+    elif numbers.dtype == np.float64 and np.isfinite(numbers[series.notna()]).all():
+        text = numbers.map(repr)
+    else:
+        return None
+    present = series.notna()
+    if not (text[present] == series[present]).all():
+        return None
+    return numbers
+
+
+def _compact_column(series, category_ratio):
+    """ (compacted series, whether its numbers were parsed from text) """
+    if series.dtype == object:
+        codes, uniques = pd.factorize(series)
+        # Inferred on the distinct values: factorize merges 1, 1.0 and True into one value
+        kind = pd.api.types.infer_dtype(uniques, skipna=True)
+        if kind == 'string':
+            if len(uniques) <= category_ratio * len(series):
+                return pd.Series(pd.Categorical.from_codes(codes, uniques), index=series.index, name=series.name), False
+            numbers = _text_numbers(series)
+            if numbers is None:
+                return series, False
+            return _compact_column(numbers, category_ratio)[0], True
+        # Numbers read from .xlsx cells; whole numbers only without blanks, which would make them floats
+        if kind in ('integer', 'floating') and pd.api.types.infer_dtype(series, skipna=True) == kind:
+            if kind == 'floating':
+                series = series.astype(np.float64)
+            elif codes.min() >= 0:
+                series = pd.to_numeric(series)
+        if series.dtype == object:
+            return series, False
+
+    if pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_extension_array_dtype(series.dtype):
+        return pd.to_numeric(series, downcast='integer'), False
+
+    if series.dtype == np.float64:
+        values = series.to_numpy()
+        finite = values[np.isfinite(values)]
+        if np.all(finite == np.round(finite)) and np.all(np.abs(finite) < FLOAT32_EXACT_LIMIT):
+            return series.astype(np.float32), False
+    return series, False
+
+
+def compact_frame(df, category_ratio=CATEGORY_RATIO):
+    """
+    Low-memory copy of df for wide, repetitive inputs.
+
+    Text columns whose distinct values are at most category_ratio of the rows
+    become categoricals. Other text columns are parsed into numbers when every
+    cell prints back as exactly its text ('12', '0.5', but not '012' or '1e3');
+    their positions are listed in df.attrs[TEXT_NUMBERS_ATTR] so the writers
+    put the text back (see restore_text_numbers). Number cells of .xlsx inputs
+    become numeric columns, integer columns take the smallest integer type
+    that holds them, and float columns holding only whole numbers below 2**24
+    become float32. Every cell keeps its exact value, so the removal criteria
+    and the written outputs see the same data (see expand_frame).
+    """
+    if df.empty:
+        return df
+    # Compacting a compact frame again (after its header row is promoted) keeps what was parsed before
+    columns, text_numbers = [], list(df.attrs.get(TEXT_NUMBERS_ATTR, ()))
+    for position, (_, series) in enumerate(df.items()):
+        series, from_text = _compact_column(series, category_ratio)
+        columns.append(series)
+        if from_text:
+            text_numbers.append(position)
+    compact = pd.concat(columns, axis=1)
+    compact.columns = df.columns
+    if text_numbers:
+        compact.attrs[TEXT_NUMBERS_ATTR] = sorted(text_numbers)
+    return compact
+
+
+def _number_text(series):
+    """ The text a column of _text_numbers was parsed from, missing cells kept. """
+    if series.dtype.kind == 'f':
+        text = series.astype(np.float64).map(repr)
+    else:
+        text = series.astype(str)
+    return text.astype(object).where(series.notna(), np.nan)
+
+
+def read_column(df, column):
+    """ Column of df as it was read: the text of a column compact_frame parsed into numbers, else the column. """
+    series = df[column]
+    positions = df.attrs.get(TEXT_NUMBERS_ATTR)
+    if positions and df.columns.get_loc(column) in positions:
+        return _number_text(series)
+    return series
+
+
+def restore_text_numbers(df):
+    """ df with the columns compact_frame parsed from text turned back into that text. """
+    positions = df.attrs.get(TEXT_NUMBERS_ATTR)
+    if not positions:
+        return df
+    df = df.copy(deep=False)
+    for position in positions:
+        df.isetitem(position, _number_text(df.iloc[:, position]))
+    df.attrs = {key: value for key, value in df.attrs.items() if key != TEXT_NUMBERS_ATTR}
+    return df
+
+
+def expand_frame(df):
+    """ Undo compact_frame: text back in parsed columns, categoricals to object, numbers to 64 bits. """
+    df = restore_text_numbers(df)
+    dtypes = {}
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            dtypes[col] = object
+        elif dtype == np.float32:
+            dtypes[col] = np.float64
+        elif pd.api.types.is_integer_dtype(dtype) and dtype.itemsize < 8:
+            dtypes[col] = np.int64
+    if not dtypes:
+        return df
+    return df.astype(dtypes)
+
+
+def frame_memory(df):
+    """
+    Bytes held by df, counting the text of object columns (like memory_usage(deep=True)).
+
+    Returns (expanded, actual): expanded is what the same frame takes without
+    compact_frame, with every categorical cell as its own object and numbers
+    at 64 bits, so the difference is what a low-memory run saved.
+    """
+    expanded = actual = df.index.memory_usage(deep=True)
+    text_numbers = df.attrs.get(TEXT_NUMBERS_ATTR, ())
+    for position, (_, series) in enumerate(df.items()):
+        used = series.memory_usage(deep=True, index=False)
+        actual += used
+        if position in text_numbers:
+            # The column held its cells as text
+            expanded += _number_text(series).memory_usage(deep=True, index=False)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            # Every cell is a pointer to its value object; missing cells hold a float NaN
+            sizes = np.append(series.array.categories.map(sys.getsizeof).to_numpy(dtype=np.int64),
+                              sys.getsizeof(np.nan))
+            expanded += 8 * len(series) + int(sizes[series.array.codes].sum())
+        elif series.dtype.kind in 'iuf' and series.dtype.itemsize < 8:
+            expanded += 8 * len(series)
+        else:
+            expanded += used
+    return int(expanded), int(actual)
+
+
+def estimate_peak_bytes(input_file_path, input_file_type):
+    """
+    Rough peak memory of reading and filtering an input whole, from its size on disk.
+
+    .xlsx files are zip archives, so the largest uncompressed worksheet of
+    the archive stands in for the sheet that is read.
+    """
+    if input_file_type == '.xlsx':
+        with zipfile.ZipFile(input_file_path) as archive:
+            sheet_bytes = max((info.file_size for info in archive.infolist()
+                               if info.filename.startswith('xl/worksheets/')), default=0)
+        return sheet_bytes * XLSX_MEMORY_FACTOR
+    return os.path.getsize(input_file_path) * TEXT_MEMORY_FACTOR
+
+
+def budget_chunksize(input_file_path, memory_budget):
+    """ Rows per chunk that keep streaming a .csv/.txt input well within memory_budget bytes. """
+    with open(input_file_path, 'rb') as f:
+        sample = f.read(LINE_SAMPLE_BYTES)
+    line_bytes = len(sample) / max(sample.count(b'\n'), 1)
+    # Half the budget per chunk leaves room for the filtered copy and the writer
+    return max(MIN_BUDGET_CHUNK_ROWS, int(memory_budget / 2 / TEXT_MEMORY_FACTOR / line_bytes))
+
+
+def concat_compact(frames):
+    """
+    Concatenate compact_frame outputs of consecutive row blocks of one file.
+
+    Categorical columns are merged with union_categoricals so they stay
+    categorical; a column that is categorical in some blocks only is joined
+    as object. A column parsed from text into numbers stays numeric when it
+    was parsed into whole numbers in every block, or into floats in every
+    block; otherwise its text is put back. The result has a fresh RangeIndex.
+    """
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+
+    columns, text_numbers = [], []
+    for position in range(frames[0].shape[1]):
+        parts = [frame.iloc[:, position] for frame in frames]
+        from_text = [position in frame.attrs.get(TEXT_NUMBERS_ATTR, ()) for frame in frames]
+        if all(from_text) and len({part.dtype.kind for part in parts}) == 1:
+            column = pd.concat(parts, ignore_index=True)
+            text_numbers.append(position)
+        elif any(from_text):
+            parts = [_number_text(part) if parsed else part.astype(object)
+                     for part, parsed in zip(parts, from_text)]
+            column = pd.concat(parts, ignore_index=True)
+        elif all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            column = pd.Series(union_categoricals([part.array for part in parts]), name=parts[0].name)
+        else:
+            parts = [part.astype(object) if isinstance(part.dtype, pd.CategoricalDtype) else part for part in parts]
+            column = pd.concat(parts, ignore_index=True)
+        columns.append(column)
+    df = pd.concat(columns, axis=1)
+    df.columns = frames[0].columns
+    if text_numbers:
+        df.attrs[TEXT_NUMBERS_ATTR] = text_numbers
+    return df
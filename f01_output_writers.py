@@ -0,0 +1,288 @@
+import os
+import logging
+import tempfile
+import numpy as np
+from pathlib import Path
+
+from f01_memory import expand_frame, restore_text_numbers
+from f01_xlsx_package import replace_sheets
+
+logger = logging.getLogger(__name__)
+
+# Output formats picked from the extension of output_file_name; any other
+# extension (and names without one) is written as an Excel workbook
+COLUMNAR_OUTPUT_FORMATS = ('.csv', '.tsv', '.parquet', '.feather')
+
+
+def output_format(output_file_path):
+    """ Return the output format of output_file_path: one of COLUMNAR_OUTPUT_FORMATS or '.xlsx'. """
+    suffix = Path(output_file_path).suffix.lower()
+    return suffix if suffix in COLUMNAR_OUTPUT_FORMATS else '.xlsx'
+
+
+def sheet_output_path(output_file_path, sheet_name):
+    """
+    File that holds sheet_name of a columnar output.
+
+    CSV, TSV, Parquet and Feather files hold a single table, so every output
+    sheet gets its own file next to output_file_path: <stem>_<sheet><ext>.
+    """
+    output_file_path = Path(output_file_path)
+    return output_file_path.with_name(f"{output_file_path.stem}_{sheet_name}{output_file_path.suffix}")
+
+
+def _arrow_table(df, schema=None):
+    import pyarrow as pa
+
+    # Low-memory frames are written with the types they were read with
+    df = expand_frame(df).reset_index(drop=True)
+    df.columns = [str(col) for col in df.columns]
+
+    # Arrow columns hold a single type; columns mixing text and numbers (as
+    # .xlsx inputs produce) are stored as text, with missing values kept
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if schema is not None:
+        return table.cast(schema)
+    return table
+
+
+def _open_schema(table):
+    """ Schema for a streamed output: columns still all-null in the first chunk become text. """
+    import pyarrow as pa
+
+    return pa.schema([pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                      for field in table.schema])
+
+
+class ColumnarSheetWriter:
+    """
+    Writes one output sheet as a .csv, .tsv, .parquet or .feather file.
+
+    write() may be called once with the whole frame or repeatedly with
+    consecutive chunks; the header / schema is taken from the first call.
+    Parquet and Feather need pyarrow. Everything goes to a temporary file
+    next to the target, which close() renames into place and discard()
+    deletes, so a failed run never leaves a half-written or partial file.
+    """
+
+    def __init__(self, path, fmt):
+        self.path = Path(path)
+        self.format = fmt
+        self._writer = None
+        self._schema = None
+        self._started = False
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.stem}.",
+                                        suffix=f"{self.path.suffix}.tmp")
+        os.close(fd)
+        self._tmp_path = Path(tmp_path)
+
+    def write(self, df):
+        if self.format in ('.csv', '.tsv'):
+            restore_text_numbers(df).to_csv(self._tmp_path, sep='\t' if self.format == '.tsv' else ',', index=False,
+                                            mode='a' if self._started else 'w', header=not self._started)
+        else:
+            table = _arrow_table(df, self._schema)
+            if self._writer is None:
+                self._schema = _open_schema(table)
+                table = table.cast(self._schema)
+                if self.format == '.parquet':
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+                else:
+                    # Feather V2 is the Arrow IPC file format
+                    import pyarrow as pa
+                    self._writer = pa.ipc.new_file(str(self._tmp_path), self._schema)
+            self._writer.write_table(table)
+        self._started = True
+
+    def finish(self):
+        """ Complete the temporary file; the target is only replaced by close(). """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def close(self):
+        try:
+            self.finish()
+            os.replace(self._tmp_path, self.path)
+        except BaseException:
+            self._tmp_path.unlink(missing_ok=True)
+            raise
+
+    def discard(self):
+        """ Delete the temporary file and leave the existing file untouched. """
+        try:
+            self.finish()
+        except Exception:
+            pass
+        self._tmp_path.unlink(missing_ok=True)
+
+
+def _header_cells(worksheet, columns):
+    """ Header row styled like DataFrame.to_excel: bold, thin borders, centred. """
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    side = Side(style='thin')
+    cells = []
+    for col in columns:
+        cell = WriteOnlyCell(worksheet, value=col)
+        cell.font = Font(bold=True)
+        cell.border = Border(left=side, right=side, top=side, bottom=side)
+        cell.alignment = Alignment(horizontal='center', vertical='top')
+        cells.append(cell)
+    return cells
+
+
+def _excel_rows(df):
+    """ Rows of df as tuples ready for openpyxl, with blanks and infinities written like to_excel. """
+    df = restore_text_numbers(df)
+    values = df.astype(object)
+    values = values.where(df.notna(), None)
+    values = values.replace([np.inf, -np.inf], ['inf', '-inf'])
+    return values.itertuples(index=False, name=None)
+
+
+class StreamingWorkbookWriter:
+    """
+    Writes one output workbook in a single pass.
+
+    Each sheet is streamed row by row into an openpyxl write-only workbook as
+    it is produced, so memory stays flat however many rows are written. On
+    close() the sheets written in this run are put into the existing file
+    (see f01_xlsx_package.replace_sheets), whose other sheets are copied as
+    they are, formatting included. The result goes to a temporary file next
+    to the target and is renamed into place, so a crash never leaves a
+    half-written file.
+    """
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+
+        self.path = Path(path)
+        self._workbook = Workbook(write_only=True)
+        self._sheets = {}  # Sheets written in this run, in write order
+
+    def write_sheet(self, sheet_name, frames):
+        """ Write consecutive frames (header taken from the first) as sheet_name; each sheet is written once. """
+        if sheet_name in self._sheets:
+            # A write-only sheet cannot be taken back once started
+            raise ValueError(f"Sheet {sheet_name} of {self.path} is already written")
+        worksheet = self._workbook.create_sheet(title=sheet_name)
+        self._sheets[sheet_name] = worksheet
+
+        header_written = False
+        for frame in frames:
+            if not header_written:
+                worksheet.append(_header_cells(worksheet, frame.columns))
+                header_written = True
+            for row in _excel_rows(frame):
+                worksheet.append(row)
+
+    def _temp_path(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.stem}.", suffix='.xlsx.tmp')
+        os.close(fd)
+        return tmp_path
+
+    def close(self):
+        tmp_path = self._temp_path()
+        try:
+            if self.path.exists():
+                # Rewritten sheets keep their old position, new sheets go at the end
+                sheets_path = self._temp_path()
+                try:
+                    self._workbook.save(sheets_path)
+                    replace_sheets(self.path, sheets_path, tmp_path)
+                finally:
+                    os.remove(sheets_path)
+            else:
+                self._workbook.save(tmp_path)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        finally:
+            self._workbook = None
+
+    def discard(self):
+        """ Drop everything written so far and leave the existing file untouched. """
+        for worksheet in self._sheets.values():
+            # Finish the sheet's temporary stream so it is not flushed at garbage collection
+            try:
+                worksheet.close()
+            except Exception:
+                pass
+        self._workbook = None
+        self._sheets.clear()
+
+
+def _workbook_writer(excel_writers, output_file_path):
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    if output_file_path not in excel_writers:
+        excel_writers[output_file_path] = StreamingWorkbookWriter(output_file_path)
+    return excel_writers[output_file_path]
+
+
+def _write_columnar_sheet(excel_writers, output_file_path, sheet_name, frames):
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    path = sheet_output_path(output_file_path, sheet_name)
+    if path in excel_writers:
+        raise ValueError(f"Sheet {sheet_name} of {output_file_path} is already written")
+    writer = ColumnarSheetWriter(path, output_format(output_file_path))
+    try:
+        for frame in frames:
+            writer.write(frame)
+        writer.finish()
+    except BaseException:
+        writer.discard()
+        raise
+    excel_writers[path] = writer
+    logger.info("Data written to %s", path)
+
+
+def write_sheet(excel_writers, output_file_path, sheet_name, df):
+    """ Write df as sheet_name of output_file_path, in the format given by its extension. """
+    write_sheet_chunks(excel_writers, output_file_path, sheet_name, iter([df]))
+
+
+def write_sheet_chunks(excel_writers, output_file_path, sheet_name, chunks):
+    """
+    Write consecutive frames (e.g. from iter_removal_chunks) as one output sheet.
+
+    Workbook outputs go through the StreamingWorkbookWriter kept for the path
+    in excel_writers, columnar sheets through a ColumnarSheetWriter kept for
+    their file; the files themselves are only written by close_workbooks().
+    """
+    if output_format(output_file_path) != '.xlsx':
+        _write_columnar_sheet(excel_writers, output_file_path, sheet_name, chunks)
+        return
+
+    _workbook_writer(excel_writers, output_file_path).write_sheet(sheet_name, chunks)
+    logger.info("Data written to %s in %s", sheet_name, output_file_path)
+
+
+def close_workbooks(excel_writers, discard=False):
+    """
+    Save every workbook and columnar file collected in excel_writers, or drop them all when discard is set.
+
+    When saving one fails, the writers not saved yet are dropped and the error is raised.
+    """
+    while excel_writers:
+        path = next(iter(excel_writers))
+        writer = excel_writers.pop(path)
+        if discard:
+            writer.discard()
+            logger.warning("Discarded unfinished writer for %s", path)
+            continue
+        try:
+            writer.close()
+        except BaseException:
+            close_workbooks(excel_writers, discard=True)
+            raise
+        logger.info("Closed writer for %s", path)
@@ -1,167 +1,1215 @@
+import io
 import re
+import codecs
+import time
+import functools
+import collections
+import logging
+import datetime
+import tracemalloc
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from pandas.io.parsers import TextParser
 
+from f00_read_configs import ConfigIndex, ClassCriteria, get_cal, resolve_file_paths
+from f01_memory import (LOW_MEMORY_READ_ROWS, compact_frame, concat_compact, frame_memory, estimate_peak_bytes,
+                        budget_chunksize, read_column)
+from f01_output_writers import write_sheet, write_sheet_chunks, close_workbooks
+from f01_manifest import RunManifest, output_key
+from f01_input_cache import process_input_cache
+from f01_run_report import (RunReport, new_file_stats, stage_timer, file_peak, record_criteria,
+                            record_unconvertible)
 
-def read_input_file_type(input_file_path, input_file_type, sheet_name=None):
+
+logger = logging.getLogger(__name__)
+
+# Input types read_input_file_type accepts
+INPUT_FILE_TYPES = ('.xlsx', '.csv', '.txt')
+
+# Input types that can be streamed in chunks instead of loaded whole
+STREAMED_FILE_TYPES = ('.csv', '.txt')
+
+# What each criteria_to_remove_row removes; other values remove nothing
+CRITERIA_OPERATIONS = {
+    '=': "rows whose text equals {value!r}",
+    '> =': "rows >= {value} and rows that are blank or not a number",
+    '>': "rows > {value} and rows that are blank or not a number",
+    '< =': "rows <= {value} and rows that are blank or not a number",
+    '<': "rows < {value} and rows that are blank or not a number",
+    'contain': "rows containing {value!r}",
+}
+
+# Engines for .xlsx inputs: 'auto' picks calamine when python-calamine is
+# installed and falls back to openpyxl in read-only mode; 'pandas' is the
+# plain pd.read_excel reader
+XLSX_ENGINES = ('auto', 'calamine', 'openpyxl', 'pandas')
+
+# Characters dropped by normalize_text
+NON_TEXT_CHARACTERS = re.compile(r'[^a-zA-Z0-9.,]+')
+
+# A 'contain' value without any of these is a plain substring
+REGEX_METACHARACTERS = frozenset('.^$*+?{}[]\\|()')
+
+# Jobs submitted to the process pool per worker before their frames are written
+SUBMIT_AHEAD_PER_WORKER = 2
+
+
+class MemoryBudgetError(Exception):
+    """ An input needs more memory than the run's memory budget and cannot be streamed. """
+
+# Excel error literals, read as missing values like pd.read_excel does
+EXCEL_ERROR_CODES = frozenset(('#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A'))
+
+# .csv/.txt inputs up to this size are batched with the other small inputs of their class
+BATCH_MAX_FILE_BYTES = 1 << 20
+
+# Line put between the files of a batch read by read_input_batch; it cannot
+# hold a delimiter or a quote, so it is always read as a row of its own
+BATCH_FILE_SEPARATOR = '\x1e-- end of batch file --\x1e'
+
+
+def read_input_file_type(input_file_path, input_file_type, sheet_name=None, chunksize=None, xlsx_engine='auto',
+                         low_memory=False):
+    """
+    Read an input file with header=None.
+
+    CSV/TXT cells are read as text so the result does not depend on how pandas
+    splits the file internally, and so chunked reads (chunksize) concatenate to
+    exactly the same frame; with chunksize an iterator of frames is returned.
+    With low_memory (and no chunksize) the file is read and compacted
+    LOW_MEMORY_READ_ROWS rows at a time, so it is never held whole as object
+    columns (see f01_memory.compact_frame).
+    .xlsx sheets are read with xlsx_engine (see XLSX_ENGINES).
+    """
+    if low_memory and chunksize is None and input_file_type in STREAMED_FILE_TYPES:
+        blocks = read_input_file_type(input_file_path, input_file_type, chunksize=LOW_MEMORY_READ_ROWS)
+        return concat_compact(compact_frame(block) for block in blocks)
     if input_file_type == '.xlsx':
-        return pd.read_excel(input_file_path, sheet_name=sheet_name, header=None)
+        if resolve_xlsx_engine(xlsx_engine) == 'pandas':
+            return pd.read_excel(input_file_path, sheet_name=sheet_name, header=None)
+        return xlsx_rows_to_frame(iter_xlsx_rows(input_file_path, sheet_name, xlsx_engine))
     elif input_file_type == '.csv':
-        return pd.read_csv(input_file_path, header=None)
+        return pd.read_csv(input_file_path, header=None, dtype=str, chunksize=chunksize)
     elif input_file_type == '.txt':
-        return pd.read_csv(input_file_path, delimiter='\t', header=None)
+        return pd.read_csv(input_file_path, delimiter='\t', header=None, dtype=str, chunksize=chunksize)
     else:
         raise ValueError(f"Unsupported file type: {input_file_type}")
-    
-        
+
+
+def resolve_xlsx_engine(xlsx_engine='auto'):
+    """ Return the concrete engine name for xlsx_engine, resolving 'auto' to the fastest one installed. """
+    if xlsx_engine not in XLSX_ENGINES:
+        raise ValueError(f"Unsupported xlsx engine: {xlsx_engine}")
+    if xlsx_engine != 'auto':
+        return xlsx_engine
+    try:
+        import python_calamine  # noqa: F401
+        return 'calamine'
+    except ImportError:
+        return 'openpyxl'
+
+
+def _convert_xlsx_value(value):
+    """ Convert one raw cell value the way pd.read_excel's openpyxl reader does. """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        # Whole numbers come back as int
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and value in EXCEL_ERROR_CODES:
+        return np.nan
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        # calamine returns plain dates where openpyxl returns datetimes
+        return datetime.datetime(value.year, value.month, value.day)
+    return value
+
+
+def _iter_raw_xlsx_rows(input_file_path, sheet_name, engine):
+    if engine == 'calamine':
+        from python_calamine import CalamineWorkbook
+
+        workbook = CalamineWorkbook.from_path(str(input_file_path))
+        if sheet_name is None:
+            sheet = workbook.get_sheet_by_index(0)
+        else:
+            sheet = workbook.get_sheet_by_name(sheet_name)
+        # iter_rows() skips the empty columns left of the used range
+        leading_cells = [''] * sheet.start[1] if sheet.start else []
+        for row in sheet.iter_rows():
+            yield leading_cells + row
+    else:
+        from openpyxl import load_workbook
+
+        # Read-only mode streams the sheet XML without building styled cell objects
+        workbook = load_workbook(input_file_path, read_only=True, data_only=True, keep_links=False)
+        try:
+            sheet = workbook.worksheets[0] if sheet_name is None else workbook[sheet_name]
+            sheet.reset_dimensions()
+            yield from sheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+
+def iter_xlsx_rows(input_file_path, sheet_name=None, xlsx_engine='auto'):
+    """
+    Stream the rows of one .xlsx sheet as lists of converted cell values.
+
+    Values are converted like pd.read_excel (empty cells are '', whole floats
+    become int), trailing empty cells are dropped from each row and trailing
+    empty rows are never yielded. A sheet_name of None reads the first sheet.
+    """
+    engine = resolve_xlsx_engine(xlsx_engine)
+    if engine == 'pandas':
+        engine = 'openpyxl'
+
+    pending_empty_rows = 0
+    for raw_row in _iter_raw_xlsx_rows(input_file_path, sheet_name, engine):
+        row = [_convert_xlsx_value(value) for value in raw_row]
+        while row and row[-1] == '':
+            row.pop()
+        if not row:
+            # Only emit empty rows once a later row proves they are not trailing
+            pending_empty_rows += 1
+            continue
+        for _ in range(pending_empty_rows):
+            yield []
+        pending_empty_rows = 0
+        yield row
+
+
+def xlsx_rows_to_frame(rows):
+    """ Build the header=None frame pd.read_excel would return from rows of converted cell values. """
+    rows = list(rows)
+    if not rows:
+        return pd.DataFrame()
+
+    # Extend rows to the full width, as pd.read_excel does
+    width = max(len(row) for row in rows)
+    rows = [row + [''] * (width - len(row)) for row in rows]
+    return TextParser(rows, header=None, skip_blank_lines=False).read()
+
+
+def _xlsx_rows_window_frame(rows):
+    """ Frame of raw rows for the header search, with empty cells as NaN like the parsed sheet. """
+    width = max((len(row) for row in rows), default=0)
+    cells = np.full((len(rows), width), np.nan, dtype=object)
+    for i, row in enumerate(rows):
+        cells[i, :len(row)] = row
+    cells[cells == ''] = np.nan
+    return pd.DataFrame(cells, dtype=object)
+
+
+def read_xlsx_from_header(input_file_path, sheet_name, header_values, xlsx_engine='auto', window=64):
+    """
+    Read an .xlsx sheet starting at its header row.
+
+    Rows are streamed and checked in windows (doubling in size) until one
+    contains every header value; the rows above it are dropped as they are
+    scanned. Returns a header=None frame whose first row is the header row,
+    or None when no row matches.
+    """
+    rows = iter_xlsx_rows(input_file_path, sheet_name, xlsx_engine)
+    skipped = 0
+    while True:
+        window_rows = [row for _, row in zip(range(window), rows)]
+        if not window_rows:
+            return None
+
+        header_row_index = find_header_row_index(_xlsx_rows_window_frame(window_rows), header_values)
+        if header_row_index is not None:
+            break
+        skipped += len(window_rows)
+        window *= 2
+
+    logger.debug("Header found at sheet row: %d", skipped + header_row_index)
+    return xlsx_rows_to_frame(window_rows[header_row_index:] + list(rows))
+
+
 def apply_removal_criteria(df, criteria):
-    
-    column = criteria['applied_column']
-    if column not in df.columns:
-        print(f"The column '{column}' does not exist in the dataframe. Skipping the removal criteria.")
-        return df
-    
-    # column = criteria['applied_column']
+    return apply_removal_plan(df, [criteria])
+
+
+def compile_removal_criteria(criteria_rows):
+    """
+    Compile the cal_df rows of one linked_input_class into a removal plan.
+
+    The plan is a list of criteria dicts with the applied column already
+    stripped and lower-cased; rows without an applied column are dropped.
+    criteria_rows may also be a ClassCriteria, whose plan is already built.
+    """
+    if isinstance(criteria_rows, ClassCriteria):
+        return list(criteria_rows.removal_plan)
+
+    plan = []
+    for _, criteria in criteria_rows.iterrows():
+        logger.debug("Applying criteria: %s %s %s", criteria['applied_column'],
+                     criteria['criteria_to_remove_row'], criteria['criteria_value'])
+
+        # Handle potential NaN or non-string values in 'applied_column'
+        if pd.isna(criteria['applied_column']):
+            logger.debug("No applied column provided. Skipping this criteria.")
+            continue
+
+        plan.append({
+            'applied_column': criteria['applied_column'].strip().lower(),
+            'criteria_to_remove_row': criteria['criteria_to_remove_row'],
+            'criteria_value': criteria['criteria_value']
+        })
+    return plan
+
+
+def header_values_of(criteria_rows):
+    """ Normalized header values of a class: remove_rows_list of its first cal_df row (or of a ClassCriteria). """
+    if isinstance(criteria_rows, ClassCriteria):
+        remove_rows_list = criteria_rows.remove_rows_list
+    else:
+        remove_rows_list = criteria_rows.iloc[0]['remove_rows_list']
+    return [normalize_text(value) for value in remove_rows_list.split(',')]
+
+
+def describe_criteria(criteria):
+    """ One line saying what a removal plan entry removes, for explaining a config. """
+    operation = criteria['criteria_to_remove_row']
+    if operation not in CRITERIA_OPERATIONS:
+        return f"{criteria['applied_column']}: unknown operation {operation!r}, removes nothing"
+    removes = CRITERIA_OPERATIONS[operation].format(value=criteria['criteria_value'])
+    if operation == 'contain' and isinstance(criteria['criteria_value'], str):
+        kind = 'regex' if REGEX_METACHARACTERS.intersection(criteria['criteria_value']) else 'substring'
+        removes += f" ({kind})"
+    return f"{criteria['applied_column']}: removes {removes}"
+
+
+@functools.lru_cache(maxsize=1024)
+def _contain_search(value):
+    """ Search function for one 'contain' value: a substring test for plain text, else its compiled regex. """
+    if REGEX_METACHARACTERS.isdisjoint(value):
+        return lambda text: value in text
+    return re.compile(value).search
+
+
+@functools.lru_cache(maxsize=1024)
+def _merged_contain_search(values):
+    """
+    Search for any of several 'contain' values in one alternation, or None
+    when they cannot be merged without changing what each one matches
+    (capture groups would renumber backreferences, inline flags would leak).
+    """
+    patterns = []
+    for value in values:
+        if REGEX_METACHARACTERS.isdisjoint(value):
+            patterns.append(re.escape(value))
+            continue
+        try:
+            compiled = re.compile(value)
+        except re.error:
+            return None
+        if compiled.groups or re.search(r'\(\?[aiLmsux]', value):
+            return None
+        patterns.append(f"(?:{value})")
+    return re.compile('|'.join(patterns)).search
+
+
+def _contain_matches(series, values):
+    """
+    Rows of series containing each of values, as str.contains(value, na=False, regex=True) finds them.
+
+    Columns repeat the same text heavily, so only the distinct cells are
+    searched: first with one alternation of all values to dismiss the cells
+    matching none, then each remaining cell against each value.
+    """
+    # Columns without text raise here, as str.contains does; the accessor is
+    # built uncached, as series.str would leave a cycle holding the column
+    pd.Series.str(series)
+
+    codes, uniques = pd.factorize(series)
+    candidates = [i for i, text in enumerate(uniques) if isinstance(text, str)]
+    values = list(dict.fromkeys(values))
+    if len(values) > 1:
+        merged_search = _merged_contain_search(tuple(values))
+        if merged_search is not None:
+            candidates = [i for i in candidates if merged_search(uniques[i])]
+
+    matches = {}
+    for value in values:
+        search = _contain_search(value)
+        # The extra last slot is picked by the -1 code of missing values
+        unique_matches = np.zeros(len(uniques) + 1, dtype=bool)
+        unique_matches[[i for i in candidates if search(uniques[i])]] = True
+        matches[value] = unique_matches[codes]
+    return matches
+
+
+def numeric_values(series):
+    """
+    float64 values of series for the numeric criteria, and a mask of the cells that are not numbers.
+
+    Numeric columns are used as they are. Text columns (every column read
+    with header=None) are converted one distinct value at a time; blanks are
+    missing, and cells that still are not numbers become NaN and are flagged.
+    Returns (None, None) for date and duration columns, which have no
+    float64 view.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_timedelta64_dtype(series):
+        return None, None
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan), np.zeros(len(series), dtype=bool)
+
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    blank = uniques.map(lambda x: isinstance(x, str) and not x.strip()).to_numpy(dtype=bool)
+    numbers = pd.to_numeric(uniques, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    # The extra last slot is picked by the -1 code of missing values
+    numbers = np.append(numbers, np.nan)
+    unconvertible = np.append(np.isnan(numbers[:-1]) & ~blank, False)
+    return numbers[codes], unconvertible[codes]
+
+
+class TypedColumns:
+    """
+    Typed views of the columns of one frame, each built once on first use.
+
+    Inputs are read with header=None, so after the header row is promoted
+    every column holds text or mixed objects. The removal criteria run on
+    these views instead: '=' on the stripped text, the numeric criteria on
+    float64 values (see numeric_values) and 'contain' on the matches of the
+    distinct text cells, with every 'contain' value of the plan for a column
+    searched in the same scan. The frame itself is left as read, so outputs
+    keep their cells unchanged. '=' and 'contain' see a column a low-memory
+    frame holds as numbers parsed from text as that text (see
+    f01_memory.read_column).
+    """
+
+    def __init__(self, df, contain_values=None):
+        self.df = df
+        self.contain_values = contain_values or {}
+        self.unconvertible = {}  # column -> mask of the cells numeric_values could not convert
+        self._text = {}
+        self._numbers = {}
+        self._contain_matches = {}
+
+    def text(self, column):
+        if column not in self._text:
+            series = read_column(self.df, column)
+            # map(str.strip) rather than .str.strip(): the cached .str/.cat
+            # accessors form reference cycles that keep whole columns alive
+            # until the garbage collector runs, which piles up across chunks
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Strip each category once; missing cells read 'nan' as astype(str) gives
+                categories = series.array.categories.astype(str).map(str.strip).to_numpy(dtype=object)
+                self._text[column] = np.append(categories, 'nan')[series.array.codes]
+            else:
+                self._text[column] = series.astype(str).map(str.strip).to_numpy(dtype=object)
+        return self._text[column]
+
+    def numbers(self, column):
+        """ float64 values of column, or None when it has no numeric view. """
+        if column not in self._numbers:
+            numbers, unconvertible = numeric_values(self.df[column])
+            self._numbers[column] = numbers
+            if unconvertible is not None and unconvertible.any():
+                self.unconvertible[column] = unconvertible
+        return self._numbers[column]
+
+    def contain_matches(self, column, value):
+        matches = self._contain_matches.setdefault(column, {})
+        if value not in matches:
+            values = self.contain_values.get(column) or [value]
+            matches.update(_contain_matches(read_column(self.df, column), values if value in values else [value]))
+        return matches[value]
+
+
+def _criteria_keep_mask(typed, column, criteria):
+    """ Boolean array of the rows the criteria keeps, or None if it keeps every row. """
     operation = criteria['criteria_to_remove_row']
     value = criteria['criteria_value']
-    
+
     if operation == '=':
-        # Remove rows where the column value equals the criteria value
-        df = df[df[column].astype(str).str.strip() != value]
-    elif operation == '> =':
-        # Remove rows where the column value is less than the criteria value
-        df = df[df[column] < float(value)]
-    elif operation == '>':
-        # Remove rows where the column value is less than or equal to the criteria value
-        df = df[df[column] <= float(value)]
-    elif operation == '< =':
-        # Remove rows where the column value is greater than the criteria value
-        df = df[df[column] > float(value)]
-    elif operation == '<':
-        # The '<' case is correctly implemented in the original prompt as removing rows where the value is greater or equal
-        df = df[df[column] >= float(value)]  # Correcting based on the initial explanation
+        # Remove rows where the column value equals the criteria value; the
+        # string conversion is shared by every '=' criteria on this column
+        return typed.text(column) != value
+    elif operation in ('> =', '>', '< =', '<'):
+        # Compare the float64 view when the column has one; blank and
+        # non-numeric cells compare as NaN, like blanks of a numeric column
+        numbers = typed.numbers(column)
+        series = numbers if numbers is not None else typed.df[column]
+        if operation == '> =':
+            # Remove rows where the column value is less than the criteria value
+            keep = series < float(value)
+        elif operation == '>':
+            # Remove rows where the column value is less than or equal to the criteria value
+            keep = series <= float(value)
+        elif operation == '< =':
+            # Remove rows where the column value is greater than the criteria value
+            keep = series > float(value)
+        else:
+            # Remove rows where the value is greater or equal
+            keep = series >= float(value)
+        if numbers is not None:
+            return keep
     elif operation == 'contain':
         # Remove rows that contain the criteria value
-        df = df[~df[column].str.contains(value, na=False, regex=True)]
+        if not isinstance(value, str):
+            keep = ~pd.Series.str(read_column(typed.df, column)).contains(value, na=False, regex=True)
+        else:
+            return ~typed.contain_matches(column, value)
+    else:
+        return None
 
-    return df
+    return keep.to_numpy(dtype=bool, na_value=False)
+
+
+def apply_removal_plan(df, plan, stats=None):
+    """
+    Apply every criteria of a compiled plan to df in a single pass.
+
+    Each criteria contributes to one combined keep-mask built from the column
+    arrays, and the filtered frame is taken once at the end instead of once
+    per criteria. The criteria compare the typed column views of TypedColumns.
+    With stats (see f01_run_report) the rows removed by and the time spent in
+    each criteria are recorded, along with the cells the numeric criteria
+    could not read as numbers.
+    """
+    keep = np.ones(len(df), dtype=bool)
+    contain_values = {}
+    for criteria in plan:
+        if criteria['criteria_to_remove_row'] == 'contain' and isinstance(criteria['criteria_value'], str):
+            contain_values.setdefault(criteria['applied_column'], []).append(criteria['criteria_value'])
+    typed = TypedColumns(df, contain_values)
+
+    for position, criteria in enumerate(plan):
+        column = criteria['applied_column']
+        if column not in df.columns:
+            logger.warning("The column '%s' does not exist in the dataframe. Skipping the removal criteria.", column)
+            continue
+
+        start = time.perf_counter()
+        criteria_keep = _criteria_keep_mask(typed, column, criteria)
+        if criteria_keep is not None:
+            if stats is not None:
+                record_criteria(stats, position, criteria, np.count_nonzero(keep & ~criteria_keep),
+                                time.perf_counter() - start)
+            keep &= criteria_keep
+
+    for column, unconvertible in typed.unconvertible.items():
+        logger.debug("Column '%s': %d cells are not numbers and compare as blank", column,
+                     np.count_nonzero(unconvertible))
+        record_unconvertible(stats, column, df[column].to_numpy(dtype=object)[unconvertible])
+
+    if keep.all():
+        return df
+    return df[keep]
 
 
 def normalize_text(text):
     """ Normalize text to retain dots and commas, converting to lower case for comparison. """
     # Retaining dots, commas, and converting to lower case
-    return re.sub(r'[^a-zA-Z0-9.,]+', '', text).lower()
+    return NON_TEXT_CHARACTERS.sub('', text).lower()
 
-def run_removal_automation(file_config_df, cal_df, base_path):
-    base_path = Path(base_path)
-    excel_writers = {}  # Manage ExcelWriter objects for each output file
 
-    for _, file_info in file_config_df.iterrows():
-        if pd.isna(file_info['input_folder_path']) or pd.isna(file_info['input_file_name']):
+def normalize_cell_matrix(df):
+    """
+    Vectorized equivalent of applying normalize_text(str(x)) to every cell of df.
+
+    Returns a 2-D numpy array of normalized strings with the same shape as df.
+    """
+    # to_numpy() interleaves the blocks exactly like iterrows() does, so cells
+    # are stringified the same way as the row-by-row search
+    values = pd.Series(df.to_numpy().astype(object).ravel(), dtype=object).astype(str)
+
+    # Sheets repeat the same text heavily, so only normalize each distinct value once
+    codes, uniques = pd.factorize(values)
+    normalized = (pd.Series(uniques, dtype=object)
+                  .str.replace(NON_TEXT_CHARACTERS, '', regex=True)
+                  .str.lower()
+                  .to_numpy(dtype=object))
+    return normalized[codes].reshape(df.shape)
+
+
+def find_header_row_index(df, header_values, window=64):
+    """
+    Locate the first row of df that contains every value in header_values.
+
+    The first row is checked on its own. The rows below it are normalized in
+    batches of `window` rows (doubling on each pass) and the membership check
+    runs across the whole batch at once, so a header a few thousand rows down
+    no longer costs a Python loop per cell.
+
+    Returns the positional index of the header row, or None if no row matches.
+    """
+    n_rows = len(df)
+    if n_rows == 0:
+        return None
+
+    # Most inputs start with their header: check the first row on its own, without building a batch
+    first_row_values = {normalize_text(str(x)) for x in df.iloc[0].values}
+    if all(header_value in first_row_values for header_value in header_values):
+        return 0
+
+    start = 1
+    while start < n_rows:
+        stop = min(start + window, n_rows)
+        matrix = normalize_cell_matrix(df.iloc[start:stop])
+
+        # A row matches when every header value equals at least one of its cells
+        matches = np.ones(stop - start, dtype=bool)
+        for header_value in header_values:
+            matches &= (matrix == header_value).any(axis=1)
+
+        hits = np.flatnonzero(matches)
+        if hits.size:
+            return start + int(hits[0])
+
+        start = stop
+        window *= 2
+
+    return None
+
+
+def promote_header_row(df, header_values):
+    """ Use the first row containing every header value as the header and drop the rows above it. """
+    # Search the rows for the header in vectorized batches
+    header_row_index = find_header_row_index(df, header_values)
+    if header_row_index == 0:
+        logger.debug("First row matches header criteria, using as header.")
+    elif header_row_index is not None:
+        logger.debug("Header found at index: %d", header_row_index)
+
+    if header_row_index is not None:
+        new_header = df.iloc[header_row_index]  # Assuming this is the correct header
+        df = df.iloc[header_row_index + 1:]  # Remove the header row and anything above it
+        # Strip whitespace and convert to lower case for each header
+        df.columns = [col.strip().lower() for col in new_header]
+        df.reset_index(drop=True, inplace=True)
+        logger.debug("Header set successfully.")
+    else:
+        logger.error("Suitable header row could not be found based on the provided criteria.")
+
+    return df
+
+
+def _compact(df, stats, input_file_path):
+    """
+    compact_frame(df), logging and recording the memory it takes before and after.
+
+    A frame read_input_file_type already compacted is compacted again: with
+    the report lines and the header row gone, its text columns may now parse
+    into numbers.
+    """
+    before = frame_memory(df)[0]
+    df = compact_frame(df)
+    after = frame_memory(df)[1]
+    logger.info("Low-memory frame of %s: %.1f MB -> %.1f MB", input_file_path, before / 1e6, after / 1e6)
+    if stats is not None:
+        memory = stats.setdefault('memory', {'bytes_before': 0, 'bytes_after': 0})
+        # Chunks are held one at a time, so keep the largest
+        memory['bytes_before'] = max(memory['bytes_before'], before)
+        memory['bytes_after'] = max(memory['bytes_after'], after)
+    return df
+
+
+def _read_promoted(input_file_path, input_file_type, input_sheet_name, header_values, xlsx_engine, stats,
+                   low_memory):
+    """ The read and header_search stages of process_input_file; returns the frame and the rows read. """
+    with stage_timer(stats, 'read'):
+        df = None
+        if input_file_type == '.xlsx' and resolve_xlsx_engine(xlsx_engine) != 'pandas':
+            # Stream the sheet and only build the frame from the header row down
+            df = read_xlsx_from_header(input_file_path, input_sheet_name, header_values, xlsx_engine)
+        if df is None:
+            df = read_input_file_type(input_file_path, input_file_type, input_sheet_name, xlsx_engine=xlsx_engine,
+                                      low_memory=low_memory)
+    input_rows = len(df)
+
+    # Debug output of first row values, only built when it is logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("First row values: %s", [normalize_text(str(x)) for x in df.iloc[0].values])
+
+    with stage_timer(stats, 'header_search'):
+        df = promote_header_row(df, header_values)
+
+    if low_memory:
+        df = _compact(df, stats, input_file_path)
+    return df, input_rows
+
+
+def process_input_file(input_file_path, input_file_type, input_sheet_name, criteria_rows, xlsx_engine='auto',
+                       stats=None, low_memory=False, input_cache=None):
+    """
+    Read one input file, promote its header row and apply the removal criteria of its class.
+
+    criteria_rows are the cal_df rows of the file's class, or its
+    ClassCriteria (see f00_read_configs.build_criteria_records).
+    With stats (see f01_run_report.new_file_stats) the time of each stage and
+    the row counts are recorded in it. With low_memory the frame is kept in
+    compact types (see f01_memory.compact_frame) from the header row on; the
+    criteria run on them directly and the written output is unchanged.
+
+    With input_cache (an f01_input_cache.ParsedInputCache) the header-promoted
+    frame is taken from the cache when this file was already read with the
+    same header values, and kept there otherwise; stats['input_cache'] says
+    which.
+    """
+    header_values = header_values_of(criteria_rows)
+
+    cached = key = None
+    if input_cache is not None:
+        key = input_cache.key(input_file_path, input_sheet_name, header_values, input_file_type=input_file_type,
+                              xlsx_engine=resolve_xlsx_engine(xlsx_engine), low_memory=bool(low_memory))
+        cached = input_cache.get(key)
+        if stats is not None:
+            stats['input_cache'] = 'miss' if cached is None else 'hit'
+    if cached is not None:
+        df, input_rows = cached
+    else:
+        df, input_rows = _read_promoted(input_file_path, input_file_type, input_sheet_name, header_values,
+                                        xlsx_engine, stats, low_memory)
+        if input_cache is not None:
+            input_cache.put(key, df, input_rows)
+    if stats is not None:
+        stats['input_rows'] = input_rows
+
+    # Compile every criteria of the class into one plan and filter in one pass
+    with stage_timer(stats, 'criteria'):
+        removal_plan = compile_removal_criteria(criteria_rows)
+        df = apply_removal_plan(df, removal_plan, stats)
+    if stats is not None:
+        stats['output_rows'] = len(df)
+    return df
+
+
+def _timed_chunks(chunks, stats):
+    """ Yield the frames of a chunked reader, timing each read as the 'read' stage. """
+    chunks = iter(chunks)
+    while True:
+        with stage_timer(stats, 'read'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def iter_removal_chunks(input_file_path, input_file_type, criteria_rows, chunksize, stats=None, low_memory=False):
+    """
+    Streaming version of process_input_file for .csv/.txt inputs.
+
+    The file is read chunksize rows at a time; the header is located in the
+    leading chunk(s), the rows above it are dropped and the removal plan is
+    applied to each chunk as it arrives. The first frame yielded always carries
+    the header (it may be empty), and the index of every chunk continues where
+    the previous one stopped, so pd.concat of the chunks equals the in-memory
+    result.
+    """
+    header_values = header_values_of(criteria_rows)
+    removal_plan = compile_removal_criteria(criteria_rows)
+
+    chunks = _timed_chunks(read_input_file_type(input_file_path, input_file_type, chunksize=chunksize), stats)
+    columns = None
+    for chunk in chunks:
+        if stats is not None:
+            stats['input_rows'] += len(chunk)
+        if columns is None:
+            if chunk.index[0] == 0 and logger.isEnabledFor(logging.DEBUG):
+                # Debug output of first row values
+                logger.debug("First row values: %s", [normalize_text(str(x)) for x in chunk.iloc[0].values])
+
+            # Rows before the header are discarded, so keep scanning chunk by chunk
+            with stage_timer(stats, 'header_search'):
+                header_row_index = find_header_row_index(chunk, header_values)
+            if header_row_index is None:
+                continue
+
+            logger.debug("Header found at index: %d", chunk.index[header_row_index])
+            columns = [col.strip().lower() for col in chunk.iloc[header_row_index]]
+            chunk = chunk.iloc[header_row_index + 1:]
+            offset = 0
+            logger.debug("Header set successfully.")
+
+        chunk.columns = columns
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        if low_memory:
+            chunk = _compact(chunk, stats, input_file_path)
+        with stage_timer(stats, 'criteria'):
+            chunk = apply_removal_plan(chunk, removal_plan, stats)
+        if stats is not None:
+            stats['output_rows'] += len(chunk)
+        yield chunk
+
+    if columns is None:
+        # No header anywhere: like the in-memory path, keep every row unpromoted
+        logger.error("Suitable header row could not be found based on the provided criteria.")
+        for chunk in _timed_chunks(read_input_file_type(input_file_path, input_file_type, chunksize=chunksize), stats):
+            if low_memory:
+                chunk = _compact(chunk, stats, input_file_path)
+            with stage_timer(stats, 'criteria'):
+                chunk = apply_removal_plan(chunk, removal_plan, stats)
+            if stats is not None:
+                stats['output_rows'] += len(chunk)
+            yield chunk
+
+
+def read_input_batch(input_file_paths, input_file_type):
+    """
+    Read several .csv/.txt inputs with a single parser call.
+
+    The files are joined with a BATCH_FILE_SEPARATOR line between them and
+    read like read_input_file_type reads one of them. Returns the frame and
+    the (start, stop) rows of every file in it, or None when the files cannot
+    be read together (e.g. a later file has more columns than the first).
+    """
+    contents = []
+    for path in input_file_paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data.startswith(codecs.BOM_UTF8):
+            data = data[len(codecs.BOM_UTF8):]
+        if data and not data.endswith(b'\n'):
+            data += b'\n'
+        contents.append(data)
+    separator = BATCH_FILE_SEPARATOR.encode() + b'\n'
+    try:
+        df = pd.read_csv(io.BytesIO(separator.join(contents)), header=None, dtype=str,
+                         delimiter='\t' if input_file_type == '.txt' else ',')
+    except ValueError as e:
+        logger.debug("Batch of %d files not read together: %s", len(contents), e)
+        return None
+
+    separators = np.flatnonzero(df[0].to_numpy(dtype=object) == BATCH_FILE_SEPARATOR)
+    if len(separators) != len(contents) - 1:
+        # A quote left open in one file ran over the separator
+        return None
+    starts = np.concatenate([[0], separators + 1])
+    stops = np.concatenate([separators, [len(df)]])
+    return df, list(zip(starts.tolist(), stops.tolist()))
+
+
+def process_input_batch(jobs):
+    """
+    process_input_file for many small .csv/.txt inputs of the same class and layout at once.
+
+    The files are read with one parser call (see read_input_batch). The
+    header row is searched in the first file, and every file whose first
+    row containing the header values is at the same position and holds the
+    same column names has the same layout. Those are filtered in one pass of
+    the removal plan over their concatenated data rows and split back per
+    file, with the same rows and index as process_input_file gives.
+
+    Returns one (df, stats) per job; it is None for files of another layout,
+    which are left to process_input_file. The stage times of the batch are
+    shared evenly between its files; its criteria counts and unconvertible
+    cells are recorded with its first file.
+    """
+    results = [None] * len(jobs)
+    batch_stats = new_file_stats(jobs[0])
+    criteria_rows = jobs[0]['criteria_rows']
+    header_values = header_values_of(criteria_rows)
+
+    with stage_timer(batch_stats, 'read'):
+        batch = read_input_batch([job['input_file_path'] for job in jobs], jobs[0]['input_file_type'])
+    if batch is None:
+        return results
+    df, bounds = batch
+
+    with stage_timer(batch_stats, 'header_search'):
+        start, stop = bounds[0]
+        header_row_index = find_header_row_index(df.iloc[start:stop], header_values)
+        if header_row_index is None or df.iloc[start + header_row_index].isna().any():
+            return results
+        header_row = df.iloc[start + header_row_index].tolist()
+
+        # The leading rows of every file, down to its header row, in one search
+        candidates = [k for k, (start, stop) in enumerate(bounds) if stop - start > header_row_index]
+        heads = df.take(np.concatenate([np.arange(bounds[k][0], bounds[k][0] + header_row_index + 1)
+                                        for k in candidates]))
+        matrix = normalize_cell_matrix(heads)
+        matches = np.ones(len(heads), dtype=bool)
+        for header_value in header_values:
+            matches &= (matrix == header_value).any(axis=1)
+        matches = matches.reshape(len(candidates), header_row_index + 1)
+        same_header = matches[:, -1] & ~matches[:, :-1].any(axis=1)
+        members = [k for k, same in zip(candidates, same_header)
+                   if same and df.iloc[bounds[k][0] + header_row_index].tolist() == header_row]
+
+        # Data rows of the members, with their file and their index within it
+        ranges = [np.arange(bounds[k][0] + header_row_index + 1, bounds[k][1]) for k in members]
+        data = df.take(np.concatenate(ranges))
+        data.columns = [col.strip().lower() for col in header_row]
+        data.index = pd.RangeIndex(len(data))
+        file_of_row = np.repeat(np.arange(len(members)), [len(r) for r in ranges])
+        local = np.concatenate([np.arange(len(r)) for r in ranges])
+
+    with stage_timer(batch_stats, 'criteria'):
+        data = apply_removal_plan(data, compile_removal_criteria(criteria_rows), batch_stats)
+    # Files are consecutive in the batch, so each one's rows are a slice of the filtered frame
+    kept = data.index.to_numpy()
+    cuts = np.searchsorted(file_of_row[kept], np.arange(len(members) + 1))
+    logger.info("Batch of %d %s files of %s processed together, %d left to process one by one",
+                len(members), jobs[0]['input_file_type'], jobs[0]['input_file_path'], len(jobs) - len(members))
+
+    for position, k in enumerate(members):
+        file_df = data.iloc[cuts[position]:cuts[position + 1]]
+        file_df.index = pd.Index(local[kept[cuts[position]:cuts[position + 1]]])
+        stats = new_file_stats(jobs[k])
+        stats['stages'] = {stage: seconds / len(members) for stage, seconds in batch_stats['stages'].items()}
+        stats['batch_files'] = len(members)
+        stats['input_rows'] = bounds[k][1] - bounds[k][0]
+        stats['output_rows'] = len(file_df)
+        if position == 0:
+            for key in ('criteria', 'unconvertible_cells', 'stage_peak_bytes'):
+                if key in batch_stats:
+                    stats[key] = batch_stats[key]
+            if 'stage_peak_bytes' in batch_stats:
+                stats['peak_bytes'] = max(batch_stats['stage_peak_bytes'].values())
+        results[k] = file_df, stats
+    return results
+
+
+def _process_batch_job(jobs, xlsx_engine='auto', low_memory=False, memory_profile=False, input_cache_bytes=None):
+    """ process_input_batch for the jobs of one batch, with _process_file_job for those it leaves. """
+    if memory_profile and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    results = process_input_batch(jobs)
+    return [result if result is not None
+            else _process_file_job(job, xlsx_engine, low_memory, memory_profile, input_cache_bytes)
+            for job, result in zip(jobs, results)]
+
+
+def _process_file_job(job, xlsx_engine='auto', low_memory=False, memory_profile=False, input_cache_bytes=None):
+    """ Run process_input_file for one job; return the filtered frame and the job's statistics. """
+    if memory_profile and not tracemalloc.is_tracing():
+        # Pool workers trace from their first job on
+        tracemalloc.start()
+    # Pool workers each keep their own cache
+    input_cache = process_input_cache(input_cache_bytes) if input_cache_bytes is not None else None
+    stats = new_file_stats(job)
+    with file_peak(stats):
+        df = process_input_file(job['input_file_path'], job['input_file_type'], job['input_sheet_name'],
+                                job['criteria_rows'], xlsx_engine, stats, job.get('low_memory', low_memory),
+                                input_cache)
+    return df, stats
+
+
+def _apply_memory_budget(job, memory_budget, chunksize=None):
+    """
+    Pick a bounded-memory path for a job whose input would not fit in memory_budget bytes.
+
+    .csv/.txt inputs are streamed in chunks sized to the budget (see
+    iter_removal_chunks); returns the job, or a copy with 'chunksize' and
+    'memory_fallback' set. .xlsx inputs have their column types inferred
+    over the whole sheet, so they are always read whole: one over the budget
+    raises MemoryBudgetError before it is read.
+    """
+    estimate = estimate_peak_bytes(job['input_file_path'], job['input_file_type'])
+    if estimate <= memory_budget:
+        return job
+
+    if job['input_file_type'] not in STREAMED_FILE_TYPES:
+        raise MemoryBudgetError(
+            f"{job['input_file_path']} needs about {estimate / 1e6:.0f} MB, over the {memory_budget / 1e6:.0f} MB "
+            f"memory budget, and {job['input_file_type']} inputs cannot be streamed: raise the budget or convert "
+            f"it to .csv")
+
+    budget_rows = budget_chunksize(job['input_file_path'], memory_budget)
+    job = dict(job, chunksize=min(chunksize, budget_rows) if chunksize else budget_rows, memory_fallback='chunked')
+    logger.warning("%s needs about %.0f MB, over the %.0f MB memory budget: processing it in chunks of %d rows",
+                   job['input_file_path'], estimate / 1e6, memory_budget / 1e6, job['chunksize'])
+    return job
+
+
+def _drop_replaced_jobs(jobs, report):
+    """
+    Keep only the last job writing each output sheet.
+
+    Writing a sheet again replaces it, so the earlier jobs would be thrown
+    away; they are dropped before anything is read or written.
+    """
+    jobs = list(jobs)
+    last_job = {output_key(job['output_file_path'], job['sheet_name']): id(job) for job in jobs}
+    kept = []
+    for job in jobs:
+        if last_job[output_key(job['output_file_path'], job['sheet_name'])] != id(job):
+            logger.warning("Sheet %s of %s is written again by a later config row: skipping %s",
+                           job['sheet_name'], job['output_file_path'], job['input_file_path'])
+            report.add_skipped(job['input_file_path'], 'sheet replaced by a later row')
             continue
+        kept.append(job)
+    return kept
 
-        input_file_path = base_path / file_info['input_folder_path'] / file_info['input_file_name']
-        input_file_path = input_file_path.with_suffix(file_info['input_file_type'] if not input_file_path.suffix else input_file_path.suffix)
 
+def _submit_ahead(jobs, submit, ahead):
+    """ Yield (job, submit(job)) in order, with at most ahead jobs submitted and not yet yielded. """
+    queued = collections.deque()
+    for job in jobs:
+        queued.append((job, submit(job)))
+        if len(queued) >= ahead:
+            yield queued.popleft()
+    while queued:
+        yield queued.popleft()
 
-        output_file_name = file_info['output_file_name']
-            # Check if the file name has an extension, if not, append '.xlsx'
-        if '.' not in output_file_name:
-            output_file_name += '.xlsx'
 
-        output_file_path = base_path / file_info['output_folder_path'] / output_file_name
+def _plan_batches(jobs, batch_size, batchable):
+    """
+    Group the jobs accepted by batchable by input type and criteria, in batches of up to batch_size.
 
-        print("Output file path:", output_file_path)
+    Returns the batch of every job that is in one with at least one other job, keyed by id(job).
+    """
+    groups = {}
+    for job in jobs:
+        if batchable(job):
+            key = (job['input_file_type'], repr(header_values_of(job['criteria_rows'])),
+                   repr(compile_removal_criteria(job['criteria_rows'])))
+            groups.setdefault(key, []).append(job)
 
-        # output_file_path = base_path / file_info['output_folder_path'] / file_info['output_file_name']
-        # output_file_path = output_file_path.with_suffix('.xlsx' if not output_file_path.suffix else output_file_path.suffix)
+    batch_of = {}
+    for group in groups.values():
+        for start in range(0, len(group), batch_size):
+            batch = group[start:start + batch_size]
+            if len(batch) > 1:
+                batch_of.update((id(job), batch) for job in batch)
+    return batch_of
 
-        sheet_name = file_info.get('output_sheet_name', 'Sheet1')
 
-        if not input_file_path.is_file():
-            print(f"File not found: {input_file_path}")
+def _iter_record_jobs(file_records, report=None):
+    """ Yield one job dict per FileRecord whose input file exists and that has criteria. """
+    for record in file_records:
+        if not record.input_file_path.is_file():
+            logger.warning("File not found: %s", record.input_file_path)
+            if report is not None:
+                report.add_skipped(record.input_file_path, 'file not found')
             continue
 
-        df = read_input_file_type(input_file_path, file_info['input_file_type'], file_info.get('input_sheet_name'))
+        if record.criteria is None:
+            logger.warning("No matching criteria found for key: %s", record.base_input_class)
+            if report is not None:
+                report.add_skipped(record.input_file_path, 'no matching criteria')
+            continue
+
+        yield {
+            'input_file_path': record.input_file_path,
+            'input_file_type': record.input_file_type,
+            'input_sheet_name': record.input_sheet_name,
+            'criteria_rows': record.criteria,
+            'output_file_path': record.output_file_path,
+            'sheet_name': record.output_sheet_name,
+        }
+
 
-        criteria_rows = cal_df[cal_df['linked_input_class'] == file_info['base_input_class']]
+def _iter_file_jobs(file_config_df, config_index, base_path, report=None):
+    """
+    Yield one job dict per file_config_df row that has an input file and matching criteria.
+
+    file_config_df may also be the file records of read_config_except_columns(as_records=True).
+    """
+    if not isinstance(file_config_df, pd.DataFrame):
+        yield from _iter_record_jobs(file_config_df, report)
+        return
+
+    for _, file_info in file_config_df.iterrows():
+        if pd.isna(file_info['input_folder_path']) or pd.isna(file_info['input_file_name']):
+            continue
+
+        input_file_path, output_file_path = resolve_file_paths(file_info, base_path)
+        logger.debug("Output file path: %s", output_file_path)
+
+        if not input_file_path.is_file():
+            logger.warning("File not found: %s", input_file_path)
+            if report is not None:
+                report.add_skipped(input_file_path, 'file not found')
+            continue
+
+        criteria_rows = get_cal(file_info, config_index)
         if criteria_rows.empty:
-            print(f"No matching criteria found for key: {file_info['base_input_class']}")
+            logger.warning("No matching criteria found for key: %s", file_info['base_input_class'])
+            if report is not None:
+                report.add_skipped(input_file_path, 'no matching criteria')
             continue
 
-        # header_values = [normalize_text(value) for value in criteria_rows.iloc[0]['remover_rows_above_header_column_list'].split(',')]
-        header_values = [normalize_text(value) for value in criteria_rows.iloc[0]['remove_rows_list'].split(',')]
+        yield {
+            'input_file_path': input_file_path,
+            'input_file_type': file_info['input_file_type'],
+            'input_sheet_name': file_info.get('input_sheet_name'),
+            'criteria_rows': criteria_rows,
+            'output_file_path': output_file_path,
+            'sheet_name': file_info.get('output_sheet_name', 'Sheet1'),
+        }
 
-        # Debug output of first row values
-        print("First row values for debugging:", [normalize_text(str(x)) for x in df.iloc[0].values])
 
-        # Directly check the first row as potential header
-        first_row_values = [normalize_text(str(x)) for x in df.iloc[0].values]
-        if all(header_value in first_row_values for header_value in header_values):
-            header_row_index = 0
-            print("First row matches header criteria, using as header.")
-        else:
-            # If not found in the first row, check subsequent rows
-            header_row_index = None
-            for index, row in df.iterrows():
-                row_values = [normalize_text(str(x)) for x in row.values]
-                if all(header_value in row_values for header_value in header_values):
-                    header_row_index = index
-                    print(f"Header found at index: {index}")
-                    break
-
-        
-        if header_row_index is not None:
-            new_header = df.iloc[header_row_index]  # Assuming this is the correct header
-            df = df.iloc[header_row_index + 1:]  # Remove the header row and anything above it
-            # df.columns = [col.strip() for col in new_header]  # Set the new header
-            # Strip whitespace and convert to lower case for each header
-            df.columns = [col.strip().lower() for col in new_header]  
-            df.reset_index(drop=True, inplace=True)
-            print("Header set successfully.")
-        else:
-            print("Error: Suitable header row could not be found based on the provided criteria.")
-    
-        # for idx, criteria in criteria_rows.iterrows():
-        #     print(f"Applying criteria: {criteria['applied_column']} {criteria['criteria_to_remove_row']} {criteria['criteria_value']}")
-        #     criteria_dict = {
-        #         'applied_column': criteria['applied_column'].strip().lower(),
-        #         'criteria_to_remove_row': criteria['criteria_to_remove_row'],
-        #         'criteria_value': criteria['criteria_value']
-        #     }
-        #     df = apply_removal_criteria(df, criteria_dict)
-        for idx, criteria in criteria_rows.iterrows():
-            print(f"Applying criteria: {criteria['applied_column']} {criteria['criteria_to_remove_row']} {criteria['criteria_value']}")
-
-            # Handle potential NaN or non-string values in 'applied_column'
-            if pd.isna(criteria['applied_column']):
-                print("No applied column provided. Skipping this criteria.")
-                continue
+def run_removal_automation(file_config_df, cal_df, base_path, workers=None, chunksize=None, xlsx_engine='auto',
+                           manifest_path=None, force_rebuild=False, report_path=None, low_memory=False,
+                           memory_profile=False, memory_budget=None, batch_size=None, input_cache_bytes=None):
+    """
+    Read, filter and write every input file listed in file_config_df.
+
+    With workers > 1 the read -> header detection -> criteria steps run in a
+    process pool of that size. Results are still written by this process in
+    config order, so several rows targeting the same output workbook are
+    serialized and the workbooks match a serial run. Only
+    SUBMIT_AHEAD_PER_WORKER jobs per worker are submitted ahead of the
+    writes, so the frames waiting to be written stay few.
+
+    With chunksize set, .csv/.txt inputs are streamed chunksize rows at a time
+    (see iter_removal_chunks) instead of being loaded whole. xlsx_engine picks
+    the reader for .xlsx inputs (see XLSX_ENGINES). low_memory keeps every
+    frame in compact types (see process_input_file) and reports the memory
+    saved.
+
+    memory_profile traces allocations with tracemalloc (slower) and records
+    the peak of every file and stage in the report. With memory_budget set
+    (in bytes), a .csv/.txt file whose estimated peak (see
+    f01_memory.estimate_peak_bytes) is over the budget is streamed in chunks
+    sized to it, and an .xlsx file over it fails the run with
+    MemoryBudgetError (see _apply_memory_budget).
+
+    With batch_size set, small .csv/.txt inputs (up to BATCH_MAX_FILE_BYTES)
+    of the same type and class are read, searched for their header and
+    filtered batch_size files at a time (see process_input_batch), and
+    written to their own output sheets as before. Streamed and low-memory
+    inputs are not batched.
+
+    With input_cache_bytes set, an input read by several config rows with
+    the same header values is parsed once: its header-promoted frame is kept
+    in the process's ParsedInputCache (see f01_input_cache), least recently
+    used frames dropped beyond input_cache_bytes. Each pool worker has its
+    own cache. Hits and misses are counted in the report.
+
+    With manifest_path set the run is incremental: output sheets whose input
+    file and criteria rows are unchanged since the run recorded in that
+    manifest are not read, filtered or written again (see RunManifest).
+    force_rebuild rebuilds every sheet and records the new state.
+
+    An output sheet written by several config rows comes from the last of
+    them; the earlier ones are skipped (see _drop_replaced_jobs).
+
+    cal_df may be a ConfigIndex built once after read_config_except_columns;
+    a plain frame is indexed here, so the criteria of each file are a lookup.
+    file_config_df may also be the file records returned by
+    read_config_except_columns(as_records=True): they carry their resolved
+    paths and compiled criteria, so no config row or criteria row is
+    re-parsed per file and cal_df is not used (it may be None).
+
+    Progress goes to the module logger. Wall time and row counts of every
+    file, stage and criteria are collected in a RunReport (see f01_run_report),
+    summarized in the log and, with report_path set, saved there as JSON.
+    The RunReport is returned.
+    """
+    base_path = Path(base_path)
+    excel_writers = {}  # Writer of each output workbook and columnar sheet file
+    report = RunReport()
+
+    def is_streamed(job):
+        return job.get('chunksize', chunksize) is not None and job['input_file_type'] in STREAMED_FILE_TYPES
+
+    def is_batched(job):
+        return (job['input_file_type'] in STREAMED_FILE_TYPES and not is_streamed(job)
+                and not job.get('low_memory', low_memory)
+                and job['input_file_path'].stat().st_size <= BATCH_MAX_FILE_BYTES)
 
-            criteria_dict = {
-                'applied_column': criteria['applied_column'].strip().lower(),
-                'criteria_to_remove_row': criteria['criteria_to_remove_row'],
-                'criteria_value': criteria['criteria_value']
-            }
-            df = apply_removal_criteria(df, criteria_dict)
+    process_file_job = partial(_process_file_job, xlsx_engine=xlsx_engine, low_memory=low_memory,
+                               memory_profile=memory_profile, input_cache_bytes=input_cache_bytes)
+    process_batch_job = partial(_process_batch_job, xlsx_engine=xlsx_engine, low_memory=low_memory,
+                                memory_profile=memory_profile, input_cache_bytes=input_cache_bytes)
+    config_index = cal_df if isinstance(cal_df, ConfigIndex) else ConfigIndex(cal_df)
+    jobs = _iter_file_jobs(file_config_df, config_index, base_path, report)
 
-        output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest = RunManifest(manifest_path) if manifest_path is not None else None
+    if manifest is not None:
+        all_jobs = list(jobs)
+        jobs = manifest.select_changed(all_jobs, force=force_rebuild)
+        selected = {id(job) for job in jobs}
+        for job in all_jobs:
+            if id(job) not in selected:
+                report.add_skipped(job['input_file_path'], 'unchanged')
 
-        # Manage ExcelWriter for output files
-        if output_file_path not in excel_writers:
-            if output_file_path.exists():
-                excel_writers[output_file_path] = pd.ExcelWriter(output_file_path, engine='openpyxl', mode='a', if_sheet_exists='replace')
+    jobs = _drop_replaced_jobs(jobs, report)
+
+    if memory_budget is not None:
+        # Checked for every file up front, so an .xlsx over the budget fails the run before anything is read
+        jobs = [_apply_memory_budget(job, memory_budget, chunksize) for job in jobs]
+
+    batch_of, batch_results = {}, {}
+    if batch_size is not None and batch_size > 1:
+        jobs = list(jobs)
+        batch_of = _plan_batches(jobs, batch_size, is_batched)
+
+    started_tracing = memory_profile and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    if workers is not None and workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+        def submit(job):
+            if is_streamed(job):
+                return None
+            batch = batch_of.get(id(job))
+            if batch is None:
+                return executor.submit(process_file_job, job)
+            if job is not batch[0]:
+                # Its frame comes with the first job of the batch, which is written before it
+                return None
+            return executor.submit(process_batch_job, batch)
+
+        # Only a few jobs ahead of the writes, so finished frames do not pile up in this process
+        pending = _submit_ahead(jobs, submit, SUBMIT_AHEAD_PER_WORKER * workers)
+    else:
+        executor = None
+        pending = ((job, None) for job in jobs)
+
+    try:
+        for job, future in pending:
+            if is_streamed(job):
+                stats = new_file_stats(job)
+                chunks = iter_removal_chunks(job['input_file_path'], job['input_file_type'], job['criteria_rows'],
+                                             job.get('chunksize', chunksize), stats, job.get('low_memory', low_memory))
+                with file_peak(stats), stage_timer(stats, 'write'):
+                    write_sheet_chunks(excel_writers, job['output_file_path'], job['sheet_name'], chunks)
+                # Writing pulled the chunks through the other stages; keep only its own time
+                stats['stages']['write'] -= sum(seconds for stage, seconds in stats['stages'].items()
+                                                if stage != 'write')
+                report.add_file(stats)
+                continue
+
+            if id(job) in batch_of:
+                # The whole batch is processed with its first job; the others wait for their turn to be written
+                if id(job) not in batch_results:
+                    batch = batch_of[id(job)]
+                    results = future.result() if future is not None else process_batch_job(batch)
+                    batch_results.update(zip(map(id, batch), results))
+                    del results
+                df, stats = batch_results.pop(id(job))
             else:
-                excel_writers[output_file_path] = pd.ExcelWriter(output_file_path, engine='openpyxl', mode='w')
-        
-        print("Excel writer status:", output_file_path in excel_writers)
-
-        # Save the data to the specified sheet
-        df.to_excel(excel_writers[output_file_path], sheet_name=sheet_name, index=False)
-        print(f"Data written to {sheet_name} in {output_file_path}")
-
-    # Close all Excel writers
-    for path, writer in excel_writers.items():
-        writer.close()
-        print(f"Closed writer for {path}")
\ No newline at end of file
+                df, stats = future.result() if future is not None else process_file_job(job)
+            # The future keeps its frame alive; let it go with the written frame
+            future = None
+            with file_peak(stats), stage_timer(stats, 'write'):
+                write_sheet(excel_writers, job['output_file_path'], job['sheet_name'], df)
+            del df
+            report.add_file(stats)
+    except BaseException:
+        # Leave existing workbooks as they were rather than saving a partial run
+        close_workbooks(excel_writers, discard=True)
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if started_tracing:
+            tracemalloc.stop()
+
+    # Write every collected workbook once
+    with report.stage('save'):
+        close_workbooks(excel_writers)
+
+    # Only a run whose outputs were all written is recorded
+    if manifest is not None:
+        manifest.save()
+
+    report.finish()
+    report.log_summary()
+    if report_path is not None:
+        report.write(report_path)
+    return report
\ No newline at end of file
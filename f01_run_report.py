@@ -0,0 +1,280 @@
+import json
+import time
+import logging
+import datetime
+import contextlib
+import tracemalloc
+import pandas as pd
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+# Stages timed for every input file, in pipeline order
+STAGES = ('read', 'header_search', 'criteria', 'write')
+
+
+def new_file_stats(job):
+    """ Empty per-file statistics for one job of run_removal_automation. """
+    stats = {
+        'input_file_path': str(job['input_file_path']),
+        'input_file_type': job['input_file_type'],
+        'output_file_path': str(job['output_file_path']),
+        'sheet_name': None if pd.isna(job['sheet_name']) else str(job['sheet_name']),
+        'stages': {},
+        'input_rows': 0,
+        'criteria': [],
+        'unconvertible_cells': {},
+        'output_rows': 0,
+    }
+    if 'memory_fallback' in job:
+        stats['memory_fallback'] = job['memory_fallback']
+    return stats
+
+
+# [bytes traced at the start, highest bytes traced since] of every
+# traced_peak block in progress, outermost first
+_open_peaks = []
+
+
+@contextlib.contextmanager
+def traced_peak(record):
+    """
+    Call record(bytes) with the peak tracemalloc allocation of the with-block.
+
+    The peak is counted above what was allocated when the block started.
+    Blocks may nest: an inner block resets the tracemalloc peak, so the
+    peak seen so far is handed to the enclosing blocks first. Nothing is
+    measured unless tracemalloc is tracing.
+    """
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    current, peak = tracemalloc.get_traced_memory()
+    for frame in _open_peaks:
+        frame[1] = max(frame[1], peak)
+    tracemalloc.reset_peak()
+    frame = [current, current]
+    _open_peaks.append(frame)
+    try:
+        yield
+    finally:
+        peak = tracemalloc.get_traced_memory()[1]
+        _open_peaks.remove(frame)
+        for open_frame in _open_peaks + [frame]:
+            open_frame[1] = max(open_frame[1], peak)
+        record(frame[1] - frame[0])
+
+
+def _record_peak(stats, key, stage=None):
+    def record(peak):
+        if stage is None:
+            stats[key] = max(stats.get(key, 0), peak)
+        else:
+            peaks = stats.setdefault(key, {})
+            peaks[stage] = max(peaks.get(stage, 0), peak)
+    return record
+
+
+def file_peak(stats):
+    """ Record the peak traced allocation of the with-block as stats['peak_bytes'] (see traced_peak). """
+    if stats is None:
+        return contextlib.nullcontext()
+    return traced_peak(_record_peak(stats, 'peak_bytes'))
+
+
+@contextlib.contextmanager
+def stage_timer(stats, stage):
+    """
+    Add the wall time of the with-block to stats['stages'][stage]; a no-op when stats is None.
+
+    While tracemalloc is tracing, the peak allocation of the stage is kept
+    in stats['stage_peak_bytes'][stage] as well.
+    """
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        with traced_peak(_record_peak(stats, 'stage_peak_bytes', stage)):
+            yield
+    finally:
+        stats['stages'][stage] = stats['stages'].get(stage, 0.0) + time.perf_counter() - start
+
+
+def record_criteria(stats, position, criteria, rows_removed, seconds):
+    """
+    Add the rows removed by the criteria at position of a removal plan.
+
+    Rows are counted against the criteria that removed them first, so the
+    counts of one file add up to its total removed rows. Repeated calls for
+    the same position (one per chunk) accumulate.
+    """
+    if stats is None:
+        return
+    while len(stats['criteria']) <= position:
+        stats['criteria'].append(None)
+    if stats['criteria'][position] is None:
+        stats['criteria'][position] = {
+            'applied_column': criteria['applied_column'],
+            'criteria_to_remove_row': criteria['criteria_to_remove_row'],
+            'criteria_value': str(criteria['criteria_value']),
+            'rows_removed': 0,
+            'seconds': 0.0,
+        }
+    stats['criteria'][position]['rows_removed'] += int(rows_removed)
+    stats['criteria'][position]['seconds'] += seconds
+
+
+# Distinct unconvertible values kept per column as examples
+UNCONVERTIBLE_EXAMPLES = 5
+
+
+def record_unconvertible(stats, column, values):
+    """ Add the cells of column that the numeric criteria could not read as numbers. """
+    if stats is None or not len(values):
+        return
+    entry = stats['unconvertible_cells'].setdefault(column, {'count': 0, 'examples': []})
+    entry['count'] += len(values)
+    for value in dict.fromkeys(str(v) for v in values[:1000]):
+        if len(entry['examples']) >= UNCONVERTIBLE_EXAMPLES:
+            break
+        if value not in entry['examples']:
+            entry['examples'].append(value)
+
+
+def _file_seconds(stats):
+    return sum(stats['stages'].values())
+
+
+class RunReport:
+    """
+    Statistics of one run_removal_automation call.
+
+    Collects the per-file statistics of every processed job, the jobs that
+    were skipped and the run-level timings, and turns them into a JSON
+    report with totals per stage and the files and criteria that took the
+    most time.
+    """
+
+    def __init__(self):
+        self.started = datetime.datetime.now()
+        self._start = time.perf_counter()
+        self.files = []
+        self.skipped = []
+        self.stages = {}  # Run-level stages, e.g. saving the workbooks
+        self.seconds = None
+
+    def add_file(self, stats):
+        self.files.append(stats)
+        logger.info("%s -> %s [%s]: %d rows in, %d rows out in %.3fs", stats['input_file_path'],
+                    stats['output_file_path'], stats['sheet_name'], stats['input_rows'],
+                    stats['output_rows'], _file_seconds(stats))
+        if 'peak_bytes' in stats:
+            logger.info("%s: peak traced memory %.1f MB (%s)", stats['input_file_path'], stats['peak_bytes'] / 1e6,
+                        ', '.join(f"{stage} {peak / 1e6:.1f} MB" for stage, peak in stats['stage_peak_bytes'].items()))
+        for column, entry in stats['unconvertible_cells'].items():
+            logger.warning("%s: %d cells of column '%s' are not numbers and compare as blank, e.g. %s",
+                           stats['input_file_path'], entry['count'], column, entry['examples'])
+
+    def add_skipped(self, input_file_path, reason):
+        self.skipped.append({'input_file_path': str(input_file_path), 'reason': reason})
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        """ Time a run-level stage. """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._start
+
+    def summary(self, top=10):
+        stage_totals = {stage: sum(f['stages'].get(stage, 0.0) for f in self.files) for stage in STAGES}
+
+        criteria_totals = {}
+        for stats in self.files:
+            for criteria in stats['criteria']:
+                if criteria is None:
+                    continue
+                key = (criteria['applied_column'], criteria['criteria_to_remove_row'], criteria['criteria_value'])
+                total = criteria_totals.setdefault(key, {'applied_column': key[0], 'criteria_to_remove_row': key[1],
+                                                         'criteria_value': key[2], 'files': 0,
+                                                         'rows_removed': 0, 'seconds': 0.0})
+                total['files'] += 1
+                total['rows_removed'] += criteria['rows_removed']
+                total['seconds'] += criteria['seconds']
+
+        slowest = sorted(self.files, key=_file_seconds, reverse=True)[:top]
+        summary = {
+            'files_processed': len(self.files),
+            'files_skipped': len(self.skipped),
+            'input_rows': sum(f['input_rows'] for f in self.files),
+            'output_rows': sum(f['output_rows'] for f in self.files),
+            'stage_seconds': {**stage_totals, **self.stages},
+            'slowest_files': [{'input_file_path': f['input_file_path'], 'sheet_name': f['sheet_name'],
+                               'seconds': _file_seconds(f)} for f in slowest],
+            'criteria': sorted(criteria_totals.values(), key=lambda c: c['seconds'], reverse=True)[:top],
+        }
+        # Only low-memory runs measure the frames
+        measured = [f['memory'] for f in self.files if 'memory' in f]
+        if measured:
+            summary['memory'] = {key: sum(m[key] for m in measured) for key in ('bytes_before', 'bytes_after')}
+        # Only runs with memory_profile set trace allocations
+        profiled = [f for f in self.files if 'peak_bytes' in f]
+        if profiled:
+            summary['peak_bytes'] = {
+                'stages': {stage: max(f['stage_peak_bytes'].get(stage, 0) for f in profiled) for stage in STAGES},
+                'files': [{'input_file_path': f['input_file_path'], 'sheet_name': f['sheet_name'],
+                           'peak_bytes': f['peak_bytes']}
+                          for f in sorted(profiled, key=lambda f: f['peak_bytes'], reverse=True)[:top]],
+            }
+        fallbacks = [f for f in self.files if 'memory_fallback' in f]
+        if fallbacks:
+            summary['memory_fallbacks'] = {mode: sum(f['memory_fallback'] == mode for f in fallbacks)
+                                           for mode in sorted({f['memory_fallback'] for f in fallbacks})}
+        # Only runs with an input cache look frames up
+        cached = [f['input_cache'] for f in self.files if 'input_cache' in f]
+        if cached:
+            summary['input_cache'] = {'hits': cached.count('hit'), 'misses': cached.count('miss')}
+        return summary
+
+    def to_dict(self):
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'seconds': self.seconds,
+            'summary': self.summary(),
+            'files': self.files,
+            'skipped': self.skipped,
+        }
+
+    def log_summary(self):
+        summary = self.summary()
+        logger.info("Processed %d files (%d skipped), %d rows in, %d rows out in %.3fs",
+                    summary['files_processed'], summary['files_skipped'], summary['input_rows'],
+                    summary['output_rows'], self.seconds or 0.0)
+        logger.info("Stage totals: %s", ', '.join(f"{stage} {seconds:.3f}s"
+                                                  for stage, seconds in summary['stage_seconds'].items()))
+        if 'memory' in summary:
+            logger.info("Frame memory: %.1f MB -> %.1f MB", summary['memory']['bytes_before'] / 1e6,
+                        summary['memory']['bytes_after'] / 1e6)
+        if 'peak_bytes' in summary:
+            logger.info("Peak traced memory per stage: %s", ', '.join(
+                f"{stage} {peak / 1e6:.1f} MB" for stage, peak in summary['peak_bytes']['stages'].items()))
+        if 'memory_fallbacks' in summary:
+            logger.info("Files over the memory budget: %s", ', '.join(
+                f"{count} {mode}" for mode, count in summary['memory_fallbacks'].items()))
+        if 'input_cache' in summary:
+            logger.info("Input cache: %d hits, %d misses", summary['input_cache']['hits'],
+                        summary['input_cache']['misses'])
+
+    def write(self, report_path):
+        """ Save the report as JSON. """
+        report_path = Path(report_path)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1, default=str)
+        logger.info("Run report written to %s", report_path)
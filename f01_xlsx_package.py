@@ -0,0 +1,265 @@
+import re
+import shutil
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+DOC_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+WORKSHEET_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+
+# Number formats below this id are built in and need no numFmt entry
+FIRST_CUSTOM_NUMFMT_ID = 164
+COPY_BLOCK_BYTES = 1 << 20
+
+# Style attribute of a cell tag, as openpyxl writes it: <c r="A1" s="1" t="inlineStr">
+_CELL_STYLE = re.compile(rb'(<c\s[^>]*?\bs=")(\d+)"')
+
+
+def _rels_part(part):
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, '_rels', f"{name}.rels")
+
+
+def _resolve_target(source_part, target):
+    if target.startswith('/'):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def _relationships(package, part):
+    """ {Id: (Type, target part)} of the internal relationships of part ('' for the package itself). """
+    try:
+        root = ET.fromstring(package.read(_rels_part(part)))
+    except KeyError:
+        return {}
+    return {rel.get('Id'): (rel.get('Type'), _resolve_target(part, rel.get('Target')))
+            for rel in root.iter(f"{{{PACKAGE_REL_NS}}}Relationship") if rel.get('TargetMode') != 'External'}
+
+
+def _related_part(package, part, rel_type):
+    for found_type, target in _relationships(package, part).values():
+        if found_type == f"{DOC_REL_NS}/{rel_type}":
+            return target
+    return None
+
+
+def _sheets(package, workbook_part):
+    """ [(name, sheetId, part)] of the sheets of the workbook, in tab order. """
+    rels = _relationships(package, workbook_part)
+    root = ET.fromstring(package.read(workbook_part))
+    return [(sheet.get('name'), int(sheet.get('sheetId')), rels[sheet.get(f"{{{DOC_REL_NS}}}id")][1])
+            for sheet in root.iter(f"{{{MAIN_NS}}}sheet")]
+
+
+def _prefix(text, tag):
+    """ Namespace prefix ('x:' or '') the first tag element of text is written with. """
+    found = re.search(rf'<(\w+:)?{tag}[\s/>]', text)
+    if found is None:
+        raise ValueError(f"No {tag} element")
+    return found.group(1) or ''
+
+
+def _xml(element, prefix):
+    """ element written with prefix on every tag and its attributes sorted, so equal elements compare equal. """
+    tag = prefix + element.tag.split('}')[-1]
+    attributes = ''.join(f" {name}={quoteattr(value)}" for name, value in sorted(element.attrib.items())
+                         if not name.startswith('{'))
+    inner = escape(element.text or '') + ''.join(_xml(child, prefix) for child in element)
+    return f"<{tag}{attributes}>{inner}</{tag}>" if inner else f"<{tag}{attributes}/>"
+
+
+def _children(root, name):
+    collection = root.find(f"{{{MAIN_NS}}}{name}")
+    return [] if collection is None else list(collection)
+
+
+def _append_children(text, prefix, name, items, count):
+    """ Append items to the name collection of text and set its count. """
+    opening = re.search(rf'<{prefix}{name}(\s[^>]*)?>', text)
+    if opening is None:
+        raise ValueError(f"styles.xml has no {name}")
+    tag = re.sub(r'\scount="\d+"', f' count="{count}"', opening.group(0))
+    closing = text.index(f"</{prefix}{name}>", opening.end())
+    return text[:opening.start()] + tag + text[opening.end():closing] + ''.join(items) + text[closing:]
+
+
+def _merge_styles(old_styles, new_styles):
+    """
+    Add the cell formats of new_styles to old_styles.
+
+    Return the new styles.xml and {cell format id in new_styles: id in it}.
+    Formats, fonts, fills and borders already in old_styles are reused; the
+    defaults of new_styles map to those of old_styles.
+    """
+    text = old_styles.decode('utf-8-sig')
+    prefix = _prefix(text, 'styleSheet')
+    old, new = ET.fromstring(old_styles), ET.fromstring(new_styles)
+
+    entries = {name: [_xml(element, prefix) for element in _children(old, name)]
+               for name in ('fonts', 'fills', 'borders', 'cellXfs')}
+    added = {name: [] for name in entries}
+
+    def add(name, element):
+        item = _xml(element, prefix)
+        if item not in entries[name]:
+            entries[name].append(item)
+            added[name].append(item)
+        return entries[name].index(item)
+
+    formats = {element.get('formatCode'): int(element.get('numFmtId')) for element in _children(old, 'numFmts')}
+    new_formats = {int(element.get('numFmtId')): element.get('formatCode') for element in _children(new, 'numFmts')}
+    added_formats = []
+
+    def format_id(new_id):
+        if new_id < FIRST_CUSTOM_NUMFMT_ID:
+            return new_id
+        code = new_formats[new_id]
+        if code not in formats:
+            formats[code] = max([FIRST_CUSTOM_NUMFMT_ID - 1, *formats.values()]) + 1
+            added_formats.append(f"<{prefix}numFmt numFmtId=\"{formats[code]}\" formatCode={quoteattr(code)}/>")
+        return formats[code]
+
+    # Fills 0 and 1 are the two every workbook must start with
+    defaults = {'fonts': 1, 'fills': 2, 'borders': 1}
+    xf_map = {0: 0}
+    for xf_id, xf in enumerate(_children(new, 'cellXfs')):
+        if xf_id == 0:
+            continue
+        xf.set('numFmtId', str(format_id(int(xf.get('numFmtId', 0)))))
+        for name, attribute in (('fonts', 'fontId'), ('fills', 'fillId'), ('borders', 'borderId')):
+            index = int(xf.get(attribute, 0))
+            if index >= defaults[name]:
+                index = add(name, _children(new, name)[index])
+            xf.set(attribute, str(index))
+        xf.set('xfId', '0')
+        xf_map[xf_id] = add('cellXfs', xf)
+
+    if added_formats:
+        if re.search(rf'<{prefix}numFmts[\s>]', text):
+            text = _append_children(text, prefix, 'numFmts', added_formats, len(formats))
+        else:
+            # numFmts has to come first in styleSheet
+            start = re.search(rf'<{prefix}styleSheet\b[^>]*>', text).end()
+            text = (text[:start] + f"<{prefix}numFmts count=\"{len(added_formats)}\">" + ''.join(added_formats)
+                    + f"</{prefix}numFmts>" + text[start:])
+    for name, items in added.items():
+        if items:
+            text = _append_children(text, prefix, name, items, len(entries[name]))
+    return text.encode('utf-8'), xf_map
+
+
+def _copy_part(source, info, out, name=None, xf_map=None):
+    """ Stream the part info of source into out as name, remapping cell styles through xf_map when given. """
+    target = zipfile.ZipInfo(name or info.filename, info.date_time)
+    target.compress_type = zipfile.ZIP_DEFLATED
+    with source.open(info) as src, out.open(target, 'w', force_zip64=info.file_size > (1 << 30)) as dst:
+        if xf_map is None or all(old == new for old, new in xf_map.items()):
+            shutil.copyfileobj(src, dst, COPY_BLOCK_BYTES)
+            return
+
+        def remap(match):
+            return match.group(1) + str(xf_map[int(match.group(2))]).encode('ascii') + b'"'
+
+        rest = b''
+        for block in iter(lambda: src.read(COPY_BLOCK_BYTES), b''):
+            # Only whole tags are remapped; the tail after the last '>' waits for the next block
+            block = rest + block
+            end = block.rfind(b'>') + 1
+            dst.write(_CELL_STYLE.sub(remap, block[:end]))
+            rest = block[end:]
+        dst.write(rest)
+
+
+def _insert_before(text, closing_tag, items):
+    prefix = _prefix(text, closing_tag)
+    position = text.rindex(f"</{prefix}{closing_tag}>")
+    return text[:position] + ''.join(item.format(prefix=prefix) for item in items) + text[position:]
+
+
+def _remove_elements(text, tag, attribute_value):
+    """ Drop the empty tag elements of text that have an attribute equal to attribute_value. """
+    return re.sub(rf'<(\w+:)?{tag}\s[^>]*="{re.escape(attribute_value)}"[^>]*/>', '', text)
+
+
+def replace_sheets(existing_path, new_path, output_path):
+    """
+    Write output_path: the workbook at existing_path with the sheets of the workbook at new_path.
+
+    A sheet of new_path replaces the sheet of the same name in place; the
+    others are added at the end, in order. Every other part of existing_path
+    is copied as it is, so its untouched sheets keep their formatting,
+    column widths, merged cells and drawings. new_path must be written by
+    openpyxl (strings inline); the cell formats of its sheets are added to
+    the styles of existing_path. The calculation chain is dropped, Excel
+    rebuilds it.
+    """
+    with zipfile.ZipFile(existing_path) as old, zipfile.ZipFile(new_path) as new, \
+            zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as out:
+        workbook_part = _related_part(old, '', 'officeDocument')
+        rels_part = _rels_part(workbook_part)
+        styles_part = _related_part(old, workbook_part, 'styles')
+        calc_chain_part = _related_part(old, workbook_part, 'calcChain')
+        old_sheets = _sheets(old, workbook_part)
+        old_parts = {name: part for name, _, part in old_sheets}
+
+        new_workbook_part = _related_part(new, '', 'officeDocument')
+        styles, xf_map = _merge_styles(old.read(styles_part),
+                                       new.read(_related_part(new, new_workbook_part, 'styles')))
+
+        # Sheets of new_path: {part in the output: part in new_path}
+        sheet_parts = {}
+        workbook_text = old.read(workbook_part).decode('utf-8-sig')
+        rels_text = old.read(rels_part).decode('utf-8-sig')
+        types_text = old.read('[Content_Types].xml').decode('utf-8-sig')
+        rel_prefix = re.search(rf'xmlns:(\w+)="{re.escape(DOC_REL_NS)}"', workbook_text)
+        rel_id_attribute = f"{rel_prefix.group(1)}:id" if rel_prefix else f"xmlns:r=\"{DOC_REL_NS}\" r:id"
+        rel_ids = set(_relationships(old, workbook_part))
+        part_names = set(old.namelist())
+        sheet_id = max([0] + [sheet_id for _, sheet_id, _ in old_sheets])
+        sheet_elements, rel_elements, type_elements = [], [], []
+        for name, _, new_part in _sheets(new, new_workbook_part):
+            if name in old_parts:
+                sheet_parts[old_parts[name]] = new_part
+                continue
+
+            number = len(old_sheets) + len(sheet_elements) + 1
+            while f"rId{number}" in rel_ids or posixpath.join(
+                    posixpath.dirname(workbook_part), 'worksheets', f"sheet{number}.xml") in part_names:
+                number += 1
+            part = posixpath.join(posixpath.dirname(workbook_part), 'worksheets', f"sheet{number}.xml")
+            rel_ids.add(f"rId{number}")
+            part_names.add(part)
+            sheet_id += 1
+            sheet_parts[part] = new_part
+            sheet_elements.append(f"<{{prefix}}sheet name={quoteattr(name)} sheetId=\"{sheet_id}\" "
+                                  f"{rel_id_attribute}=\"rId{number}\"/>")
+            rel_elements.append(f"<{{prefix}}Relationship Id=\"rId{number}\" Type=\"{DOC_REL_NS}/worksheet\" "
+                                f"Target=\"/{part}\"/>")
+            type_elements.append(f"<{{prefix}}Override PartName=\"/{part}\" "
+                                 f"ContentType=\"{WORKSHEET_CONTENT_TYPE}\"/>")
+
+        workbook_text = _insert_before(workbook_text, 'sheets', sheet_elements)
+        rels_text = _insert_before(rels_text, 'Relationships', rel_elements)
+        types_text = _insert_before(types_text, 'Types', type_elements)
+        if calc_chain_part is not None:
+            rels_text = _remove_elements(rels_text, 'Relationship', f"{DOC_REL_NS}/calcChain")
+            types_text = _remove_elements(types_text, 'Override', f"/{calc_chain_part}")
+
+        edited = {workbook_part: workbook_text.encode('utf-8'), rels_part: rels_text.encode('utf-8'),
+                  '[Content_Types].xml': types_text.encode('utf-8'), styles_part: styles}
+        # Relationships of replaced sheets point at their old drawings, comments and tables
+        dropped = {calc_chain_part} | {_rels_part(part) for part in sheet_parts}
+        for info in old.infolist():
+            if info.filename in dropped:
+                continue
+            if info.filename in edited:
+                out.writestr(info.filename, edited[info.filename])
+            elif info.filename in sheet_parts:
+                _copy_part(new, new.getinfo(sheet_parts.pop(info.filename)), out, info.filename, xf_map)
+            else:
+                _copy_part(old, info, out)
+        for part, new_part in sheet_parts.items():
+            _copy_part(new, new.getinfo(new_part), out, part, xf_map)
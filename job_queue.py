@@ -0,0 +1,362 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+import contextlib
+import multiprocessing
+from pathlib import Path
+
+from f00_read_configs import read_config_except_columns
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds a claimed job stays with its worker; the worker renews it every third of that
+LEASE_SECONDS = 300.0
+
+# Claims of a job (including ones whose worker died) before it is marked failed
+MAX_ATTEMPTS = 3
+
+# Seconds a worker waits before looking again when every open job is leased
+IDLE_POLL_SECONDS = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    output_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    result TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, output_key, id);
+"""
+
+
+class JobConfigError(Exception):
+    """ The config file of a job cannot be read as enqueued; claiming the job again will not help. """
+
+
+class ConfigChangedError(JobConfigError):
+    """ The config file of a job changed after the job was enqueued. """
+
+
+class JobQueue:
+    """
+    Durable queue of removal jobs in a SQLite file, shared by any number of worker processes.
+
+    Every job is one output file of a run with the config rows writing it
+    (see enqueue_run), so all sheets of a workbook are written by the same
+    worker in config order. A job moves from 'pending' to 'leased' when a
+    worker claims it, then to 'done', or back to 'pending' when it fails or
+    its lease expires, until max_attempts claims were used up ('failed').
+    A job is only claimed when no earlier job of the same output file is
+    open, so runs enqueued one after the other never write a workbook at
+    the same time and no sheet is lost.
+
+    Every operation is its own short transaction on a new connection; a
+    claim takes the database write lock (BEGIN IMMEDIATE), so two workers
+    never claim the same job. On shared storage the file system must
+    support the SQLite file locks (local disks, most NFS v4 setups).
+    """
+
+    def __init__(self, path, timeout=60.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    @contextlib.contextmanager
+    def _transaction(self, write=True):
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            # Writers take the write lock up front, so a read-then-update never races another worker
+            connection.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+
+    def enqueue(self, jobs, run_id=None, max_attempts=MAX_ATTEMPTS):
+        """ Add (output_key, payload) jobs as one run; return its run id. """
+        run_id = run_id or uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT INTO jobs (run_id, output_key, payload, max_attempts, updated) VALUES (?, ?, ?, ?, ?)',
+                [(run_id, output_key, json.dumps(payload), max_attempts, now) for output_key, payload in jobs])
+        logger.info("Enqueued run %s: %d jobs in %s", run_id, len(jobs), self.path)
+        return run_id
+
+    def _expire_leases(self, connection, now):
+        expired = connection.execute("SELECT id, attempts, max_attempts, lease_owner FROM jobs "
+                                     "WHERE status = 'leased' AND lease_expires < ?", (now,)).fetchall()
+        for job in expired:
+            status = 'failed' if job['attempts'] >= job['max_attempts'] else 'pending'
+            logger.warning("Lease of job %d by %s expired, job is %s", job['id'], job['lease_owner'], status)
+            connection.execute("UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, error = ?, "
+                               "updated = ? WHERE id = ?",
+                               (status, f"lease of {job['lease_owner']} expired", now, job['id']))
+
+    def claim(self, worker_id, lease_seconds=LEASE_SECONDS):
+        """ Lease the next runnable job to worker_id; return (job id, payload) or None. """
+        now = time.time()
+        with self._transaction() as connection:
+            self._expire_leases(connection, now)
+            job = connection.execute(
+                "SELECT id, payload FROM jobs WHERE status = 'pending' AND NOT EXISTS ("
+                "    SELECT 1 FROM jobs AS earlier WHERE earlier.output_key = jobs.output_key"
+                "    AND (earlier.status = 'leased' OR (earlier.status = 'pending' AND earlier.id < jobs.id))"
+                ") ORDER BY id LIMIT 1").fetchone()
+            if job is None:
+                return None
+            connection.execute("UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                               "attempts = attempts + 1, updated = ? WHERE id = ?",
+                               (worker_id, now + lease_seconds, now, job['id']))
+        return job['id'], json.loads(job['payload'])
+
+    def renew(self, job_id, worker_id, lease_seconds=LEASE_SECONDS):
+        """ Extend the lease of job_id; False when worker_id no longer holds it. """
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute("UPDATE jobs SET lease_expires = ?, updated = ? "
+                                        "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                        (now + lease_seconds, now, job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result):
+        """ Mark job_id done with its result; False when worker_id no longer held its lease. """
+        with self._transaction() as connection:
+            cursor = connection.execute("UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, "
+                                        "error = NULL, result = ?, updated = ? "
+                                        "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                        (json.dumps(result, default=str), time.time(), job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        """ Put job_id back for another attempt, or mark it failed when out of attempts (or not retry). """
+        with self._transaction() as connection:
+            job = connection.execute("SELECT attempts, max_attempts FROM jobs "
+                                     "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                     (job_id, worker_id)).fetchone()
+            if job is None:
+                return None
+            status = 'pending' if retry and job['attempts'] < job['max_attempts'] else 'failed'
+            connection.execute("UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, error = ?, "
+                               "updated = ? WHERE id = ?", (status, error, time.time(), job_id))
+        return status
+
+    def retry_failed(self, run_id=None):
+        """ Give the failed jobs (of run_id) a fresh set of attempts; return how many. """
+        query = "UPDATE jobs SET status = 'pending', attempts = 0, updated = ? WHERE status = 'failed'"
+        params = [time.time()]
+        if run_id is not None:
+            query += ' AND run_id = ?'
+            params.append(run_id)
+        with self._transaction() as connection:
+            return connection.execute(query, params).rowcount
+
+    def jobs(self, run_id=None):
+        """ Every job (of run_id) as a dict, in queue order. """
+        query = ('SELECT id, run_id, output_key, status, attempts, max_attempts, lease_owner, lease_expires, '
+                 'error, result, updated FROM jobs')
+        params = []
+        if run_id is not None:
+            query += ' WHERE run_id = ?'
+            params.append(run_id)
+        with self._transaction(write=False) as connection:
+            rows = connection.execute(query + ' ORDER BY id', params).fetchall()
+        return [dict(row, result=json.loads(row['result']) if row['result'] else None) for row in rows]
+
+    def counts(self, run_id=None):
+        """ Number of jobs (of run_id) per status. """
+        query = 'SELECT status, COUNT(*) FROM jobs'
+        params = []
+        if run_id is not None:
+            query += ' WHERE run_id = ?'
+            params.append(run_id)
+        with self._transaction(write=False) as connection:
+            return dict(connection.execute(query + ' GROUP BY status', params).fetchall())
+
+
+def _config_signature(config_file_path):
+    stat = os.stat(config_file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def enqueue_run(queue_path, base_path, config_file, sheet_name, cache_dir=None, max_attempts=MAX_ATTEMPTS):
+    """
+    Expand the function sheet into jobs, one per output file, and add them to the queue as one run.
+
+    A job holds the config rows (file_config_df labels) that write its output
+    file, and the size and mtime the config file had; workers read the sheet
+    themselves and refuse a job whose config file changed since. The base
+    path is stored resolved, and the config file and cache folder relative
+    to it, so a worker started anywhere finds them, and a worker that sees
+    the shared folder under another path can pass its own (see run_worker).
+    Returns the run id.
+    """
+    base_path = Path(base_path).resolve()
+    config_file_path = base_path / config_file
+    file_records, _, _ = read_config_except_columns(
+        base_path, config_file_path, sheet_name, lower_case_except_file_zone=True,
+        execpt_cal_df_columns={"criteria_value"}, cache_dir=cache_dir, as_records=True)
+
+    rows_by_output = {}
+    for record in file_records:
+        rows_by_output.setdefault(str(record.output_file_path.resolve()), []).append(int(record.row))
+
+    config = {
+        'base_path': str(base_path),
+        'config_file': _relative_to(config_file_path, base_path),
+        'sheet_name': sheet_name,
+        'cache_dir': None if cache_dir is None else _relative_to(cache_dir, base_path),
+        'config_signature': _config_signature(config_file_path),
+    }
+    jobs = [(output_key, dict(config, rows=rows)) for output_key, rows in rows_by_output.items()]
+    return JobQueue(queue_path).enqueue(jobs, max_attempts=max_attempts)
+
+
+def _relative_to(path, base_path):
+    """ path relative to base_path when it is inside it, else resolved. """
+    path = Path(base_path) / path
+    try:
+        return str(path.resolve().relative_to(base_path))
+    except ValueError:
+        return str(path.resolve())
+
+
+def _job_records(payload, configs, base_path=None):
+    """
+    FileRecords of the rows of a job; configs caches the parsed sheets of this worker.
+
+    base_path replaces the base path the job was enqueued with.
+    """
+    base_path = Path(base_path if base_path is not None else payload['base_path'])
+    if not base_path.is_dir():
+        raise JobConfigError(f"base path {base_path} does not exist on this worker")
+    config_file_path = base_path / payload['config_file']
+    if not config_file_path.is_file():
+        raise JobConfigError(f"config file {config_file_path} does not exist on this worker")
+    if _config_signature(config_file_path) != payload['config_signature']:
+        raise ConfigChangedError(f"{config_file_path} changed since the job was enqueued")
+
+    key = (str(config_file_path), payload['sheet_name'], tuple(payload['config_signature']))
+    if key not in configs:
+        configs.clear()
+        cache_dir = None if payload['cache_dir'] is None else base_path / payload['cache_dir']
+        configs[key], _, _ = read_config_except_columns(
+            base_path, config_file_path, payload['sheet_name'], lower_case_except_file_zone=True,
+            execpt_cal_df_columns={"criteria_value"}, cache_dir=cache_dir, as_records=True)
+    rows = set(payload['rows'])
+    return base_path, [record for record in configs[key] if record.row in rows]
+
+
+def _heartbeat(queue, job_id, worker_id, lease_seconds, stop):
+    while not stop.wait(lease_seconds / 3):
+        if not queue.renew(job_id, worker_id, lease_seconds):
+            logger.warning("%s lost the lease of job %d", worker_id, job_id)
+            return
+
+
+def run_worker(queue_path, worker_id=None, lease_seconds=LEASE_SECONDS, keep_running=False,
+               poll_seconds=IDLE_POLL_SECONDS, base_path=None, **options):
+    """
+    Claim and run jobs of the queue until it is drained; return the number of jobs run.
+
+    Each job runs run_removal_automation on its config rows with options
+    (workers, chunksize, ...; no manifest: the queue records what is done),
+    while a heartbeat thread renews its lease. A job that raises is retried
+    by a later claim, up to its max_attempts; one whose base path or config
+    file is missing or changed fails at once (JobConfigError). base_path
+    replaces the base path of every job, for workers that mount the shared
+    folder elsewhere. The worker stops when no job is pending or leased, or,
+    with keep_running, polls every poll_seconds for newly enqueued runs
+    until interrupted.
+    """
+    from f01_remove_rows import MemoryBudgetError, run_removal_automation
+
+    if base_path is not None and not Path(base_path).is_dir():
+        raise FileNotFoundError(f"Base path {base_path} does not exist")
+    queue = JobQueue(queue_path)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    configs = {}
+    processed = 0
+    logger.info("Worker %s started on %s", worker_id, queue.path)
+
+    while True:
+        claimed = queue.claim(worker_id, lease_seconds)
+        if claimed is None:
+            counts = queue.counts()
+            if not keep_running and not counts.get('pending') and not counts.get('leased'):
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        job_id, payload = claimed
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(queue, job_id, worker_id, lease_seconds, stop),
+                                     daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        try:
+            job_base_path, file_records = _job_records(payload, configs, base_path)
+            report = run_removal_automation(file_records, None, job_base_path, **options)
+        except Exception as e:
+            logger.exception("Job %d failed", job_id)
+            # Retrying cannot help a job whose paths or budget are wrong for this worker
+            retry = not isinstance(e, (JobConfigError, MemoryBudgetError))
+            status = queue.fail(job_id, worker_id, repr(e), retry=retry)
+            logger.warning("Job %d is %s", job_id, status)
+            continue
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        summary = report.summary()
+        result = {key: summary[key] for key in ('files_processed', 'files_skipped', 'input_rows', 'output_rows')}
+        result.update(worker=worker_id, seconds=time.perf_counter() - start)
+        if not queue.complete(job_id, worker_id, result):
+            logger.warning("Job %d finished after its lease was taken over", job_id)
+        processed += 1
+        logger.info("Job %d (%s) done in %.3fs", job_id, payload['rows'], result['seconds'])
+
+    logger.info("Worker %s stopped after %d jobs", worker_id, processed)
+    return processed
+
+
+def _worker_main(queue_path, worker_id, log_level, kwargs):
+    logging.basicConfig(level=log_level, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    run_worker(queue_path, worker_id, **kwargs)
+
+
+def run_workers(queue_path, processes, **kwargs):
+    """ Drain the queue with processes local worker processes (see run_worker); return the job counts. """
+    log_level = logging.getLogger().getEffectiveLevel()
+    workers = [multiprocessing.Process(target=_worker_main, name=f"queue-worker-{n}",
+                                       args=(queue_path, f"{socket.gethostname()}:worker-{n}", log_level, kwargs))
+               for n in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return JobQueue(queue_path).counts()
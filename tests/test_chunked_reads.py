@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from f01_memory import expand_frame
+from f01_remove_rows import iter_removal_chunks, process_input_file
+from benchmarks.datagen import build_criteria_rows, build_input_frame, write_input_file
+
+
+CHUNKSIZE = 10
+
+
+def streamed(path, file_type, criteria_rows, **options):
+    chunks = list(iter_removal_chunks(path, file_type, criteria_rows, CHUNKSIZE, **options))
+    assert len(chunks) > 1
+    # Low-memory chunks are written as the types they were read with
+    return pd.concat([expand_frame(chunk) for chunk in chunks])
+
+
+@pytest.mark.parametrize('file_type', ['.csv', '.txt'])
+@pytest.mark.parametrize('header_offset', [0, 3 * CHUNKSIZE + 4])
+def test_chunks_match_whole_file(tmp_path, file_type, header_offset):
+    path = tmp_path / f"input{file_type}"
+    write_input_file(path, file_type, build_input_frame(95, columns=8, header_offset=header_offset))
+    criteria_rows = build_criteria_rows(7, columns=8)
+
+    expected = process_input_file(path, file_type, None, criteria_rows)
+    assert 0 < len(expected) < 95
+    pd.testing.assert_frame_equal(streamed(path, file_type, criteria_rows), expected)
+    pd.testing.assert_frame_equal(streamed(path, file_type, criteria_rows, low_memory=True), expected)
+
+
+def test_chunks_without_header_match_whole_file(tmp_path):
+    path = tmp_path / 'input.csv'
+    write_input_file(path, '.csv', build_input_frame(45, header_offset=2))
+    criteria_rows = build_criteria_rows(5)
+    criteria_rows.loc[0, 'remove_rows_list'] = 'no such column, nor this one'
+
+    expected = process_input_file(path, '.csv', None, criteria_rows)
+    assert len(expected) == 45 + 5
+    pd.testing.assert_frame_equal(streamed(path, '.csv', criteria_rows), expected)
@@ -0,0 +1,27 @@
+import logging
+
+import numpy as np
+
+from f00_read_configs import build_criteria_records, build_file_records, read_config_except_columns
+from benchmarks.datagen import CONFIG_SHEET_NAME, generate_dataset
+
+
+def test_rows_missing_file_fields_are_rejected(tmp_path, caplog):
+    dataset = generate_dataset(tmp_path, rows=20, file_type='.csv', config_rows=4)
+    file_config_df, cal_df, _ = read_config_except_columns(tmp_path, dataset['config_file'], CONFIG_SHEET_NAME, True,
+                                                           {'criteria_value'}, None)
+    rows = list(file_config_df.index)
+    file_config_df.loc[rows[0], 'input_file_name'] = np.nan
+    file_config_df.loc[rows[1], 'output_file_name'] = np.nan
+    file_config_df.loc[rows[2], 'input_file_type'] = np.nan
+
+    with caplog.at_level(logging.WARNING, logger='f00_read_configs'):
+        records = build_file_records(file_config_df, build_criteria_records(cal_df), tmp_path)
+
+    assert [record.row for record in records] == [rows[3]]
+    assert records[0].input_file_path == dataset['input_file']
+    # Rows without an input are skipped quietly, as the runner does
+    assert [record.getMessage() for record in caplog.records] == [
+        f"Skipping config row {rows[1]}: no output_folder_path / output_file_name",
+        f"Skipping config row {rows[2]}: no input_file_type",
+    ]
@@ -0,0 +1,113 @@
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from f00_read_configs import read_config_except_columns
+from f01_remove_rows import run_removal_automation
+from job_queue import JobQueue, enqueue_run, run_worker, run_workers
+from benchmarks.datagen import CONFIG_SHEET_NAME, build_input_frame, write_config_workbook, write_input_file
+
+# Lease of a worker that "crashes", and how long to wait for it to expire
+SHORT_LEASE_SECONDS = 0.01
+EXPIRY_WAIT_SECONDS = 0.05
+
+
+def read_outputs(folder):
+    return {path.name: pd.read_excel(path, sheet_name=None) for path in sorted(folder.glob('*.xlsx'))}
+
+
+def test_two_worker_processes_match_in_process_run(tmp_path):
+    (tmp_path / 'input').mkdir()
+    inputs = []
+    for i in range(4):
+        path = Path('input') / f"input_{i}.csv"
+        write_input_file(tmp_path / path, '.csv', build_input_frame(60, header_offset=i, seed=i))
+        inputs.append(path)
+    config_file = tmp_path / 'config.xlsx'
+    write_config_workbook(config_file, inputs, config_rows=8, output_file_name=['out_a.xlsx', 'out_b.xlsx'])
+
+    file_records, _, _ = read_config_except_columns(tmp_path, config_file, CONFIG_SHEET_NAME, True,
+                                                    {'criteria_value'}, None, as_records=True)
+    run_removal_automation(file_records, None, tmp_path)
+    expected = read_outputs(tmp_path / 'output')
+    (tmp_path / 'output').rename(tmp_path / 'in_process')
+
+    queue_path = tmp_path / 'queue.sqlite'
+    enqueue_run(queue_path, tmp_path, config_file.name, CONFIG_SHEET_NAME)
+    assert run_workers(queue_path, 2, poll_seconds=0.1) == {'done': 2}
+
+    result = read_outputs(tmp_path / 'output')
+    assert list(result) == list(expected) == ['out_a.xlsx', 'out_b.xlsx']
+    for name, sheets in expected.items():
+        assert list(result[name]) == list(sheets)
+        for sheet, df in sheets.items():
+            pd.testing.assert_frame_equal(result[name][sheet], df)
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = JobQueue(tmp_path / 'queue.sqlite')
+    queue.enqueue([('out.xlsx', {'rows': [1]})])
+
+    job_id, _ = queue.claim('crashed', lease_seconds=SHORT_LEASE_SECONDS)
+    time.sleep(EXPIRY_WAIT_SECONDS)
+    assert queue.claim('alive') == (job_id, {'rows': [1]})
+    (job,) = queue.jobs()
+    assert (job['status'], job['attempts'], job['lease_owner']) == ('leased', 2, 'alive')
+
+    # The crashed worker lost the job to the one that claimed it again
+    assert not queue.renew(job_id, 'crashed')
+    assert not queue.complete(job_id, 'crashed', {})
+    assert queue.complete(job_id, 'alive', {'output_rows': 1})
+    assert queue.counts() == {'done': 1}
+
+
+def test_job_fails_after_max_attempts(tmp_path):
+    queue = JobQueue(tmp_path / 'queue.sqlite')
+    queue.enqueue([('a.xlsx', {})], max_attempts=2)
+    job_id, _ = queue.claim('worker')
+    assert queue.fail(job_id, 'worker', 'first error') == 'pending'
+    job_id, _ = queue.claim('worker')
+    assert queue.fail(job_id, 'worker', 'second error') == 'failed'
+    assert queue.claim('worker') is None
+
+    # A lease expiring on the last attempt fails the job as well
+    queue.enqueue([('b.xlsx', {})], max_attempts=1)
+    queue.claim('crashed', lease_seconds=SHORT_LEASE_SECONDS)
+    time.sleep(EXPIRY_WAIT_SECONDS)
+    assert queue.claim('worker') is None
+    assert [(job['status'], job['error']) for job in queue.jobs()] == [
+        ('failed', 'second error'), ('failed', 'lease of crashed expired')]
+
+    assert queue.retry_failed() == 2
+    assert queue.counts() == {'pending': 2}
+
+
+def test_job_with_missing_config_fails_at_once(tmp_path):
+    queue_path = tmp_path / 'queue.sqlite'
+    JobQueue(queue_path).enqueue([('out.xlsx', {'base_path': str(tmp_path / 'missing'), 'rows': [1]})])
+
+    assert run_worker(queue_path, 'worker') == 0
+    (job,) = JobQueue(queue_path).jobs()
+    assert (job['status'], job['attempts']) == ('failed', 1)
+    assert 'does not exist' in job['error']
+
+
+def test_jobs_of_one_output_are_never_leased_together(tmp_path):
+    queue = JobQueue(tmp_path / 'queue.sqlite')
+    queue.enqueue([('a.xlsx', {'run': 1}), ('b.xlsx', {'run': 1})])
+    queue.enqueue([('a.xlsx', {'run': 2})])
+
+    first = queue.claim('w1')
+    assert first[1] == {'run': 1}
+    assert queue.claim('w2')[1] == {'run': 1}
+    # The second run's job for a.xlsx waits while the first one is leased...
+    assert queue.claim('w3') is None
+
+    # ...and while it is pending again after a failure
+    assert queue.fail(first[0], 'w1', 'error') == 'pending'
+    assert queue.claim('w3') == first
+    assert queue.claim('w4') is None
+
+    assert queue.complete(first[0], 'w3', {})
+    assert queue.claim('w4')[1] == {'run': 2}
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from f01_memory import expand_frame
+from f01_remove_rows import iter_removal_chunks, process_input_file
+
+
+def criteria_rows(*criteria):
+    return pd.DataFrame({
+        'linked_input_class': 'a',
+        'remove_rows_list': ['position, year_month'] + [np.nan] * (len(criteria) - 1),
+        'applied_column': [column for column, _, _ in criteria],
+        'criteria_to_remove_row': [operation for _, operation, _ in criteria],
+        'criteria_value': [value for _, _, value in criteria],
+    })
+
+
+@pytest.fixture
+def order_input(tmp_path):
+    path = tmp_path / 'orders.csv'
+    pd.DataFrame({'position': ['MG', 'TP'] * 500, 'year_month': 202201 + np.arange(1000) % 12,
+                  'order_id': np.arange(1000, 2000)}).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize('criteria', [
+    ('order_id', 'contain', '1005'),
+    ('order_id', 'contain', '^10[0-4]'),
+    ('order_id', '=', '1500'),
+    ('order_id', '>', 1900),
+])
+def test_criteria_on_numeric_looking_text_column(order_input, criteria):
+    rows = criteria_rows(criteria)
+    expected = process_input_file(order_input, '.csv', None, rows)
+    assert len(expected) < 1000
+
+    compact = process_input_file(order_input, '.csv', None, rows, low_memory=True)
+    assert compact.attrs['text_numbers'] == [2]
+    pd.testing.assert_frame_equal(expand_frame(compact), expected)
+
+    chunks = iter_removal_chunks(order_input, '.csv', rows, 300, low_memory=True)
+    pd.testing.assert_frame_equal(pd.concat([expand_frame(chunk) for chunk in chunks]), expected)
@@ -0,0 +1,82 @@
+import os
+import json
+
+import pytest
+
+from f00_read_configs import read_config_except_columns
+from f01_manifest import file_fingerprint
+from f01_remove_rows import run_removal_automation
+from benchmarks.datagen import build_input_frame, generate_dataset, write_input_file
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    return generate_dataset(tmp_path, rows=200, header_offset=5, file_type='.csv', config_rows=1)
+
+
+def run(dataset, **options):
+    file_records, _, _ = read_config_except_columns(dataset['base_path'], dataset['config_file'],
+                                                    dataset['sheet_name'], True, {'criteria_value'}, None,
+                                                    as_records=True)
+    output_file_path = dataset['base_path'] / 'output' / 'out.xlsx'
+    file_records = [record._replace(output_file_path=output_file_path) for record in file_records]
+    return run_removal_automation(file_records, None, dataset['base_path'],
+                                  manifest_path=dataset['base_path'] / 'manifest.json', **options)
+
+
+def manifest_input(dataset):
+    with open(dataset['base_path'] / 'manifest.json', encoding='utf-8') as f:
+        (entry,) = json.load(f)['outputs'].values()
+    return entry[0]['input_file']
+
+
+def test_unchanged_input_is_skipped(dataset):
+    assert len(run(dataset).files) == 1
+    output = dataset['base_path'] / 'output' / 'out.xlsx'
+    written = output.stat().st_mtime_ns
+
+    report = run(dataset)
+    assert report.files == []
+    assert report.skipped == [{'input_file_path': str(dataset['input_file']), 'reason': 'unchanged'}]
+    assert output.stat().st_mtime_ns == written
+
+
+def test_force_rebuild_rebuilds_unchanged_input(dataset):
+    run(dataset)
+    report = run(dataset, force_rebuild=True)
+    assert len(report.files) == 1 and report.skipped == []
+
+
+def test_changed_input_is_rebuilt(dataset):
+    run(dataset)
+    write_input_file(dataset['input_file'], '.csv', build_input_frame(300, header_offset=5, seed=1))
+
+    report = run(dataset)
+    assert len(report.files) == 1 and report.skipped == []
+    assert report.files[0]['input_rows'] != 200
+    assert manifest_input(dataset)['size'] == dataset['input_file'].stat().st_size
+
+
+def test_touched_input_with_same_content_is_skipped(dataset):
+    run(dataset)
+    previous = manifest_input(dataset)
+    stat = dataset['input_file'].stat()
+    os.utime(dataset['input_file'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    report = run(dataset)
+    assert report.files == []
+    # The new mtime is recorded, so the next run does not hash the file again
+    recorded = manifest_input(dataset)
+    assert recorded['mtime_ns'] == stat.st_mtime_ns + 10 ** 9
+    assert recorded['sha256'] == previous['sha256']
+
+
+def test_fingerprint_reuses_hash_of_same_size_and_mtime(tmp_path):
+    path = tmp_path / 'input.csv'
+    path.write_text('a,b\n1,2\n')
+    fingerprint = file_fingerprint(path)
+
+    assert file_fingerprint(path, dict(fingerprint, sha256='recorded'))['sha256'] == 'recorded'
+    # A different size or mtime means the file is read again
+    assert file_fingerprint(path, dict(fingerprint, size=1, sha256='recorded')) == fingerprint
+    assert file_fingerprint(path, dict(fingerprint, mtime_ns=1, sha256='recorded')) == fingerprint
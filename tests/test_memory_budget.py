@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from f00_read_configs import read_config_except_columns
+from f01_memory import estimate_peak_bytes
+from f01_remove_rows import MemoryBudgetError, run_removal_automation
+from benchmarks.datagen import generate_dataset
+
+
+def run(dataset, output_file_name, memory_budget):
+    file_records, _, _ = read_config_except_columns(dataset['base_path'], dataset['config_file'],
+                                                    dataset['sheet_name'], True, {'criteria_value'}, None,
+                                                    as_records=True)
+    output_file_path = dataset['base_path'] / 'output' / output_file_name
+    file_records = [record._replace(output_file_path=output_file_path) for record in file_records]
+    report_path = dataset['base_path'] / f"report_{output_file_name}.json"
+    run_removal_automation(file_records, None, dataset['base_path'], memory_budget=memory_budget,
+                           report_path=report_path)
+    with open(report_path, encoding='utf-8') as f:
+        return json.load(f)['summary']
+
+
+def test_csv_over_budget_is_streamed(tmp_path):
+    dataset = generate_dataset(tmp_path, rows=5000, header_offset=20, file_type='.csv', config_rows=1)
+    budget = estimate_peak_bytes(dataset['input_file'], '.csv') // 4
+
+    run(dataset, 'full.csv', None)
+    summary = run(dataset, 'budget.csv', budget)
+    assert summary['memory_fallbacks'] == {'chunked': 1}
+    output = tmp_path / 'output'
+    assert (output / 'budget_Sheet1.csv').read_bytes() == (output / 'full_Sheet1.csv').read_bytes()
+
+
+def test_xlsx_over_budget_fails_before_reading(tmp_path):
+    dataset = generate_dataset(tmp_path, rows=500, header_offset=20, file_type='.xlsx', config_rows=1)
+    budget = estimate_peak_bytes(dataset['input_file'], '.xlsx') // 4
+
+    with pytest.raises(MemoryBudgetError, match='over the .* memory budget'):
+        run(dataset, 'budget.xlsx', budget)
+    assert not (tmp_path / 'output' / 'budget.xlsx').exists()
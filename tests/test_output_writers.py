@@ -0,0 +1,76 @@
+import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, PatternFill
+
+from f01_output_writers import close_workbooks, write_sheet
+
+
+@pytest.fixture
+def existing_workbook(tmp_path):
+    path = tmp_path / 'out.xlsx'
+    workbook = Workbook()
+    kept = workbook.active
+    kept.title = 'Kept'
+    kept['A1'] = 'Title'
+    kept['A1'].font = Font(bold=True, color='FFFF0000')
+    kept['A1'].fill = PatternFill('solid', fgColor='FFFFFF00')
+    kept.merge_cells('A1:C1')
+    kept.column_dimensions['B'].width = 40
+    kept['B2'] = '=1+2'
+    kept['C3'] = datetime.date(2020, 1, 1)
+    kept['C3'].number_format = 'dd/mm/yyyy'
+    workbook.create_sheet('Data')['A1'] = 'old'
+    workbook.create_sheet('Last')['A1'] = 'last'
+    workbook.save(path)
+    return path
+
+
+def test_untouched_sheets_keep_their_formatting(existing_workbook):
+    excel_writers = {}
+    write_sheet(excel_writers, existing_workbook, 'Data',
+                pd.DataFrame({'a': [1, 2], 'when': pd.to_datetime(['2021-01-01', '2021-01-02']), 's': ['x&y', '<z>']}))
+    write_sheet(excel_writers, existing_workbook, 'New', pd.DataFrame({'b': [3.5]}))
+    close_workbooks(excel_writers)
+
+    workbook = load_workbook(existing_workbook)
+    # Rewritten sheets keep their position, new ones go at the end
+    assert workbook.sheetnames == ['Kept', 'Data', 'Last', 'New']
+
+    kept = workbook['Kept']
+    assert [str(cells) for cells in kept.merged_cells.ranges] == ['A1:C1']
+    assert kept.column_dimensions['B'].width == 40
+    assert kept['A1'].font.b and kept['A1'].font.color.rgb == 'FFFF0000'
+    assert kept['A1'].fill.fgColor.rgb == 'FFFFFF00'
+    assert kept['B2'].value == '=1+2'
+    assert kept['C3'].number_format == 'dd/mm/yyyy'
+
+    data = workbook['Data']
+    assert [[cell.value for cell in row] for row in data.iter_rows()] == [
+        ['a', 'when', 's'],
+        [1, datetime.datetime(2021, 1, 1), 'x&y'],
+        [2, datetime.datetime(2021, 1, 2), '<z>'],
+    ]
+    assert data['A1'].font.b and data['A1'].border.left.style == 'thin'
+    assert data['B2'].number_format == 'yyyy-mm-dd h:mm:ss'
+    assert workbook['New']['A2'].value == 3.5
+
+
+def test_rewriting_adds_no_styles(existing_workbook):
+    def rewrite():
+        excel_writers = {}
+        write_sheet(excel_writers, existing_workbook, 'Data', pd.DataFrame({'when': pd.to_datetime(['2021-01-01'])}))
+        close_workbooks(excel_writers)
+        return load_workbook(existing_workbook)._cell_styles
+
+    assert rewrite() == rewrite()
+
+
+def test_sheet_is_written_once(tmp_path):
+    excel_writers = {}
+    write_sheet(excel_writers, tmp_path / 'out.xlsx', 'Sheet1', pd.DataFrame({'a': [1]}))
+    with pytest.raises(ValueError, match='already written'):
+        write_sheet(excel_writers, tmp_path / 'out.xlsx', 'Sheet1', pd.DataFrame({'a': [2]}))
+    close_workbooks(excel_writers, discard=True)
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pandas as pd
+
+from f00_read_configs import read_config_except_columns
+from f01_remove_rows import run_removal_automation
+from benchmarks.datagen import CONFIG_SHEET_NAME, build_input_frame, write_config_workbook, write_input_file
+
+
+def write_inputs(root, count):
+    (root / 'input').mkdir()
+    inputs = []
+    for i in range(count):
+        path = Path('input') / f"input_{i}{'.csv' if i % 2 else '.xlsx'}"
+        write_input_file(root / path, path.suffix, build_input_frame(60, header_offset=i, seed=i))
+        inputs.append(path)
+    config_file = root / 'config.xlsx'
+    write_config_workbook(config_file, inputs, output_file_name=['out_a.xlsx', 'out_b.xlsx'])
+    return config_file
+
+
+def run(root, config_file, output_folder, **options):
+    file_records, _, _ = read_config_except_columns(root, config_file, CONFIG_SHEET_NAME, True,
+                                                    {'criteria_value'}, None, as_records=True)
+    file_records = [record._replace(output_file_path=root / output_folder / record.output_file_path.name)
+                    for record in file_records]
+    run_removal_automation(file_records, None, root, **options)
+    return {path.name: pd.read_excel(path, sheet_name=None) for path in sorted((root / output_folder).iterdir())}
+
+
+def test_two_workers_match_serial_run(tmp_path):
+    # More jobs than the pool is given ahead of time, so submissions are refilled as results are written
+    config_file = write_inputs(tmp_path, 9)
+    expected = run(tmp_path, config_file, 'serial')
+    result = run(tmp_path, config_file, 'parallel', workers=2)
+
+    assert list(result) == list(expected) == ['out_a.xlsx', 'out_b.xlsx']
+    for name, sheets in expected.items():
+        assert list(result[name]) == list(sheets)
+        for sheet, df in sheets.items():
+            pd.testing.assert_frame_equal(result[name][sheet], df)
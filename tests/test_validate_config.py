@@ -0,0 +1,26 @@
+import numpy as np
+
+import cli
+from f00_read_configs import read_config_except_columns
+from benchmarks.datagen import CONFIG_SHEET_NAME, generate_dataset
+
+
+def read_dataset_config(root):
+    dataset = generate_dataset(root, rows=20, file_type='.csv')
+    file_config_df, cal_df, _ = read_config_except_columns(root, dataset['config_file'], CONFIG_SHEET_NAME, True,
+                                                           {'criteria_value'}, None)
+    return file_config_df, cal_df
+
+
+def test_header_row_criteria_is_not_reported(tmp_path):
+    file_config_df, cal_df = read_dataset_config(tmp_path)
+    cal_df.loc[0, ['applied_column', 'criteria_to_remove_row', 'criteria_value']] = np.nan
+    assert cli._config_problems(file_config_df, cal_df, tmp_path) == []
+
+
+def test_class_without_header_values_is_an_error(tmp_path):
+    file_config_df, cal_df = read_dataset_config(tmp_path)
+    cal_df.loc[0, 'remove_rows_list'] = np.nan
+    assert cli._config_problems(file_config_df, cal_df, tmp_path) == [
+        ('error', f"criteria row {cli.FIRST_CONFIG_ROW}",
+         "first row of class 'a' has no remove_rows_list, its header row cannot be found")]
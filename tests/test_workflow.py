@@ -0,0 +1,42 @@
+import json
+
+import pandas as pd
+
+import cli
+from benchmarks.datagen import CONTROL_SHEET_NAME, generate_dataset, write_control_sheet
+
+
+def test_workflow_command_runs_active_functions_of_control_sheet(tmp_path):
+    dataset = generate_dataset(tmp_path, rows=200, header_offset=3, file_type='.csv')
+    write_control_sheet(dataset['config_file'], [('F001_(4)', 1, 1, 0), ('F002', 1, 2, 0), ('F001_(3)', 0, 3, 0)])
+    config_arguments = ['--base-path', str(tmp_path), '--config-file', dataset['config_file'].name, '--no-cache']
+    output_file = tmp_path / 'output' / 'bench_output.xlsx'
+
+    assert cli.main(['-q', 'run'] + config_arguments) == 0
+    expected = pd.read_excel(output_file, sheet_name=None)
+    output_file.unlink()
+
+    assert cli.main(['-q', 'workflow', '--control-sheet', CONTROL_SHEET_NAME, '--report', 'workflow.json']
+                    + config_arguments) == 0
+    result = pd.read_excel(output_file, sheet_name=None)
+    assert list(result) == list(expected)
+    for sheet, df in expected.items():
+        pd.testing.assert_frame_equal(result[sheet], df)
+
+    with open(tmp_path / 'workflow.json', encoding='utf-8') as f:
+        steps = json.load(f)['steps']
+    assert [(step['function'], step['status']) for step in steps] == [('F002', 'not available'), ('F001', 'done')]
+
+
+def test_process_wide_options_run_one_function_at_a_time(tmp_path, capsys):
+    dataset = generate_dataset(tmp_path, rows=50, file_type='.csv')
+    write_control_sheet(dataset['config_file'], [('F001_(4)', 1, 1, 0)])
+    arguments = ['-q', 'workflow', '--control-sheet', CONTROL_SHEET_NAME, '--base-path', str(tmp_path),
+                 '--config-file', dataset['config_file'].name, '--no-cache', '--memory-profile']
+
+    assert cli.main(arguments + ['--parallel-steps', '2']) == 1
+    assert '--parallel-steps' in capsys.readouterr().out
+    assert not (tmp_path / 'output').exists()
+
+    assert cli.main(arguments) == 0
+    assert (tmp_path / 'output' / 'bench_output.xlsx').is_file()
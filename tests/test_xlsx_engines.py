@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from f01_remove_rows import process_input_file, read_input_file_type
+from benchmarks.datagen import INPUT_SHEET_NAME, build_criteria_rows, build_input_frame, write_input_file
+
+
+SAMPLE_WORKBOOK = Path(__file__).resolve().parent.parent / 'abc' / 'Sample_for_test_process_data_Q1&Q2.xlsx'
+
+
+@pytest.fixture(params=['calamine', 'openpyxl'])
+def engine(request):
+    if request.param == 'calamine':
+        pytest.importorskip('python_calamine')
+    return request.param
+
+
+@pytest.fixture
+def input_workbook(tmp_path):
+    path = tmp_path / 'input.xlsx'
+    write_input_file(path, '.xlsx', build_input_frame(120, columns=9, header_offset=7))
+    return path
+
+
+def test_engine_reads_like_read_excel(engine, input_workbook):
+    expected = pd.read_excel(input_workbook, sheet_name=INPUT_SHEET_NAME, header=None)
+    pd.testing.assert_frame_equal(read_input_file_type(input_workbook, '.xlsx', INPUT_SHEET_NAME, xlsx_engine=engine),
+                                  expected)
+
+
+def test_engine_reads_sample_workbook_like_read_excel(engine):
+    for sheet_name in pd.ExcelFile(SAMPLE_WORKBOOK).sheet_names:
+        expected = pd.read_excel(SAMPLE_WORKBOOK, sheet_name=sheet_name, header=None)
+        pd.testing.assert_frame_equal(read_input_file_type(SAMPLE_WORKBOOK, '.xlsx', sheet_name, xlsx_engine=engine),
+                                      expected, obj=sheet_name)
+
+
+def test_engine_processes_like_read_excel(engine, input_workbook):
+    criteria_rows = build_criteria_rows(7, columns=9)
+    expected = process_input_file(input_workbook, '.xlsx', INPUT_SHEET_NAME, criteria_rows, xlsx_engine='pandas')
+    assert 0 < len(expected) < 120
+    pd.testing.assert_frame_equal(process_input_file(input_workbook, '.xlsx', INPUT_SHEET_NAME, criteria_rows,
+                                                     xlsx_engine=engine), expected)
@@ -0,0 +1,149 @@
+import os
+import time
+import logging
+import pandas as pd
+from pathlib import Path
+
+from f00_read_configs import read_config_except_columns, ConfigIndex
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two looks at the config file and the watched input files
+POLL_SECONDS = 1.0
+
+
+def _signature(path):
+    """ (size, mtime_ns) of path, or None when it does not exist. """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class RemovalWatcher:
+    """
+    Resident F001 service: the config is parsed once and new inputs are processed on arrival.
+
+    The function sheet is read with read_config_except_columns and indexed
+    once; after that every poll only stats the config file and the input
+    files it lists. An input that appears or changes is processed on its own
+    (its file_config_df rows, plus the rows writing the same output sheets)
+    once it has kept the same size and mtime for one poll, so files still
+    being copied in are not read half-written.
+    A changed config file is reloaded; with manifest_path set every row is
+    then run again and the manifest rebuilds only the sheets whose input or
+    criteria changed.
+
+    options are passed on to run_removal_automation.
+
+    Usage:
+        RemovalWatcher(base_path, 'read_workflow_config_test.xlsx', 'F001_(4)',
+                       cache_dir=base_path / '.config_cache').serve_forever()
+    """
+
+    def __init__(self, base_path, config_file, sheet_name, cache_dir=None, manifest_path=None,
+                 poll_seconds=POLL_SECONDS, process_existing=False, **options):
+        self.base_path = Path(base_path)
+        self.config_file_path = self.base_path / config_file
+        self.sheet_name = sheet_name
+        self.cache_dir = cache_dir
+        self.manifest_path = manifest_path
+        self.poll_seconds = poll_seconds
+        self.options = options
+
+        self.load_config()
+        # Inputs already there are taken as processed unless process_existing is set
+        self._seen = {} if process_existing else {path: _signature(path) for path in self._rows_by_input}
+        self._pending = {}  # Changed inputs waiting for their size and mtime to settle
+
+    def load_config(self):
+        """ Parse the function sheet and index which rows read each input file. """
+        from f01_remove_rows import resolve_file_paths
+
+        self._config_signature = _signature(self.config_file_path)
+        self.file_config_df, cal_df, mapping_zone_df = read_config_except_columns(
+            self.base_path, self.config_file_path, self.sheet_name, lower_case_except_file_zone=True,
+            execpt_cal_df_columns={"criteria_value"}, cache_dir=self.cache_dir)
+        self.config_index = ConfigIndex(cal_df, mapping_zone_df)
+
+        self._rows_by_input, rows_by_output, outputs = {}, {}, {}
+        for label, file_info in self.file_config_df.iterrows():
+            if pd.isna(file_info['input_folder_path']) or pd.isna(file_info['input_file_name']):
+                continue
+            input_file_path, output_file_path = resolve_file_paths(file_info, self.base_path)
+            outputs[label] = (output_file_path, str(file_info.get('output_sheet_name', 'Sheet1')))
+            self._rows_by_input.setdefault(input_file_path, []).append(label)
+            rows_by_output.setdefault(outputs[label], []).append(label)
+
+        # A sheet written by several rows is rebuilt from all of them, as in a full run
+        for path, labels in self._rows_by_input.items():
+            self._rows_by_input[path] = sorted({row for label in labels for row in rows_by_output[outputs[label]]})
+        logger.info("Loaded %s of %s: watching %d input files", self.sheet_name, self.config_file_path,
+                    len(self._rows_by_input))
+
+    def _run(self, file_config_df):
+        from f01_remove_rows import run_removal_automation
+
+        start = time.perf_counter()
+        try:
+            run_removal_automation(file_config_df, self.config_index, self.base_path,
+                                   manifest_path=self.manifest_path, **self.options)
+        except Exception:
+            # One bad file must not stop the service; it is retried when it changes again
+            logger.exception("Processing %d config rows failed", len(file_config_df))
+            return
+        logger.info("Processed %d config rows in %.3fs", len(file_config_df), time.perf_counter() - start)
+
+    def _config_changed(self):
+        if _signature(self.config_file_path) == self._config_signature:
+            return False
+        try:
+            self.load_config()
+        except Exception:
+            logger.exception("Could not reload %s, keeping the previous config", self.config_file_path)
+            return False
+        return True
+
+    def poll_once(self):
+        """ Look once for config and input changes and process them; return the inputs processed. """
+        if self._config_changed() and self.manifest_path is not None:
+            self._run(self.file_config_df)
+
+        ready = []
+        for path in self._rows_by_input:
+            signature = _signature(path)
+            if signature is None or signature == self._seen.get(path):
+                self._pending.pop(path, None)
+            elif self._pending.get(path) == signature:
+                ready.append(path)
+            else:
+                self._pending[path] = signature
+
+        if ready:
+            labels = {label for path in ready for label in self._rows_by_input[path]}
+            logger.info("New or changed inputs: %s", ', '.join(str(path) for path in ready))
+            self._run(self.file_config_df.loc[sorted(labels)])
+            for path in ready:
+                self._seen[path] = self._pending.pop(path)
+        return ready
+
+    def serve_forever(self):
+        """ Poll until interrupted. """
+        logger.info("Watching for new inputs every %.1fs", self.poll_seconds)
+        try:
+            while True:
+                self.poll_once()
+                time.sleep(self.poll_seconds)
+        except KeyboardInterrupt:
+            logger.info("Watcher stopped")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    base_path = Path('/usr/src/app')
+    RemovalWatcher(base_path, 'read_workflow_config_test.xlsx', 'F001_(4)',
+                   cache_dir=base_path / '.config_cache',
+                   manifest_path=base_path / '.removal_manifest.json').serve_forever()
@@ -0,0 +1,221 @@
+import re
+import json
+import time
+import logging
+import datetime
+import pandas as pd
+from pathlib import Path
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from f00_read_configs import read_config_except_columns
+from f01_output_writers import output_format, sheet_output_path
+
+
+logger = logging.getLogger(__name__)
+
+# How often a step waiting for an input that no other step writes checks for it
+INPUT_POLL_SECONDS = 0.5
+
+
+def function_id(name):
+    """ Canonical id of a function: 'Function 001', 'F001' and 'F001_(4)' are all 'F001'. """
+    match = re.search(r'\d+', str(name))
+    if match is None:
+        return str(name).strip()
+    return f"F{int(match.group()):03d}"
+
+
+class WorkflowStep:
+    """
+    One function of the workflow: how to run it and the files it reads and writes.
+
+    run is called without arguments. inputs and outputs are the file paths the
+    step reads and writes; they are what the scheduler orders the steps by. A
+    step whose inputs or outputs are None (unknown) is run on its own, after
+    every step before it in the control sheet Order and before every step
+    after it, as the sequential pipeline did.
+    """
+
+    def __init__(self, function, run, inputs=None, outputs=None):
+        self.function = function_id(function)
+        self.run = run
+        self.inputs = None if inputs is None else {Path(p) for p in inputs}
+        self.outputs = None if outputs is None else {Path(p) for p in outputs}
+
+    @property
+    def known_files(self):
+        return self.inputs is not None and self.outputs is not None
+
+
+def removal_step(base_path, config_file, sheet_name, cache_dir=None, **options):
+    """
+    WorkflowStep of F001 for the function sheet sheet_name.
+
+    The sheet is read here, so the step's input and output files are known
+    before it runs; options are passed on to run_removal_automation.
+    """
+    from f01_remove_rows import run_removal_automation
+
+    base_path = Path(base_path)
+    file_records, _, _ = read_config_except_columns(
+        base_path, config_file, sheet_name, lower_case_except_file_zone=True,
+        execpt_cal_df_columns={"criteria_value"}, cache_dir=cache_dir, as_records=True)
+
+    inputs, outputs = set(), set()
+    for record in file_records:
+        inputs.add(record.input_file_path)
+        if output_format(record.output_file_path) == '.xlsx':
+            outputs.add(record.output_file_path)
+        else:
+            # Columnar outputs are written as one file per sheet
+            outputs.add(sheet_output_path(record.output_file_path, record.output_sheet_name))
+
+    run = partial(run_removal_automation, file_records, None, base_path, **options)
+    return WorkflowStep('F001', run, inputs, outputs)
+
+
+def build_dependencies(steps):
+    """
+    Map every step (by position in steps, which is in Order) to the earlier steps it must wait for.
+
+    A step waits for an earlier step that writes a file it reads, that writes
+    a file it writes too, or that reads a file it writes. Steps with unknown
+    files wait for, and are waited for by, every other step.
+    """
+    dependencies = {}
+    for position, step in enumerate(steps):
+        depends_on = set()
+        for earlier in range(position):
+            other = steps[earlier]
+            if not (step.known_files and other.known_files):
+                depends_on.add(earlier)
+            elif (other.outputs & step.inputs) or (other.outputs & step.outputs) or (other.inputs & step.outputs):
+                depends_on.add(earlier)
+        dependencies[position] = depends_on
+    return dependencies
+
+
+def _wait_for_inputs(paths, timeout):
+    """ Wait until every path exists, for at most timeout seconds; return the seconds waited. """
+    start = time.perf_counter()
+    missing = [path for path in paths if not path.exists()]
+    while missing and time.perf_counter() - start < timeout:
+        time.sleep(min(INPUT_POLL_SECONDS, max(timeout - (time.perf_counter() - start), 0)))
+        missing = [path for path in missing if not path.exists()]
+    for path in missing:
+        logger.warning("Input %s still missing after %.1fs", path, timeout)
+    return time.perf_counter() - start
+
+
+def _max_wait(function):
+    sleep = function.get('Time.sleep (s)')
+    if sleep is None or pd.isna(sleep):
+        return 0.0
+    return float(sleep)
+
+
+def run_workflow(active_functions, steps, workers=None, report_path=None):
+    """
+    Run the active functions as a dependency graph.
+
+    active_functions is the list returned by get_active_functions_sorted;
+    steps maps Function values or function ids (see function_id) to
+    WorkflowStep objects, e.g. {'F001_(4)': removal_step(base_path,
+    config_file, 'F001_(4)')} or {'F001': ...}. Active functions without a
+    step are logged and left out.
+
+    The dependencies come from the files of the steps (see
+    build_dependencies), the control sheet Order only breaks ties. Every step
+    starts as soon as the steps it depends on are done, with up to workers
+    steps (default: all) running at once in threads. Time.sleep (s) is no
+    longer slept: it is the longest a step waits for an input file that no
+    other step writes to appear. A step whose dependency failed is skipped.
+    The threads share the process: removal steps with memory_profile or
+    input_cache_bytes set (tracemalloc and the parsed input cache are
+    process-wide) need workers=1.
+
+    Returns the per-step timing records, which are also logged and, with
+    report_path set, saved there as JSON.
+    """
+    started = datetime.datetime.now()
+    start = time.perf_counter()
+
+    scheduled, records = [], []
+    for function in active_functions:
+        step = steps.get(str(function['Function']), steps.get(function_id(function['Function'])))
+        if step is None:
+            logger.warning("No step available for %s, skipping it", function['Function'])
+            records.append({'function': str(function['Function']), 'status': 'not available'})
+            continue
+        scheduled.append((function, step))
+
+    ordered = [step for _, step in scheduled]
+    dependencies = build_dependencies(ordered)
+    produced = set().union(*(step.outputs for step in ordered if step.outputs is not None))
+
+    timings = [{
+        'function': step.function,
+        'order': function.get('Order'),
+        'depends_on': [ordered[d].function for d in sorted(dependencies[position])],
+        'status': 'pending',
+    } for position, (function, step) in enumerate(scheduled)]
+
+    def run_step(position):
+        function, step = scheduled[position]
+        timing = timings[position]
+        timing['started'] = time.perf_counter() - start
+        external_inputs = sorted((step.inputs or set()) - produced)
+        timing['input_wait_seconds'] = _wait_for_inputs(external_inputs, _max_wait(function))
+        step_start = time.perf_counter()
+        try:
+            step.run()
+        finally:
+            timing['seconds'] = time.perf_counter() - step_start
+            timing['finished'] = time.perf_counter() - start
+
+    remaining = dict(dependencies)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers or max(len(scheduled), 1)) as pool:
+        while remaining or running:
+            for position in sorted(remaining):
+                states = [timings[d]['status'] for d in remaining[position]]
+                if any(state in ('failed', 'skipped') for state in states):
+                    timings[position]['status'] = 'skipped'
+                    logger.warning("Skipping %s: a step it depends on did not finish", timings[position]['function'])
+                    del remaining[position]
+                elif all(state == 'done' for state in states):
+                    timings[position]['status'] = 'running'
+                    logger.info("Starting %s", timings[position]['function'])
+                    running[pool.submit(run_step, position)] = position
+                    del remaining[position]
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                position = running.pop(future)
+                timing = timings[position]
+                error = future.exception()
+                if error is None:
+                    timing['status'] = 'done'
+                    logger.info("%s done in %.3fs (waited %.3fs for inputs)", timing['function'],
+                                timing['seconds'], timing['input_wait_seconds'])
+                else:
+                    timing['status'] = 'failed'
+                    timing['error'] = repr(error)
+                    logger.error("%s failed: %r", timing['function'], error)
+
+    records.extend(timings)
+    seconds = time.perf_counter() - start
+    logger.info("Workflow finished in %.3fs; steps took %.3fs in total", seconds,
+                sum(t.get('seconds', 0.0) for t in timings))
+
+    if report_path is not None:
+        report_path = Path(report_path)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump({'started': started.isoformat(timespec='seconds'), 'seconds': seconds, 'steps': records},
+                      f, indent=1, default=str)
+        logger.info("Workflow report written to %s", report_path)
+    return records